@@ -0,0 +1,142 @@
+import heapq
+import numpy as np
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from src.models.prediction import PlayerPrediction
+from src.utils.bootstrap_index import BootstrapIndex
+
+class _PositionIndex:
+    """Players of one position sorted by price, with a max-tree over scores
+
+    The tree is only built once something asks for a top k; the sorted
+    arrays alone serve callers that score the whole block.
+
+    Ties on score are broken by insertion order so results match a stable
+    sort of the original list.
+    """
+
+    def __init__(self, entries: List[Tuple[float, int, int, float]]):
+        # entries: (price, seq, player_id, score)
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self.prices = [e[0] for e in entries]
+        self.seqs = [e[1] for e in entries]
+        self.ids = [e[2] for e in entries]
+        self.scores = [e[3] for e in entries]
+        # The same columns as arrays, for scoring a block of swaps at once
+        self.id_array = np.array(self.ids, dtype=int)
+        self.price_array = np.array(self.prices, dtype=float)
+        self.score_array = np.array(self.scores, dtype=float)
+
+        self.tree: Optional[List[int]] = None
+
+    def _build_tree(self):
+        """Max-tree over scores, built on the first top-k query"""
+        size = 1
+        while size < len(self.ids):
+            size *= 2
+        tree = [-1] * (2 * size)
+        for i in range(len(self.ids)):
+            tree[size + i] = i
+        for node in range(size - 1, 0, -1):
+            tree[node] = self._better(tree[2 * node], tree[2 * node + 1])
+        # Published whole, so a concurrent query never sees half a tree
+        self.size = size
+        self.tree = tree
+
+    def _better(self, a: int, b: int) -> int:
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        if (self.scores[a], -self.seqs[a]) >= (self.scores[b], -self.seqs[b]):
+            return a
+        return b
+
+    def _push(self, heap: list, node: int):
+        best = self.tree[node]
+        if best >= 0:
+            heapq.heappush(heap, (-self.scores[best], self.seqs[best], node))
+
+    def top_k(self, lo: int, hi: int, k: int, exclude: Set[int]) -> List[Tuple[int, float]]:
+        """Best k (player_id, score) pairs among sorted positions [lo, hi)"""
+        if self.tree is None:
+            self._build_tree()
+        heap = []
+        # Seed the heap with the canonical nodes covering [lo, hi)
+        left, right = lo + self.size, hi + self.size
+        while left < right:
+            if left & 1:
+                self._push(heap, left)
+                left += 1
+            if right & 1:
+                right -= 1
+                self._push(heap, right)
+            left //= 2
+            right //= 2
+
+        results = []
+        while heap and len(results) < k:
+            _, _, node = heapq.heappop(heap)
+            if node >= self.size:
+                i = node - self.size
+                if self.ids[i] not in exclude:
+                    results.append((self.ids[i], self.scores[i]))
+            else:
+                self._push(heap, 2 * node)
+                self._push(heap, 2 * node + 1)
+        return results
+
+
+class CandidateIndex:
+    """Price-ordered replacement candidates per position for one gameweek
+
+    A top-k query over a price range costs O((k + |exclude|) log n) instead
+    of filtering and sorting the whole pool.
+    """
+
+    def __init__(self, candidates: Iterable[Tuple[int, str, float, float]]):
+        """candidates: (player_id, position, price, score)"""
+        by_position: Dict[str, List[Tuple[float, int, int, float]]] = {}
+        for seq, (player_id, position, price, score) in enumerate(candidates):
+            by_position.setdefault(position, []).append((price, seq, player_id, score))
+        self.positions = {
+            position: _PositionIndex(entries) for position, entries in by_position.items()
+        }
+
+    @classmethod
+    def from_predictions(cls, predictions: List[PlayerPrediction],
+                         index: BootstrapIndex) -> 'CandidateIndex':
+        """Index predictions by position and price
+
+        Each player is scored by predicted points summed over all of their
+        predictions, so a multi-gameweek horizon ranks by total expected
+        points.
+        """
+        points: Dict[int, float] = {}
+        for p in predictions:
+            if p.player_id in index.elements:
+                points[p.player_id] = points.get(p.player_id, 0) + p.predicted_points
+        return cls(
+            (player_id,
+             index.player_position(player_id),
+             index.elements[player_id]['now_cost'] / 10,
+             total)
+            for player_id, total in points.items()
+        )
+
+    def top_k(self, position: str, max_price: float, k: int,
+              exclude: Optional[Set[int]] = None,
+              above_price: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Top k (player_id, score) at a position priced <= max_price
+
+        If above_price is given only players priced strictly above it count.
+        """
+        pos_index = self.positions.get(position)
+        if pos_index is None or k <= 0:
+            return []
+
+        lo = bisect_right(pos_index.prices, above_price) if above_price is not None else 0
+        hi = bisect_right(pos_index.prices, max_price)
+        if lo >= hi:
+            return []
+        return pos_index.top_k(lo, hi, k, exclude or set())
@@ -0,0 +1,142 @@
+import itertools
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+from src.models.prediction import PlayerPrediction
+
+OUTFIELD_POSITIONS = ['DEF', 'MID', 'FWD']
+# Fewest and most starters per outfield position in a legal formation
+STARTER_RANGES = {'DEF': (3, 5), 'MID': (2, 5), 'FWD': (1, 3)}
+
+@dataclass
+class Lineup:
+    formation: str
+    starters: List[int]
+    bench: List[int]  # substitution order, goalkeeper first
+    captain_id: int
+    vice_captain_id: int
+    expected_points: float  # XI plus captaincy, and autosubs if modelled
+
+
+class LineupOptimizer:
+    """Pick the starting XI, bench order and captaincy for a squad
+
+    Every legal formation the squad allows is tried; within one, the best
+    players per position start. With autosubs on, each bench player adds
+    their expected points times the chance they are needed, from each
+    player's minutes_probability, and the captain's expected points count
+    twice with the vice-captain covering when the captain does not play.
+    """
+
+    def __init__(self, include_autosubs: bool = True):
+        self.include_autosubs = include_autosubs
+
+    @staticmethod
+    def _missing_distribution(play_probs: Sequence[float]) -> List[float]:
+        """Distribution of how many of these players miss the gameweek"""
+        dist = [1.0]
+        for p in play_probs:
+            nxt = [0.0] * (len(dist) + 1)
+            for k, mass in enumerate(dist):
+                nxt[k] += mass * p
+                nxt[k + 1] += mass * (1 - p)
+            dist = nxt
+        return dist
+
+    def _bench_value(self, missing: List[float], bench: Sequence[Tuple[float, float]]) -> float:
+        """Expected autosub points from outfield bench players in order
+
+        A substitute comes on if they play and more starters are missing
+        than earlier substitutes have already covered. Formation limits on
+        autosubs are ignored.
+        """
+        total = 0.0
+        # used[k]: probability that k earlier substitutes played
+        used = [1.0]
+        for points, play_prob in bench:
+            needed = sum(
+                used_mass * sum(missing[k + 1:])
+                for k, used_mass in enumerate(used)
+            )
+            total += needed * points
+            nxt = [0.0] * (len(used) + 1)
+            for k, mass in enumerate(used):
+                nxt[k] += mass * (1 - play_prob)
+                nxt[k + 1] += mass * play_prob
+            used = nxt
+        return total
+
+    def _captaincy(self, starters: List[Tuple[int, float, float]]) -> Tuple[int, int, float]:
+        """Best (captain, vice, extra points) among (id, points, play_prob) starters"""
+        ranked = sorted(starters, key=lambda s: s[1], reverse=True)
+        if not self.include_autosubs:
+            return ranked[0][0], ranked[1][0], ranked[0][1]
+        best = None
+        for captain, vice in itertools.permutations(ranked[:4], 2):
+            extra = captain[1] + (1 - captain[2]) * vice[1]
+            if best is None or extra > best[2]:
+                best = (captain[0], vice[0], extra)
+        return best
+
+    def optimize(self, predictions: List[PlayerPrediction],
+                 positions: Dict[int, str]) -> Lineup:
+        """Best lineup for one squad; positions maps player id to position"""
+        by_position: Dict[str, List[Tuple[int, float, float]]] = {}
+        for p in predictions:
+            position = positions[p.player_id]
+            position = 'GKP' if position == 'GK' else position
+            by_position.setdefault(position, []).append(
+                (p.player_id, p.predicted_points, min(max(p.minutes_probability, 0.0), 1.0))
+            )
+        for players in by_position.values():
+            players.sort(key=lambda s: s[1], reverse=True)
+
+        keepers = by_position.get('GKP', [])
+        if not keepers:
+            raise ValueError("Squad has no goalkeeper")
+
+        best = None
+        counts = [
+            range(STARTER_RANGES[position][0],
+                  min(STARTER_RANGES[position][1], len(by_position.get(position, []))) + 1)
+            for position in OUTFIELD_POSITIONS
+        ]
+        for shape in itertools.product(*counts):
+            if sum(shape) != 10:
+                continue
+            starters = [keepers[0]]
+            bench = []
+            for position, count in zip(OUTFIELD_POSITIONS, shape):
+                starters += by_position.get(position, [])[:count]
+                bench += by_position.get(position, [])[count:]
+
+            captain, vice, captain_points = self._captaincy(starters)
+            expected = sum(s[1] for s in starters) + captain_points
+            bench_order = sorted(bench, key=lambda s: s[1], reverse=True)
+            if self.include_autosubs:
+                missing = self._missing_distribution([s[2] for s in starters[1:]])
+                best_order = max(
+                    itertools.permutations(bench),
+                    key=lambda order: self._bench_value(missing, [(s[1], s[2]) for s in order])
+                )
+                bench_order = list(best_order)
+                expected += self._bench_value(missing, [(s[1], s[2]) for s in bench_order])
+                if len(keepers) > 1:
+                    expected += (1 - keepers[0][2]) * keepers[1][1]
+
+            if best is None or expected > best.expected_points:
+                best = Lineup(
+                    formation='-'.join(map(str, shape)),
+                    starters=[s[0] for s in starters],
+                    bench=[s[0] for s in keepers[1:] + bench_order],
+                    captain_id=captain,
+                    vice_captain_id=vice,
+                    expected_points=expected
+                )
+
+        if best is None:
+            raise ValueError("Squad cannot field a legal formation")
+        return best
+
+    def optimize_many(self, squads: List[Tuple[List[PlayerPrediction], Dict[int, str]]]) -> List[Lineup]:
+        """Lineups for many squads, e.g. every team in a league"""
+        return [self.optimize(predictions, positions) for predictions, positions in squads]
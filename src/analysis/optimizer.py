@@ -1,85 +1,329 @@
-from typing import List, Dict, Tuple
+import time
+import heapq
+import itertools
+import numpy as np
+from collections import Counter
+from dataclasses import dataclass
+from typing import List, Dict, Hashable, Optional, Set, Tuple
 from src.models.player import Player
 from src.models.team import Team
 from src.analysis.predictor import FPLPredictor
+from src.analysis.candidate_index import CandidateIndex
+from src.analysis.swaps import SwapMatrix
+
+@dataclass
+class TransferPlan:
+    transfers: List[Tuple[Player, Player]]  # (out, in) pairs
+    point_gain: float
+    hit_cost: int
+    net_gain: float
+    remaining_budget: float
+
 
 class TransferOptimizer:
     MAX_PLAYERS_PER_TEAM = 3
+    PRICE_PENALTY = 0.5  # points lost per £1m spent above the outgoing price
+    HIT_COST = 4  # points deducted per transfer beyond the free ones
     
-    def __init__(self, predictor: FPLPredictor):
+    def __init__(self, predictor: Optional[FPLPredictor]):
         self.predictor = predictor
 
-    def _get_transfer_value(self, player_out: Player, player_in: Player, 
-                          prediction_diff: float) -> float:
-        """Calculate the value of a transfer"""
-        price_diff = player_in.price - player_out.price
-        if price_diff > 0:
-            # Penalize expensive transfers slightly
-            return prediction_diff - (price_diff * 0.5)
-        return prediction_diff
+    def _get_transfer_value(self, price_diff: np.ndarray, prediction_diff: np.ndarray) -> np.ndarray:
+        """Calculate the value of transfers, elementwise over swap matrices"""
+        # Penalize expensive transfers slightly
+        return prediction_diff - np.maximum(price_diff, 0) * self.PRICE_PENALTY
 
     def suggest_transfers(self, team: Team, available_players: List[Player], 
-                        num_weeks: int = 5) -> List[Dict]:
-        """Suggest optimal transfers within budget and free transfer constraints"""
+                        num_weeks: int = 5, snapshot: Optional[Hashable] = None) -> List[Dict]:
+        """Suggest optimal transfers within budget and free transfer constraints
+
+        Pass a snapshot key (e.g. the gameweek) to reuse model insights
+        across calls on the same data.
+        """
         suggestions = []
         remaining_budget = team.budget
         
-        # Get predictions for current players
-        current_predictions = {
-            p.id: self.predictor.get_player_insights(p)
-            for p in team.players
-        }
+        squad_ids = {player.id for player in team.players}
+        candidate_pool = [p for p in available_players if p.id not in squad_ids]
         
-        # Find potential transfer targets
-        for player_out in team.players:
-            position = player_out.position
-            max_price = player_out.price + remaining_budget
-            
-            # Filter available players by position and price
-            candidates = [
-                p for p in available_players
-                if p.position == position
-                and p.price <= max_price
-                and p.id not in [player.id for player in team.players]
-            ]
+        # Featurize squad and pool together and run one inference pass
+        insights = self.predictor.get_player_insights_batch(
+            team.players + candidate_pool, snapshot
+        )
+        current_predictions = {p.id: insights[p.id] for p in team.players}
+        candidate_predictions = {p.id: insights[p.id] for p in candidate_pool}
+        
+        # Score every (squad member, candidate) swap at once
+        candidates = CandidateIndex(
+            (p.id, p.position, p.price, candidate_predictions[p.id]['predicted_points'])
+            for p in candidate_pool
+        )
+        swaps = SwapMatrix.build(
+            candidates, {p.id: p.team for p in candidate_pool},
+            [p.id for p in team.players], [p.position for p in team.players],
+            [p.team for p in team.players], [p.price for p in team.players],
+            [current_predictions[p.id]['predicted_points'] for p in team.players],
+            bank=remaining_budget,
+            max_per_club=self.MAX_PLAYERS_PER_TEAM
+        )
+        transfer_value = self._get_transfer_value(swaps.price_diff, swaps.point_gain)
+        pool_by_id = {p.id: p for p in candidate_pool}
+        
+        # Only beneficial transfers, and only the few we return become dicts
+        for row, col in swaps.top_k(team.free_transfers, score=transfer_value, min_score=0):
+            player_out = team.players[row]
+            player_in = pool_by_id[int(swaps.in_ids[col])]
+            prediction_in = candidate_predictions[player_in.id]
+            prediction_out = current_predictions[player_out.id]
             
-            # Get predictions for candidates
-            for player_in in candidates:
-                prediction_in = self.predictor.get_player_insights(player_in)
-                prediction_out = current_predictions[player_out.id]
-                
-                prediction_diff = (
-                    prediction_in['predicted_points'] - 
-                    prediction_out['predicted_points']
-                )
-                
-                # Calculate transfer value considering price difference
-                transfer_value = self._get_transfer_value(
-                    player_out, player_in, prediction_diff
-                )
-                
-                if transfer_value > 0:  # Only suggest beneficial transfers
-                    suggestions.append({
-                        'out': {
-                            'name': player_out.name,
-                            'team': player_out.team,
-                            'price': player_out.price,
-                            'predicted_points': prediction_out['predicted_points']
-                        },
-                        'in': {
-                            'name': player_in.name,
-                            'team': player_in.team,
-                            'price': player_in.price,
-                            'predicted_points': prediction_in['predicted_points'],
-                            'form': player_in.form,
-                            'fixtures': player_in.fixtures[:num_weeks],
-                            'value_score': prediction_in['value_score']
-                        },
-                        'point_gain': prediction_diff,
-                        'price_diff': player_in.price - player_out.price,
-                        'transfer_value': transfer_value
-                    })
+            suggestions.append({
+                'out': {
+                    'name': player_out.name,
+                    'team': player_out.team,
+                    'price': player_out.price,
+                    'predicted_points': prediction_out['predicted_points']
+                },
+                'in': {
+                    'name': player_in.name,
+                    'team': player_in.team,
+                    'price': player_in.price,
+                    'predicted_points': prediction_in['predicted_points'],
+                    'form': player_in.form,
+                    'fixtures': player_in.fixtures[:num_weeks],
+                    'value_score': prediction_in['value_score']
+                },
+                'point_gain': float(swaps.point_gain[row, col]),
+                'price_diff': player_in.price - player_out.price,
+                'transfer_value': float(transfer_value[row, col])
+            })
         
-        # Sort by transfer value and limit to free transfers
-        suggestions.sort(key=lambda x: x['transfer_value'], reverse=True)
-        return suggestions[:team.free_transfers]
\ No newline at end of file
+        return suggestions
+
+    def plan_transfers(self, team: Team, available_players: List[Player],
+                       max_transfers: int = 3, top_n: int = 5,
+                       points: Optional[Dict[int, float]] = None,
+                       snapshot: Optional[Hashable] = None,
+                       deadline: Optional[float] = None) -> List[TransferPlan]:
+        """Find the best sets of 0..max_transfers transfers by branch and bound
+
+        Plans respect the budget, position quotas (each player is replaced
+        by one of the same position), the per-club limit and the hit cost
+        for transfers beyond team.free_transfers. points maps player id to
+        expected points, with players missing from it counted as scoring
+        none; by default the predictor's estimates are used.
+
+        deadline is a time.monotonic() value; once it passes the search stops
+        and returns the best plans found so far.
+        """
+        squad_ids = {player.id for player in team.players}
+        pool = [p for p in available_players if p.id not in squad_ids]
+        if points is None:
+            insights = self.predictor.get_player_insights_batch(team.players + pool, snapshot)
+            points = {player_id: i['predicted_points'] for player_id, i in insights.items()}
+
+        def expected(player: Player) -> float:
+            return points.get(player.id, 0.0)
+
+        def tenths(price: float) -> int:
+            return int(round(price * 10))
+
+        # Best candidates first so the inner loop can stop at the first bound failure
+        candidates: Dict[str, List[Tuple[Player, float, int]]] = {}
+        for player in sorted(pool, key=expected, reverse=True):
+            candidates.setdefault(player.position, []).append(
+                (player, expected(player), tenths(player.price))
+            )
+        index = CandidateIndex((p.id, p.position, p.price, expected(p)) for p in pool)
+        cheapest = {
+            position: min(price for _, _, price in players)
+            for position, players in candidates.items()
+        }
+
+        outs = list(team.players)
+        out_points = [expected(o) for o in outs]
+        out_tenths = [tenths(o.price) for o in outs]
+        # Later sales can cover an earlier purchase and free a club place,
+        # so the bank may dip below zero (by no more than the remaining
+        # sales can refund) and a club may go over the limit mid-plan
+        refunds = sorted(
+            (max(0, out_tenths[j] - cheapest[o.position]) for j, o in enumerate(outs)
+             if o.position in cheapest),
+            reverse=True
+        )
+        low = -sum(refunds[:max_transfers])
+        high = tenths(team.budget) - low
+        suffix_clubs = [Counter(o.team for o in outs[j:]) for j in range(len(outs) + 1)]
+
+        def hits(n: int) -> int:
+            return max(0, n - team.free_transfers) * self.HIT_COST
+
+        # most[r][j][b]: most r more swaps among slots j.. can gain with
+        # low + b tenths in the bank, ignoring the club limit and repeated
+        # purchases. Each slot's best gain for what it spends comes from a
+        # running max over its position's price-ordered block.
+        banks = np.arange(high - low + 1)
+        most = [np.tile(np.where(banks + low >= 0, 0.0, -np.inf), (len(outs) + 1, 1))]
+        spends, gains = [], []
+        for j, player_out in enumerate(outs):
+            block = index.positions.get(player_out.position)
+            if block is None:
+                spends.append(np.zeros(0, dtype=int))
+                gains.append(np.zeros(0))
+                continue
+            prices = np.rint(block.price_array * 10).astype(int)
+            steps = np.unique(prices)
+            best = np.maximum.accumulate(block.score_array)
+            spends.append(steps - out_tenths[j])
+            gains.append(best[np.searchsorted(prices, steps, side='right') - 1] - out_points[j])
+        for r in range(1, max_transfers + 1):
+            table = np.full((len(outs) + 1, len(banks)), -np.inf)
+            for j in range(len(outs) - 1, -1, -1):
+                table[j] = table[j + 1]
+                if len(spends[j]):
+                    left = banks[:, None] - spends[j][None, :]
+                    rest = most[r - 1][j + 1][np.clip(left, 0, len(banks) - 1)]
+                    rest[left < 0] = -np.inf
+                    table[j] = np.maximum(table[j], (rest + gains[j][None, :]).max(axis=1))
+            most.append(table)
+        # ...and net of hits, for a plan already making depth transfers
+        reachable = [
+            np.max([most[r] - hits(depth + r) for r in range(max_transfers - depth + 1)], axis=0).tolist()
+            for depth in range(max_transfers + 1)
+        ]
+
+        def upper_bound(depth: int, start: int, budget: int) -> float:
+            """Most a partial plan's net gain can still grow by
+
+            The plan has depth transfers, budget tenths in the bank and can
+            only swap slots from start on.
+            """
+            if budget < low:
+                return float('-inf')
+            return reachable[depth][start][min(budget, high) - low]
+
+        best_plans: List[Tuple[float, int, Tuple]] = []  # min-heap of (net_gain, seq, plan)
+        counter = itertools.count()
+        recorded = set()
+        club_counts = Counter(p.team for p in outs)
+        chosen_in = set()
+        transfers: List[Tuple[Player, Player]] = []
+        expired = False
+
+        def threshold() -> float:
+            return best_plans[0][0] if len(best_plans) >= top_n else float('-inf')
+
+        def record(plan: Tuple[Tuple[Player, Player], ...], gain: float, budget: int):
+            net = gain - hits(len(plan))
+            key = tuple((o.id, i.id) for o, i in plan)
+            if budget < 0 or net <= threshold() or key in recorded:
+                return
+            recorded.add(key)
+            entry = (net, -next(counter), (plan, gain, budget))
+            if len(best_plans) < top_n:
+                heapq.heappush(best_plans, entry)
+            else:
+                heapq.heapreplace(best_plans, entry)
+
+        pool_by_id = {p.id: p for p in pool}
+        club_players: Dict[Tuple[str, str], Set[int]] = {}
+        for p in pool:
+            club_players.setdefault((p.position, p.team), set()).add(p.id)
+
+        def first_swap(j: int, budget: int) -> Optional[Player]:
+            """Highest-scoring candidate slot j can legally buy"""
+            position = outs[j].position
+            full = [club for club, count in club_counts.items() if count >= self.MAX_PLAYERS_PER_TEAM]
+            exclude = chosen_in.union(*(club_players.get((position, club), ()) for club in full))
+            best = index.top_k(position, (budget + out_tenths[j] + 0.5) / 10, 1, exclude)
+            return pool_by_id[best[0][0]] if best else None
+
+        # Seed the threshold with the best single swaps and the greedy plan
+        # so the bound prunes from the first node
+        greedy: Dict[int, Player] = {}
+        budget = tenths(team.budget)
+        for _ in range(max_transfers):
+            options = []
+            for j in range(len(outs)):
+                if j in greedy:
+                    continue
+                club_counts[outs[j].team] -= 1
+                player_in = first_swap(j, budget)
+                club_counts[outs[j].team] += 1
+                if player_in is not None:
+                    swap_gain = expected(player_in) - out_points[j]
+                    options.append((swap_gain, j, player_in))
+                    if not greedy:
+                        record(((outs[j], player_in),), swap_gain,
+                               budget + out_tenths[j] - tenths(player_in.price))
+            if not options:
+                break
+            _, j, player_in = max(options, key=lambda option: option[0])
+            greedy[j] = player_in
+            club_counts[outs[j].team] -= 1
+            club_counts[player_in.team] += 1
+            chosen_in.add(player_in.id)
+            budget += out_tenths[j] - tenths(player_in.price)
+            plan = tuple((outs[k], greedy[k]) for k in sorted(greedy))
+            record(plan, sum(expected(i) - expected(o) for o, i in plan), budget)
+        for j, player_in in greedy.items():
+            club_counts[outs[j].team] += 1
+            club_counts[player_in.team] -= 1
+        chosen_in.clear()
+
+        def search(start: int, gain: float, budget: int):
+            nonlocal expired
+            if all(club_counts[i.team] <= self.MAX_PLAYERS_PER_TEAM for _, i in transfers):
+                record(tuple(transfers), gain, budget)
+            if deadline is not None and time.monotonic() >= deadline:
+                expired = True
+            depth = len(transfers)
+            if expired or depth == max_transfers:
+                return
+            floor = threshold() - gain
+            for j in range(start, len(outs)):
+                player_out = outs[j]
+                position = player_out.position
+                if position not in candidates:
+                    continue
+                # No swap here can leave more in the bank than the cheapest
+                # one, so once a candidate fails this bound the rest do too
+                best_rest = upper_bound(depth + 1, j + 1, budget + out_tenths[j] - cheapest[position])
+                club_counts[player_out.team] -= 1
+                for player_in, in_points, in_tenths in candidates[position]:
+                    swap_gain = in_points - out_points[j]
+                    if swap_gain + best_rest <= floor:
+                        break
+                    left = budget + out_tenths[j] - in_tenths
+                    later = max_transfers - depth - 1
+                    if (player_in.id in chosen_in
+                            or club_counts[player_in.team]
+                            >= self.MAX_PLAYERS_PER_TEAM + min(later, suffix_clubs[j + 1][player_in.team])
+                            or swap_gain + upper_bound(depth + 1, j + 1, left) <= floor):
+                        continue
+
+                    club_counts[player_in.team] += 1
+                    chosen_in.add(player_in.id)
+                    transfers.append((player_out, player_in))
+                    search(j + 1, gain + swap_gain, left)
+                    transfers.pop()
+                    chosen_in.discard(player_in.id)
+                    club_counts[player_in.team] -= 1
+                    if expired:
+                        break
+                    floor = threshold() - gain
+                club_counts[player_out.team] += 1
+                if expired:
+                    return
+
+        search(0, 0.0, tenths(team.budget))
+
+        return [
+            TransferPlan(
+                transfers=list(plan),
+                point_gain=gain,
+                hit_cost=hits(len(plan)),
+                net_gain=net,
+                remaining_budget=budget / 10
+            )
+            for net, _, (plan, gain, budget) in sorted(best_plans, reverse=True)
+        ]
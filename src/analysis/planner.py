@@ -0,0 +1,219 @@
+import time
+from dataclasses import dataclass, field, replace
+from typing import Dict, FrozenSet, Hashable, List, Optional, Tuple
+from src.models.player import Player
+from src.models.team import Team
+from src.analysis.optimizer import TransferOptimizer
+
+GOALKEEPER_POSITIONS = ('GK', 'GKP')
+# Fewest outfield players a legal starting XI may field per position
+MIN_STARTERS = {'DEF': 3, 'MID': 2, 'FWD': 1}
+
+@dataclass
+class PlanStep:
+    gameweek: int
+    transfers: List[Tuple[Player, Player]]  # (out, in) pairs
+    hit_cost: int
+    free_transfers: int  # available before this gameweek's transfers
+    bank: float  # after this gameweek's transfers
+    expected_points: float  # starting XI points, before hits
+
+
+@dataclass
+class SeasonPlan:
+    steps: List[PlanStep] = field(default_factory=list)
+    total_points: float = 0.0  # expected XI points net of hits
+    complete: bool = True  # False if the time budget cut the search short
+
+
+@dataclass
+class _State:
+    squad: Dict[int, Player]
+    bank: int  # tenths of £1m
+    free_transfers: int
+    score: float
+    steps: List[PlanStep]
+
+    def key(self) -> Tuple[FrozenSet[int], int, int]:
+        return frozenset(self.squad), self.bank, self.free_transfers
+
+
+class TransferPlanner:
+    """Beam search over transfer sequences across several gameweeks
+
+    Each gameweek, every squad state in the beam is expanded with the best
+    transfer sets from TransferOptimizer.plan_transfers, ranked on points
+    over the rest of the horizon, plus the option to roll the transfer.
+    States reaching the same squad, bank and free transfers are merged,
+    keeping the higher score.
+    """
+    MAX_FREE_TRANSFERS = 5
+
+    def __init__(self, optimizer: TransferOptimizer, beam_width: int = 20,
+                 branching: int = 5, max_transfers_per_week: int = 3):
+        self.optimizer = optimizer
+        self.beam_width = beam_width
+        self.branching = branching
+        self.max_transfers_per_week = max_transfers_per_week
+        self._xi_cache: Dict[Tuple[int, FrozenSet[int]], float] = {}
+        self._expansion_cache: Dict[Tuple[int, Hashable], List] = {}
+
+    def _xi_points(self, squad: Dict[int, Player], gameweek: int,
+                   points: Dict[int, float]) -> float:
+        """Expected points of the best legal starting XI"""
+        cache_key = (gameweek, frozenset(squad))
+        if cache_key in self._xi_cache:
+            return self._xi_cache[cache_key]
+
+        by_position: Dict[str, List[float]] = {}
+        for player in squad.values():
+            position = 'GK' if player.position in GOALKEEPER_POSITIONS else player.position
+            by_position.setdefault(position, []).append(points.get(player.id, 0.0))
+        for values in by_position.values():
+            values.sort(reverse=True)
+
+        # The minimum per position first, then the best remaining outfielders
+        total = sum(by_position.get('GK', [0.0])[:1])
+        rest = []
+        for position, minimum in MIN_STARTERS.items():
+            values = by_position.get(position, [])
+            total += sum(values[:minimum])
+            rest.extend(values[minimum:])
+        rest.sort(reverse=True)
+        total += sum(rest[:10 - sum(MIN_STARTERS.values())])
+
+        self._xi_cache[cache_key] = total
+        return total
+
+    def _next_free_transfers(self, free_transfers: int, used: int) -> int:
+        return min(max(free_transfers - used, 0) + 1, self.MAX_FREE_TRANSFERS)
+
+    def _expand(self, state: _State, gameweek: int, pool: List[Player],
+                lookahead: Dict[int, float], deadline: Optional[float] = None) -> List:
+        cache_key = (gameweek, state.key())
+        if cache_key in self._expansion_cache:
+            return self._expansion_cache[cache_key]
+
+        team = Team(
+            budget=state.bank / 10,
+            players=list(state.squad.values()),
+            formation='',
+            free_transfers=state.free_transfers
+        )
+        plans = self.optimizer.plan_transfers(
+            team, pool,
+            max_transfers=self.max_transfers_per_week,
+            top_n=self.branching,
+            points=lookahead,
+            deadline=deadline
+        )
+        # A search the deadline cut short is not the state's full expansion
+        if deadline is None or time.monotonic() < deadline:
+            self._expansion_cache[cache_key] = plans
+        return plans
+
+    def _advance(self, state: _State, gameweek: int, transfers: List[Tuple[Player, Player]],
+                 points: Dict[int, float]) -> _State:
+        squad = dict(state.squad)
+        bank = state.bank
+        for player_out, player_in in transfers:
+            del squad[player_out.id]
+            squad[player_in.id] = player_in
+            bank += int(round(player_out.price * 10)) - int(round(player_in.price * 10))
+
+        hit_cost = max(0, len(transfers) - state.free_transfers) * self.optimizer.HIT_COST
+        expected = self._xi_points(squad, gameweek, points)
+        step = PlanStep(
+            gameweek=gameweek,
+            transfers=list(transfers),
+            hit_cost=hit_cost,
+            free_transfers=state.free_transfers,
+            bank=bank / 10,
+            expected_points=expected
+        )
+        return _State(
+            squad=squad,
+            bank=bank,
+            free_transfers=self._next_free_transfers(state.free_transfers, len(transfers)),
+            score=state.score + expected - hit_cost,
+            steps=state.steps + [step]
+        )
+
+    def plan(self, team: Team, available_players: List[Player],
+             gameweek_points: Dict[int, Dict[int, float]],
+             prices: Optional[Dict[int, Dict[int, float]]] = None,
+             time_budget: Optional[float] = None) -> SeasonPlan:
+        """Best transfer sequence over the gameweeks in gameweek_points
+
+        gameweek_points maps gameweek -> player id -> expected points, and
+        its keys set the horizon (3-8 gameweeks works well). prices
+        optionally maps gameweek -> player id -> projected price for price
+        changes. With a time_budget in seconds the search, including the
+        expansion in progress, stops once it runs out and finishes the best
+        states by rolling transfers.
+        """
+        deadline = time.monotonic() + time_budget if time_budget is not None else None
+        self._xi_cache.clear()
+        self._expansion_cache.clear()
+        gameweeks = sorted(gameweek_points)
+        prices = prices or {}
+
+        def at_prices(player: Player, gameweek: int) -> Player:
+            price = prices.get(gameweek, {}).get(player.id)
+            return player if price is None or price == player.price else replace(player, price=price)
+
+        beam = [_State(
+            squad={p.id: p for p in team.players},
+            bank=int(round(team.budget * 10)),
+            free_transfers=team.free_transfers,
+            score=0.0,
+            steps=[]
+        )]
+        complete = True
+
+        for step_index, gameweek in enumerate(gameweeks):
+            points = gameweek_points[gameweek]
+            squad_prices = {
+                (p.id, gameweek): at_prices(p, gameweek)
+                for state in beam for p in state.squad.values()
+            }
+            beam = [
+                replace(state, squad={pid: squad_prices[(pid, gameweek)] for pid in state.squad})
+                for state in beam
+            ]
+
+            if not complete or (deadline is not None and time.monotonic() >= deadline):
+                # Out of time: carry every state forward without transfers
+                complete = False
+                beam = [self._advance(state, gameweek, [], points) for state in beam]
+                continue
+
+            pool = [at_prices(p, gameweek) for p in available_players]
+            lookahead: Dict[int, float] = {}
+            for later in gameweeks[step_index:]:
+                for player_id, value in gameweek_points[later].items():
+                    lookahead[player_id] = lookahead.get(player_id, 0.0) + value
+
+            children: Dict[Hashable, _State] = {}
+            for expanded, state in enumerate(beam, 1):
+                plans = self._expand(state, gameweek, pool, lookahead, deadline)
+                options = [[]] + [plan.transfers for plan in plans if plan.transfers]
+                for transfers in options:
+                    child = self._advance(state, gameweek, transfers, points)
+                    key = child.key()
+                    if key not in children or child.score > children[key].score:
+                        children[key] = child
+                if deadline is not None and time.monotonic() >= deadline:
+                    complete = False
+                    # Unexpanded states still roll their transfer this week
+                    for remaining in beam[expanded:]:
+                        child = self._advance(remaining, gameweek, [], points)
+                        key = child.key()
+                        if key not in children or child.score > children[key].score:
+                            children[key] = child
+                    break
+
+            beam = sorted(children.values(), key=lambda s: s.score, reverse=True)[:self.beam_width]
+
+        best = max(beam, key=lambda s: s.score)
+        return SeasonPlan(steps=best.steps, total_points=best.score, complete=complete)
@@ -1,10 +1,17 @@
+import json
+import hashlib
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 import logging
 from src.models.prediction import PlayerPrediction
+from src.utils.fixture_index import FixtureIndex
 
 class PredictionEngine:
+    HISTORY_STATS = ['total_points', 'minutes', 'goals_scored', 'assists', 'clean_sheets']
+    RECENT_WEIGHTS = [0.1, 0.15, 0.2, 0.25, 0.3]  # Most recent games count more
+    MODEL_VERSION = 2  # Bump when the prediction formulas change to invalidate fingerprints
+
     def __init__(self):
         self.position_weights = {
             'GKP': {'clean_sheet': 4, 'save': 0.33, 'penalty_save': 5},
@@ -13,8 +20,23 @@ class PredictionEngine:
             'FWD': {'goal': 4, 'assist': 3}
         }
 
+    def per_game_history(self, player_history: List[Dict]) -> List[Dict]:
+        """Split stored gameweek rows into one row per game
+
+        A double gameweek is stored as one row covering both fixtures; it
+        becomes that many games, each with an even share of the stats.
+        """
+        games = []
+        for row in player_history:
+            fixtures = row.get('fixtures', 1)
+            if fixtures > 1:
+                row = {**row, **{stat: row[stat] / fixtures for stat in self.HISTORY_STATS}}
+            games.extend([row] * max(fixtures, 1))
+        return games
+
     def calculate_form_metrics(self, player_history: List[Dict], player: Dict) -> Dict:
         """Calculate form metrics considering both recent and season-long performance"""
+        player_history = self.per_game_history(player_history)
         recent_games = player_history[-5:] if player_history else []
         
         if not recent_games:
@@ -34,7 +56,7 @@ class PredictionEngine:
         season_points_per_game = sum(g['total_points'] for g in player_history) / total_games if total_games > 0 else 0
         
         # Recent form with weighted last 5 games
-        weights = [0.1, 0.15, 0.2, 0.25, 0.3]  # Most recent games count more
+        weights = self.RECENT_WEIGHTS
         points = [g['total_points'] for g in recent_games]
         weighted_recent_form = sum(p * w for p, w in zip(points, weights[-len(points):]))
         
@@ -135,10 +157,15 @@ class PredictionEngine:
                           player: Dict, 
                           player_history: List[Dict], 
                           fixture: Dict,
-                          gameweek: int) -> PlayerPrediction:
-        """Generate complete prediction for a player"""
+                          gameweek: int,
+                          team_id: Optional[int] = None) -> PlayerPrediction:
+        """Generate complete prediction for a player
+
+        team_id is the player's club id; player['team'] is used when it is
+        omitted, so it must then hold the id rather than the club name.
+        """
         form_metrics = self.calculate_form_metrics(player_history, player)
-        is_home = fixture['team_h'] == player['team']
+        is_home = fixture['team_h'] == (player['team'] if team_id is None else team_id)
         fixture_difficulty = self.calculate_fixture_difficulty(fixture, is_home)
         
         # Calculate base prediction
@@ -183,4 +210,299 @@ class PredictionEngine:
             minutes_probability=minutes_prob,
             prediction_date=datetime.now(),
             actual_points=None
-        )
\ No newline at end of file
+        )
+
+    def build_history_matrix(self, player_histories: List[List[Dict]]) -> Dict[str, np.ndarray]:
+        """Stack histories into players x games matrices, one per stat
+
+        Rows are right-aligned so the last column is each player's most
+        recent game; missing games are NaN. There are always at least
+        five columns. Double gameweeks count as one column per game.
+        """
+        player_histories = [self.per_game_history(history) for history in player_histories]
+        width = max([len(self.RECENT_WEIGHTS)] + [len(h) for h in player_histories])
+        matrix = {
+            stat: np.full((len(player_histories), width), np.nan)
+            for stat in self.HISTORY_STATS
+        }
+        for i, history in enumerate(player_histories):
+            if not history:
+                continue
+            offset = width - len(history)
+            for stat in self.HISTORY_STATS:
+                matrix[stat][i, offset:] = [g[stat] for g in history]
+        return matrix
+
+    def build_fixture_arrays(self, team_ids: List[int], fixtures: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-player (base difficulty, is_home) arrays for one fixture each
+
+        team_ids are the players' club ids, aligned with fixtures.
+        """
+        is_home = np.array([f['team_h'] == team_id for team_id, f in zip(team_ids, fixtures)], dtype=bool)
+        difficulty = np.array([
+            f['team_h_difficulty'] if home else f['team_a_difficulty']
+            for f, home in zip(fixtures, is_home)
+        ], dtype=float)
+        return difficulty, is_home
+
+    def calculate_form_metrics_batch(self, history: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Vectorized calculate_form_metrics over a history matrix
+
+        Sums over recent games run column by column in game order so the
+        floating point results match the scalar path exactly.
+        """
+        points = history['total_points']
+        total_games = (~np.isnan(points)).sum(axis=1)
+        has_games = total_games > 0
+        zeros = np.zeros(len(points))
+
+        season_ppg = np.divide(np.nansum(points, axis=1), total_games, out=zeros.copy(), where=has_games)
+
+        n_recent = len(self.RECENT_WEIGHTS)
+        recent = {stat: history[stat][:, -n_recent:] for stat in self.HISTORY_STATS}
+        recent_valid = ~np.isnan(recent['total_points'])
+        recent_count = recent_valid.sum(axis=1)
+        recent_points = np.where(recent_valid, recent['total_points'], 0)
+
+        weighted_recent_form = zeros.copy()
+        for j, weight in enumerate(self.RECENT_WEIGHTS):
+            weighted_recent_form = weighted_recent_form + recent_points[:, j] * weight
+        combined_form = (weighted_recent_form * 0.6) + (season_ppg * 0.4)
+
+        points_sum = zeros.copy()
+        for j in range(n_recent):
+            points_sum = points_sum + recent_points[:, j]
+        points_mean = np.divide(points_sum, recent_count, out=zeros.copy(), where=has_games)
+        deviations = np.where(recent_valid, recent_points - points_mean[:, None], 0)
+        squares_sum = zeros.copy()
+        for j in range(n_recent):
+            squares_sum = squares_sum + deviations[:, j] * deviations[:, j]
+        points_std = np.sqrt(np.divide(squares_sum, recent_count, out=zeros.copy(), where=has_games))
+
+        def recent_sum(stat):
+            return np.nansum(recent[stat], axis=1)
+
+        return {
+            'avg_points': np.where(has_games, combined_form, 0),
+            'season_ppg': season_ppg,
+            'minutes_played': np.divide(recent_sum('minutes'), recent_count, out=zeros.copy(), where=has_games),
+            'goals_scored': recent_sum('goals_scored'),
+            'assists': recent_sum('assists'),
+            'clean_sheets': recent_sum('clean_sheets'),
+            'form_stability': np.where(has_games, 1 - (points_std / np.maximum(combined_form, 1)), 0),
+            'total_games': total_games
+        }
+
+    def _predict_arrays(self,
+                        players: List[Dict],
+                        form_metrics: Dict[str, np.ndarray],
+                        base_difficulty: np.ndarray,
+                        is_home: np.ndarray) -> Dict[str, np.ndarray]:
+        """Array form of generate_prediction
+
+        Player-level inputs are shaped (players,) and are broadcast along any
+        trailing axes of the fixture arrays.
+        """
+        extra_dims = (1,) * (base_difficulty.ndim - 1)
+
+        def per_player(values):
+            return np.asarray(values).reshape(len(players), *extra_dims)
+
+        season_ppg = per_player(form_metrics['season_ppg'])
+        stability = per_player(form_metrics['form_stability'])
+        minutes_played = per_player(form_metrics['minutes_played'])
+        fixture_difficulty = (base_difficulty * np.where(is_home, 0.9, 1.0)) * 0.8
+        fixture_factor = 1 - fixture_difficulty / 5
+
+        positions = np.array([p['position'] for p in players])
+        weights = [self.position_weights[position] for position in positions]
+        defensive = per_player(np.isin(positions, ['GKP', 'DEF']))
+        is_mid = per_player(positions == 'MID')
+
+        def weight_array(key):
+            return per_player(np.array([w.get(key, 0) for w in weights], dtype=float))
+
+        # Defensive players
+        clean_sheet_base = np.maximum(0, fixture_factor)
+        def_clean_sheet = clean_sheet_base * stability * (0.7 + (0.3 * np.minimum(season_ppg / 4, 1)))
+        def_points = 2 + (def_clean_sheet * weight_array('clean_sheet'))
+
+        # Attacking players
+        goal_prob = ((per_player(form_metrics['goals_scored']) / 5) * 0.6 +
+                     (season_ppg / 10) * 0.4) * fixture_factor
+        assist_prob = ((per_player(form_metrics['assists']) / 5) * 0.6 +
+                       (season_ppg / 15) * 0.4) * fixture_factor
+        att_points = 2 + goal_prob * weight_array('goal')
+        att_points = att_points + assist_prob * weight_array('assist')
+        mid_clean_sheet = clean_sheet_base * stability * 0.5
+        att_points = np.where(is_mid, att_points + mid_clean_sheet * weight_array('clean_sheet'), att_points)
+
+        base_points = np.where(defensive, def_points, att_points)
+
+        season_factor = season_ppg / np.maximum(base_points, 1)
+        adjusted_points = base_points * (0.7 + (0.3 * season_factor))
+        minutes_prob = minutes_played / 90
+        predicted_points = adjusted_points * minutes_prob
+        consistent = (per_player(form_metrics['total_games']) > 5) & (season_ppg > 5)
+        predicted_points = np.where(consistent, (predicted_points * 0.7) + (season_ppg * 0.3), predicted_points)
+
+        confidence = (np.minimum(minutes_played / 90, 1) * 0.3 +
+                      stability * 0.3 +
+                      np.minimum(season_ppg / 6, 1) * 0.2 +
+                      fixture_factor * 0.2)
+
+        shape = fixture_difficulty.shape
+        return {
+            'predicted_points': predicted_points,
+            'confidence_score': np.minimum(np.maximum(confidence, 0), 1),
+            'form_score': np.broadcast_to(stability, shape),
+            'fixture_difficulty': fixture_difficulty,
+            'expected_goals': np.where(defensive, 0, goal_prob),
+            'expected_assists': np.where(defensive, 0, assist_prob),
+            'clean_sheet_probability': np.where(defensive, def_clean_sheet, np.where(is_mid, mid_clean_sheet, 0)),
+            'minutes_probability': np.broadcast_to(minutes_prob, shape)
+        }
+
+    def _to_predictions(self, players: List[Dict], gameweeks: List[int],
+                        arrays: Dict[str, np.ndarray]) -> List[PlayerPrediction]:
+        """Turn (players, gameweeks) result arrays into PlayerPrediction rows"""
+        prediction_date = datetime.now()
+        columns = {name: values.tolist() for name, values in arrays.items()}
+        return [
+            PlayerPrediction(
+                player_id=player['id'],
+                gameweek=gameweek,
+                predicted_points=columns['predicted_points'][i][j],
+                confidence_score=columns['confidence_score'][i][j],
+                form_score=columns['form_score'][i][j],
+                fixture_difficulty=columns['fixture_difficulty'][i][j],
+                expected_goals=columns['expected_goals'][i][j],
+                expected_assists=columns['expected_assists'][i][j],
+                clean_sheet_probability=columns['clean_sheet_probability'][i][j],
+                minutes_probability=columns['minutes_probability'][i][j],
+                prediction_date=prediction_date,
+                actual_points=None
+            )
+            for i, player in enumerate(players)
+            for j, gameweek in enumerate(gameweeks)
+        ]
+
+    def generate_predictions_batch(self,
+                                   players: List[Dict],
+                                   history: Dict[str, np.ndarray],
+                                   base_difficulty: np.ndarray,
+                                   is_home: np.ndarray,
+                                   gameweek: int) -> List[PlayerPrediction]:
+        """Generate predictions for many players in one set of array operations
+
+        history comes from build_history_matrix and the fixture arrays from
+        build_fixture_arrays. Results match generate_prediction player by
+        player.
+        """
+        if not players:
+            return []
+
+        form_metrics = self.calculate_form_metrics_batch(history)
+        arrays = self._predict_arrays(players, form_metrics, base_difficulty, is_home)
+        return self._to_predictions(
+            players, [gameweek], {name: values[:, None] for name, values in arrays.items()}
+        )
+
+    def build_horizon_fixture_arrays(self,
+                                     team_ids: List[int],
+                                     fixture_index: FixtureIndex,
+                                     gameweeks: List[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(base difficulty, is_home, has_fixture) arrays shaped players x gameweeks x fixtures
+
+        The last axis is as wide as the busiest double gameweek; unused
+        slots (and blanks) have has_fixture False.
+        """
+        slots = max([1] + [
+            len(fixture_index.fixtures_for(team_id, gameweek))
+            for team_id in set(team_ids) for gameweek in gameweeks
+        ])
+        shape = (len(team_ids), len(gameweeks), slots)
+        difficulty = np.full(shape, np.nan)
+        is_home = np.zeros(shape, dtype=bool)
+        has_fixture = np.zeros(shape, dtype=bool)
+        for i, team_id in enumerate(team_ids):
+            for j, gameweek in enumerate(gameweeks):
+                for k, fixture in enumerate(fixture_index.fixtures_for(team_id, gameweek)):
+                    home = fixture['team_h'] == team_id
+                    difficulty[i, j, k] = fixture['team_h_difficulty'] if home else fixture['team_a_difficulty']
+                    is_home[i, j, k] = home
+                    has_fixture[i, j, k] = True
+        return difficulty, is_home, has_fixture
+
+    def fingerprint_inputs(self,
+                           player: Dict,
+                           player_history: List[Dict],
+                           team_id: int,
+                           fixture_index: FixtureIndex,
+                           gameweeks: List[int]) -> Dict[int, str]:
+        """Hash everything a player's prediction depends on, per gameweek
+
+        A prediction only needs recomputing when its hash changes.
+        """
+        base = hashlib.sha1(json.dumps([
+            self.MODEL_VERSION,
+            player['position'],
+            [[g[stat] for stat in self.HISTORY_STATS] for g in self.per_game_history(player_history)]
+        ], separators=(',', ':')).encode())
+
+        fingerprints = {}
+        for gameweek in gameweeks:
+            digest = base.copy()
+            digest.update(json.dumps([
+                [f['team_h'] == team_id, f['team_h_difficulty'], f['team_a_difficulty']]
+                for f in fixture_index.fixtures_for(team_id, gameweek)
+            ], separators=(',', ':')).encode())
+            fingerprints[gameweek] = digest.hexdigest()
+        return fingerprints
+
+    def generate_horizon_predictions(self,
+                                     players: List[Dict],
+                                     history: Dict[str, np.ndarray],
+                                     team_ids: List[int],
+                                     fixture_index: FixtureIndex,
+                                     gameweeks: List[int]) -> List[PlayerPrediction]:
+        """Predict every player for each of the given gameweeks in one pass
+
+        Double gameweeks sum points and expected goals/assists over both
+        fixtures; a blank gameweek is a certain zero.
+        """
+        if not players or not gameweeks:
+            return []
+
+        form_metrics = self.calculate_form_metrics_batch(history)
+        difficulty, is_home, has_fixture = self.build_horizon_fixture_arrays(
+            team_ids, fixture_index, gameweeks
+        )
+        arrays = self._predict_arrays(players, form_metrics, difficulty, is_home)
+
+        fixture_count = has_fixture.sum(axis=2)
+        playing = fixture_count > 0
+
+        def total(values):
+            return np.where(has_fixture, values, 0).sum(axis=2)
+
+        def mean(values, blank_value):
+            return np.divide(total(values), fixture_count,
+                             out=np.full(fixture_count.shape, float(blank_value)), where=playing)
+
+        combined = {
+            'predicted_points': total(arrays['predicted_points']),
+            'expected_goals': total(arrays['expected_goals']),
+            'expected_assists': total(arrays['expected_assists']),
+            # Chance of keeping at least one clean sheet across a double
+            'clean_sheet_probability': np.where(
+                fixture_count > 1,
+                1 - np.where(has_fixture, 1 - arrays['clean_sheet_probability'], 1).prod(axis=2),
+                total(arrays['clean_sheet_probability'])
+            ),
+            'fixture_difficulty': mean(arrays['fixture_difficulty'], 0),
+            'confidence_score': mean(arrays['confidence_score'], 1),
+            'form_score': arrays['form_score'][:, :, 0],
+            'minutes_probability': np.where(playing, arrays['minutes_probability'][:, :, 0], 0)
+        }
+        return self._to_predictions(players, gameweeks, combined)
@@ -1,14 +1,31 @@
+import os
+import hashlib
+import logging
 import numpy as np
-from typing import List, Dict
+import joblib
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Hashable, Optional, Tuple
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from src.models.player import Player
+from src.config import MODEL_DIR, MODEL_KEEP
 
 class FPLPredictor:
+    ARTIFACT_VERSION = 1
+    FEATURE_SCHEMA = [
+        'form', 'avg_minutes', 'avg_goals', 'avg_assists', 'avg_clean_sheets',
+        'price', 'home_ratio', 'avg_difficulty'
+    ]
+
     def __init__(self):
         self.model = RandomForestRegressor(n_estimators=100, random_state=42)
         self.scaler = StandardScaler()
         self.is_trained = False
+        self.training_hash: Optional[str] = None
+        self.trained_at: Optional[datetime] = None
+        self._insights_key: Optional[Tuple] = None
+        self._insights_cache: Dict[int, Dict] = {}
 
     def _create_feature_vector(self, player: Player) -> List[float]:
         """Create a feature vector for a player"""
@@ -29,8 +46,8 @@ class FPLPredictor:
         ]
         return features
 
-    def train(self, players: List[Player]):
-        """Train the prediction model"""
+    def _training_data(self, players: List[Player]) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the feature matrix and target vector used for training"""
         X = []  # Features
         y = []  # Target (points)
 
@@ -42,8 +59,22 @@ class FPLPredictor:
         if not X:
             raise ValueError("No valid training data found")
 
-        X = np.array(X)
-        y = np.array(y)
+        return np.array(X, dtype=float), np.array(y, dtype=float)
+
+    def _hash_training_data(self, X: np.ndarray, y: np.ndarray) -> str:
+        digest = hashlib.sha1()
+        digest.update(f"{self.ARTIFACT_VERSION}:{','.join(self.FEATURE_SCHEMA)}".encode())
+        digest.update(np.ascontiguousarray(X).tobytes())
+        digest.update(np.ascontiguousarray(y).tobytes())
+        return digest.hexdigest()
+
+    def training_data_hash(self, players: List[Player]) -> str:
+        """Hash of the training set, used to decide whether to retrain"""
+        return self._hash_training_data(*self._training_data(players))
+
+    def train(self, players: List[Player]):
+        """Train the prediction model"""
+        X, y = self._training_data(players)
 
         # Scale features
         X_scaled = self.scaler.fit_transform(X)
@@ -51,16 +82,102 @@ class FPLPredictor:
         # Train model
         self.model.fit(X_scaled, y)
         self.is_trained = True
+        self.training_hash = self._hash_training_data(X, y)
+        self.trained_at = datetime.now()
 
-    def predict_points(self, player: Player) -> Dict:
-        """Predict points for a player"""
+    @classmethod
+    def artifact_path(cls, training_hash: str, model_dir: Path = MODEL_DIR) -> Path:
+        return Path(model_dir) / f"fpl_predictor-v{cls.ARTIFACT_VERSION}-{training_hash[:16]}.joblib"
+
+    def save(self, model_dir: Path = MODEL_DIR, keep: int = MODEL_KEEP) -> Path:
+        """Write the trained model and its metadata to a versioned artifact
+
+        Only the newest keep artifacts are left in model_dir afterwards.
+        """
         if not self.is_trained:
             raise ValueError("Model needs to be trained first")
 
-        features = self._create_feature_vector(player)
-        features_scaled = self.scaler.transform([features])
-        predicted_points = self.model.predict(features_scaled)[0]
+        Path(model_dir).mkdir(parents=True, exist_ok=True)
+        path = self.artifact_path(self.training_hash, model_dir)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        # Uncompressed, which loads fastest
+        joblib.dump({
+            'version': self.ARTIFACT_VERSION,
+            'feature_schema': self.FEATURE_SCHEMA,
+            'training_hash': self.training_hash,
+            'trained_at': self.trained_at.isoformat(),
+            'model': self.model,
+            'scaler': self.scaler
+        }, tmp_path)
+        os.replace(tmp_path, path)
+        self.prune(model_dir, keep, path)
+        return path
+
+    @classmethod
+    def _artifacts(cls, model_dir: Path) -> List[Path]:
+        """Artifacts of this version in model_dir, oldest first"""
+        return sorted(
+            Path(model_dir).glob(f"fpl_predictor-v{cls.ARTIFACT_VERSION}-*.joblib"),
+            key=lambda p: p.stat().st_mtime
+        )
+
+    @classmethod
+    def prune(cls, model_dir: Path = MODEL_DIR, keep: int = MODEL_KEEP,
+              current: Optional[Path] = None):
+        """Delete all but the newest keep artifacts, never current"""
+        artifacts = cls._artifacts(model_dir)
+        for path in artifacts[:max(len(artifacts) - keep, 0)]:
+            if path == current:
+                continue
+            try:
+                path.unlink()
+            except OSError as e:
+                logging.warning(f"Could not delete model artifact {path}: {str(e)}")
+
+    @classmethod
+    def load(cls, path: Path) -> 'FPLPredictor':
+        """Load a saved artifact
+
+        Not memory-mapped: sklearn's trees copy their node arrays when
+        unpickled, so mapping the file would save nothing.
+        """
+        artifact = joblib.load(path)
+        if artifact.get('version') != cls.ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported model artifact version: {artifact.get('version')}")
+        if artifact.get('feature_schema') != cls.FEATURE_SCHEMA:
+            raise ValueError("Model artifact feature schema does not match")
+
+        predictor = cls()
+        predictor.model = artifact['model']
+        predictor.scaler = artifact['scaler']
+        predictor.training_hash = artifact['training_hash']
+        predictor.trained_at = datetime.fromisoformat(artifact['trained_at'])
+        predictor.is_trained = True
+        return predictor
+
+    @classmethod
+    def load_latest(cls, model_dir: Path = MODEL_DIR) -> Optional['FPLPredictor']:
+        """Load the most recently written artifact, if there is one"""
+        paths = cls._artifacts(model_dir)
+        return cls.load(paths[-1]) if paths else None
+
+    @classmethod
+    def load_or_train(cls, players: List[Player], model_dir: Path = MODEL_DIR) -> 'FPLPredictor':
+        """Reuse the artifact for this training set, training only if it changed"""
+        predictor = cls()
+        training_hash = predictor.training_data_hash(players)
+        path = cls.artifact_path(training_hash, model_dir)
+        if path.exists():
+            try:
+                return cls.load(path)
+            except Exception as e:
+                logging.warning(f"Could not load model artifact {path}: {str(e)}")
+
+        predictor.train(players)
+        predictor.save(model_dir)
+        return predictor
 
+    def _prediction_dict(self, player: Player, predicted_points: float) -> Dict:
         return {
             'player_id': player.id,
             'name': player.name,
@@ -70,9 +187,29 @@ class FPLPredictor:
             'position': player.position,
         }
 
-    def get_player_insights(self, player: Player) -> Dict:
-        """Get detailed insights for a player"""
-        prediction = self.predict_points(player)
+    def predict_points(self, player: Player) -> Dict:
+        """Predict points for a player"""
+        if not self.is_trained:
+            raise ValueError("Model needs to be trained first")
+
+        features = self._create_feature_vector(player)
+        features_scaled = self.scaler.transform([features])
+        predicted_points = self.model.predict(features_scaled)[0]
+
+        return self._prediction_dict(player, predicted_points)
+
+    def predict_points_batch(self, players: List[Player]) -> List[Dict]:
+        """Predict points for many players with a single model call"""
+        if not self.is_trained:
+            raise ValueError("Model needs to be trained first")
+        if not players:
+            return []
+
+        features = np.array([self._create_feature_vector(p) for p in players], dtype=float)
+        predicted = self.model.predict(self.scaler.transform(features))
+        return [self._prediction_dict(player, points) for player, points in zip(players, predicted)]
+
+    def _insights(self, player: Player, prediction: Dict) -> Dict:
         recent_minutes = player.minutes[-5:] if player.minutes else []
         
         insights = {
@@ -88,4 +225,32 @@ class FPLPredictor:
                 } for f in player.fixtures[:5]
             ]
         }
-        return insights
\ No newline at end of file
+        return insights
+
+    def get_player_insights(self, player: Player) -> Dict:
+        """Get detailed insights for a player"""
+        return self._insights(player, self.predict_points(player))
+
+    def get_player_insights_batch(self, players: List[Player],
+                                  snapshot: Optional[Hashable] = None) -> Dict[int, Dict]:
+        """Insights for many players from one vectorized inference pass
+
+        With a snapshot key (e.g. the gameweek or data version), results are
+        memoized per (model, snapshot, player) so repeated calls only run
+        inference for players not seen before.
+        """
+        if snapshot is None:
+            predictions = self.predict_points_batch(players)
+            return {p.id: self._insights(p, pred) for p, pred in zip(players, predictions)}
+
+        cache_key = (self.training_hash, snapshot)
+        if self._insights_key != cache_key:
+            self._insights_key = cache_key
+            self._insights_cache = {}
+
+        missing = {p.id: p for p in players if p.id not in self._insights_cache}
+        if missing:
+            predictions = self.predict_points_batch(list(missing.values()))
+            for player, prediction in zip(missing.values(), predictions):
+                self._insights_cache[player.id] = self._insights(player, prediction)
+        return {p.id: self._insights_cache[p.id] for p in players}
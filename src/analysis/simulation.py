@@ -0,0 +1,136 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.models.prediction import PlayerPrediction
+
+# FPL scoring per event by position
+GOAL_POINTS = {'GKP': 6, 'DEF': 6, 'MID': 5, 'FWD': 4}
+ASSIST_POINTS = 3
+CLEAN_SHEET_POINTS = {'GKP': 4, 'DEF': 4, 'MID': 1, 'FWD': 0}
+APPEARANCE_POINTS = 2
+
+@dataclass
+class SimulationResult:
+    player_ids: List[int]
+    samples: np.ndarray  # players x simulations
+
+    def row(self, player_id: int) -> np.ndarray:
+        return self.samples[self.player_ids.index(player_id)]
+
+    def means(self) -> Dict[int, float]:
+        return dict(zip(self.player_ids, self.samples.mean(axis=1).tolist()))
+
+    def percentiles(self, q: Sequence[float] = (10, 25, 50, 75, 90)) -> Dict[int, Dict[float, float]]:
+        """Per-player points at each requested percentile"""
+        values = np.percentile(self.samples, q, axis=1).T
+        return {
+            player_id: dict(zip(q, row.tolist()))
+            for player_id, row in zip(self.player_ids, values)
+        }
+
+    def beat_probabilities(self) -> np.ndarray:
+        """P(player i outscores player j), shaped players x players"""
+        return (self.samples[:, None, :] > self.samples[None, :, :]).mean(axis=2)
+
+    def top_scorer_probabilities(self) -> Dict[int, float]:
+        """Chance each player is the (first-listed, on ties) highest scorer"""
+        winners = self.samples.argmax(axis=0)
+        counts = np.bincount(winners, minlength=len(self.player_ids))
+        return dict(zip(self.player_ids, (counts / self.samples.shape[1]).tolist()))
+
+    def squad_totals(self, captain_id: Optional[int] = None,
+                     player_ids: Optional[List[int]] = None) -> np.ndarray:
+        """Simulated squad total per run, with the captain's points doubled"""
+        rows = [self.player_ids.index(pid) for pid in (player_ids or self.player_ids)]
+        totals = self.samples[rows].sum(axis=0)
+        if captain_id is not None:
+            totals = totals + self.row(captain_id)
+        return totals
+
+
+class PointsSimulator:
+    """Monte Carlo simulation of gameweek points from PlayerPrediction fields
+
+    Each run draws whether a player appears, Poisson goals and assists, and
+    one clean-sheet draw per club shared by all its players. Every player's
+    distribution is shifted so its mean equals predicted_points, leaving the
+    event model to shape the spread.
+    """
+
+    def __init__(self, n_simulations: int = 20000, seed: Optional[int] = None):
+        self.n_simulations = n_simulations
+        self.seed = seed
+
+    def simulate(self,
+                 predictions: List[PlayerPrediction],
+                 positions: Dict[int, str],
+                 clubs: Dict[int, int],
+                 rng: Optional[np.random.Generator] = None) -> SimulationResult:
+        rng = rng or np.random.default_rng(self.seed)
+        n, runs = len(predictions), self.n_simulations
+        player_ids = [p.player_id for p in predictions]
+        if not predictions:
+            return SimulationResult(player_ids, np.zeros((0, runs)))
+
+        def column(values):
+            return np.array(values, dtype=float)[:, None]
+
+        play_prob = np.clip(column([p.minutes_probability for p in predictions]), 0, 1)
+        expected_goals = np.clip(column([p.expected_goals for p in predictions]), 0, None)
+        expected_assists = np.clip(column([p.expected_assists for p in predictions]), 0, None)
+        clean_sheet_prob = np.clip(column([p.clean_sheet_probability for p in predictions]), 0, 1)
+        goal_points = column([GOAL_POINTS[positions[pid]] for pid in player_ids])
+        clean_sheet_points = column([CLEAN_SHEET_POINTS[positions[pid]] for pid in player_ids])
+
+        plays = rng.random((n, runs)) < play_prob
+        goals = rng.poisson(np.broadcast_to(expected_goals, (n, runs)))
+        assists = rng.poisson(np.broadcast_to(expected_assists, (n, runs)))
+
+        # Teammates share one uniform draw, so their clean sheets coincide
+        club_ids = sorted({clubs[pid] for pid in player_ids})
+        club_rows = np.array([club_ids.index(clubs[pid]) for pid in player_ids])
+        club_draws = rng.random((len(club_ids), runs))
+        clean_sheets = club_draws[club_rows] < clean_sheet_prob
+
+        points = np.where(
+            plays,
+            APPEARANCE_POINTS + goals * goal_points + assists * ASSIST_POINTS
+            + clean_sheets * clean_sheet_points,
+            0
+        ).astype(float)
+
+        # Shift appearances so the mean matches the point estimate
+        event_mean = play_prob * (APPEARANCE_POINTS + expected_goals * goal_points
+                                  + expected_assists * ASSIST_POINTS
+                                  + clean_sheet_prob * clean_sheet_points)
+        target = column([p.predicted_points for p in predictions])
+        residual = np.divide(target - event_mean, play_prob,
+                             out=np.zeros_like(target), where=play_prob > 0)
+        points = points + np.where(plays, residual, 0)
+
+        return SimulationResult(player_ids, points)
+
+    def simulate_squads(self,
+                        squads: List[Tuple[List[PlayerPrediction], Dict[int, str], Dict[int, int]]],
+                        max_workers: Optional[int] = None) -> List[SimulationResult]:
+        """Simulate many squads across a process pool
+
+        Each squad gets its own child seed, so results are reproducible
+        regardless of how work is scheduled.
+        """
+        seeds = np.random.SeedSequence(self.seed).spawn(len(squads))
+        jobs = [
+            (self.n_simulations, seed, predictions, positions, clubs)
+            for seed, (predictions, positions, clubs) in zip(seeds, squads)
+        ]
+        if len(jobs) <= 1:
+            return [_simulate_job(job) for job in jobs]
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(_simulate_job, jobs))
+
+
+def _simulate_job(job) -> SimulationResult:
+    n_simulations, seed, predictions, positions, clubs = job
+    simulator = PointsSimulator(n_simulations)
+    return simulator.simulate(predictions, positions, clubs, rng=np.random.default_rng(seed))
@@ -0,0 +1,169 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.sparse import csr_matrix, hstack, identity
+from src.models.prediction import PlayerPrediction
+from src.utils.bootstrap_index import BootstrapIndex
+
+SQUAD_QUOTAS = {'GKP': 2, 'DEF': 5, 'MID': 5, 'FWD': 3}
+# Fewest and most starters per position in a legal formation
+STARTER_RANGES = {'GKP': (1, 1), 'DEF': (3, 5), 'MID': (2, 5), 'FWD': (1, 3)}
+STARTING_XI = 11
+# scipy.optimize.milp status codes
+MILP_OPTIMAL = 0
+MILP_LIMIT_REACHED = 1
+MILP_INFEASIBLE = 2
+
+@dataclass
+class SquadSelection:
+    starters: List[int]
+    bench: List[int]
+    formation: str
+    expected_points: float  # starting XI
+    bench_points: float
+    cost: float
+    optimal: bool = True  # False if the time limit stopped the search early
+
+
+class SquadBuilder:
+    """Best 15-player squad under budget, quotas, club limit and formation
+
+    Selection is solved exactly as a small integer program (HiGHS through
+    scipy): one start and one bench variable per player, with the budget,
+    position quotas, formation and three-per-club rule as linear
+    constraints.
+    """
+    MAX_PLAYERS_PER_TEAM = 3
+    BENCH_WEIGHT = 0.1  # share of a substitute's points counted
+    TIME_LIMIT = 5.0  # seconds
+
+    def __init__(self, candidates: Iterable[Tuple[int, str, int, float, float]]):
+        """candidates: (player_id, position, club, price, points)"""
+        rows = [
+            (player_id, 'GKP' if position == 'GK' else position, club, price, points)
+            for player_id, position, club, price, points in candidates
+        ]
+        rows = [row for row in rows if row[1] in SQUAD_QUOTAS]
+        self.player_ids = [row[0] for row in rows]
+        self.positions = np.array([row[1] for row in rows])
+        self.clubs = np.array([row[2] for row in rows])
+        self.prices = np.array([int(round(row[3] * 10)) for row in rows])  # tenths
+        self.points = np.array([row[4] for row in rows], dtype=float)
+        self._rows = {player_id: i for i, player_id in enumerate(self.player_ids)}
+
+    @classmethod
+    def from_predictions(cls, predictions: List[PlayerPrediction],
+                         index: BootstrapIndex) -> 'SquadBuilder':
+        """Candidates scored by predicted points summed per player"""
+        points: Dict[int, float] = {}
+        for p in predictions:
+            if p.player_id in index.elements:
+                points[p.player_id] = points.get(p.player_id, 0) + p.predicted_points
+        return cls(
+            (player_id,
+             index.player_position(player_id),
+             index.elements[player_id]['team'],
+             index.elements[player_id]['now_cost'] / 10,
+             total)
+            for player_id, total in points.items()
+        )
+
+    def _constraints(self, budget: int, starters: Dict[str, Tuple[int, int]]) -> LinearConstraint:
+        n = len(self.player_ids)
+        none = np.zeros(n)
+        rows, lower, upper = [], [], []
+
+        def add(start, bench, lo, hi):
+            rows.append(np.concatenate([start, bench]))
+            lower.append(lo)
+            upper.append(hi)
+
+        add(self.prices, self.prices, 0, budget)
+        add(np.ones(n), none, STARTING_XI, STARTING_XI)
+        for position, quota in SQUAD_QUOTAS.items():
+            mask = (self.positions == position).astype(float)
+            add(mask, mask, quota, quota)
+            add(mask, none, *starters[position])
+        for club in np.unique(self.clubs):
+            mask = (self.clubs == club).astype(float)
+            add(mask, mask, 0, self.MAX_PLAYERS_PER_TEAM)
+
+        return LinearConstraint(csr_matrix(np.array(rows)), lower, upper)
+
+    def build(self, budget: float = 100.0, formation: Optional[str] = None,
+              locked: Iterable[int] = (), excluded: Iterable[int] = ()) -> SquadSelection:
+        """Select the squad with the most expected starting XI points
+
+        Substitutes count BENCH_WEIGHT of their points. formation fixes the
+        starting XI shape (e.g. '4-4-2'); by default the best is chosen.
+        Locked players are always picked and excluded ones never are.
+        If the time limit stops the search, the best squad found so far
+        is returned with optimal set to False; TimeoutError is raised if
+        there is none yet.
+        """
+        locked = set(locked)
+        excluded = set(excluded)
+        missing = locked - set(self._rows)
+        if missing:
+            raise ValueError(f"Locked players have no prediction: {sorted(missing)}")
+        if locked & excluded:
+            raise ValueError("A player cannot be both locked and excluded")
+
+        starters = dict(STARTER_RANGES)
+        if formation is not None:
+            try:
+                counts = [int(c) for c in formation.split('-')]
+            except ValueError:
+                raise ValueError(f"Invalid formation: {formation}")
+            if len(counts) != 3 or sum(counts) != STARTING_XI - 1 or not all(
+                    lo <= count <= hi for count, (lo, hi)
+                    in zip(counts, [STARTER_RANGES[p] for p in ['DEF', 'MID', 'FWD']])):
+                raise ValueError(f"Invalid formation: {formation}")
+            for position, count in zip(['DEF', 'MID', 'FWD'], counts):
+                starters[position] = (count, count)
+
+        # Each player starts, sits on the bench or is left out; locked and
+        # excluded players pin that choice
+        n = len(self.player_ids)
+        in_squad_min = np.zeros(n)
+        in_squad_max = np.ones(n)
+        for player_id in locked:
+            in_squad_min[self._rows[player_id]] = 1
+        for player_id in excluded:
+            if player_id in self._rows:
+                in_squad_max[self._rows[player_id]] = 0
+        one_role = LinearConstraint(hstack([identity(n), identity(n)]), in_squad_min, in_squad_max)
+
+        result = milp(
+            -np.concatenate([self.points, self.points * self.BENCH_WEIGHT]),
+            constraints=[self._constraints(int(round(budget * 10)), starters), one_role],
+            integrality=np.ones(2 * n),
+            bounds=Bounds(0, 1),
+            options={'time_limit': self.TIME_LIMIT}
+        )
+        if result.status == MILP_INFEASIBLE:
+            raise ValueError("No squad satisfies the budget, quotas and club limit")
+        if result.x is None:
+            if result.status == MILP_LIMIT_REACHED:
+                raise TimeoutError(f"No squad found within {self.TIME_LIMIT} seconds")
+            raise RuntimeError(f"Squad selection failed: {result.message}")
+
+        start = np.flatnonzero(result.x[:n] > 0.5)
+        bench = np.flatnonzero(result.x[n:] > 0.5)
+        order = list(SQUAD_QUOTAS)
+        start = sorted(start, key=lambda i: (order.index(self.positions[i]), -self.points[i]))
+        # Keeper first on the bench, then outfielders by expected points
+        bench = sorted(bench, key=lambda i: (self.positions[i] != 'GKP', -self.points[i]))
+        return SquadSelection(
+            starters=[self.player_ids[i] for i in start],
+            bench=[self.player_ids[i] for i in bench],
+            formation='-'.join(
+                str(sum(self.positions[i] == position for i in start))
+                for position in ['DEF', 'MID', 'FWD']
+            ),
+            expected_points=float(self.points[start].sum()),
+            bench_points=float(self.points[bench].sum()),
+            cost=int(self.prices[start].sum() + self.prices[bench].sum()) / 10,
+            optimal=result.status == MILP_OPTIMAL
+        )
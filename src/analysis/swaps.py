@@ -0,0 +1,110 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import List, Mapping, Optional, Sequence, Tuple
+from src.analysis.candidate_index import CandidateIndex
+
+@dataclass
+class SwapMatrix:
+    """Every (squad member, candidate) swap scored in one broadcast
+
+    Rows are the players going out and columns the candidates coming in,
+    taken from a CandidateIndex one position block at a time in price
+    order. Infeasible swaps (wrong position, over budget, already in the
+    squad or breaking the per-club limit) are masked out of the rankings.
+    """
+    out_ids: np.ndarray
+    in_ids: np.ndarray
+    point_gain: np.ndarray
+    price_diff: np.ndarray
+    feasible: np.ndarray
+
+    @classmethod
+    def build(cls, candidates: CandidateIndex, in_clubs: Mapping[int, int],
+              out_ids: Sequence[int], out_positions: Sequence[str], out_clubs: Sequence[int],
+              out_prices: Sequence[float], out_points: Sequence[float],
+              bank: float, max_per_club: int = 3,
+              squad_clubs: Optional[Mapping[int, int]] = None) -> 'SwapMatrix':
+        """in_clubs maps each candidate's player id to their club
+
+        squad_clubs does the same for the whole squad, when only some of it
+        is offered as outgoing rows; it defaults to the outgoing players.
+        The club limit and the already-owned check use the whole squad.
+        """
+        blocks = list(candidates.positions.items())
+        in_ids = np.concatenate([b.id_array for _, b in blocks] + [np.zeros(0, dtype=int)])
+        in_prices = np.concatenate([b.price_array for _, b in blocks] + [np.zeros(0)])
+        in_points = np.concatenate([b.score_array for _, b in blocks] + [np.zeros(0)])
+        in_clubs = np.array([in_clubs[player_id] for player_id in in_ids])
+
+        out_ids = np.asarray(out_ids, dtype=int)
+        out_clubs = np.asarray(out_clubs)
+        if squad_clubs is None:
+            squad_ids, squad_club_array = out_ids, out_clubs
+        else:
+            squad_ids = np.array(list(squad_clubs), dtype=int)
+            squad_club_array = np.array(list(squad_clubs.values()))
+        # Prices in tenths so budget checks are exact
+        out_tenths = np.rint(np.asarray(out_prices, dtype=float) * 10).astype(int)
+        in_tenths = np.rint(in_prices * 10).astype(int)
+        bank_tenths = int(round(bank * 10))
+
+        # Each squad member can only take the cheap end of their own
+        # position's block: everything priced within their sale plus bank
+        starts = np.cumsum([0] + [len(b.ids) for _, b in blocks])
+        block_of = {position: i for i, (position, _) in enumerate(blocks)}
+        lo = np.zeros(len(out_ids), dtype=int)
+        hi = np.zeros(len(out_ids), dtype=int)
+        for row, position in enumerate(out_positions):
+            i = block_of.get(position)
+            if i is None:
+                continue
+            block = in_tenths[starts[i]:starts[i + 1]]
+            lo[row] = starts[i]
+            hi[row] = starts[i] + np.searchsorted(block, out_tenths[row] + bank_tenths, side='right')
+        columns = np.arange(len(in_ids))
+        affordable = (columns[None, :] >= lo[:, None]) & (columns[None, :] < hi[:, None])
+
+        point_gain = in_points[None, :] - np.asarray(out_points, dtype=float)[:, None]
+        price_diff = (in_tenths[None, :] - out_tenths[:, None]) / 10
+
+        # Players from the incoming club after the outgoing one leaves
+        in_counts = (in_clubs[:, None] == squad_club_array[None, :]).sum(axis=1)
+        club_after = in_counts[None, :] - (out_clubs[:, None] == in_clubs[None, :])
+
+        feasible = (
+            affordable
+            & ~np.isin(in_ids, squad_ids)[None, :]
+            & (club_after < max_per_club)
+        )
+        return cls(out_ids, in_ids, point_gain, price_diff, feasible)
+
+    def top_k(self, k: int, score: Optional[np.ndarray] = None, per_out: Optional[int] = None,
+              min_score: Optional[float] = None) -> List[Tuple[int, int]]:
+        """(row, column) of the k best feasible swaps, best first
+
+        score defaults to point_gain. per_out caps how many swaps any one
+        outgoing player contributes; min_score drops swaps scoring at or
+        below it.
+        """
+        score = self.point_gain if score is None else score
+        masked = np.where(self.feasible, score, -np.inf)
+        if min_score is not None:
+            masked = np.where(masked > min_score, masked, -np.inf)
+        if masked.size == 0 or k <= 0:
+            return []
+
+        if per_out is not None and per_out < masked.shape[1]:
+            # Keep each row's best per_out, then rank across rows
+            keep = np.argpartition(-masked, per_out - 1, axis=1)[:, :per_out]
+            capped = np.full_like(masked, -np.inf)
+            rows = np.arange(masked.shape[0])[:, None]
+            capped[rows, keep] = masked[rows, keep]
+            masked = capped
+
+        flat = masked.ravel()
+        k = min(k, int(np.isfinite(flat).sum()))
+        if k == 0:
+            return []
+        best = np.argpartition(-flat, k - 1)[:k]
+        best = best[np.lexsort((best, -flat[best]))]
+        return [tuple(int(x) for x in np.unravel_index(i, masked.shape)) for i in best]
@@ -1,11 +1,24 @@
 import logging
-import requests
-from datetime import datetime
-from typing import Dict, List, Optional
+import numpy as np
+from typing import TYPE_CHECKING, Dict, List
 from src.utils.data_fetcher import FPLDataFetcher
 from src.utils.database import Database
+from src.models.prediction import PlayerPrediction
+from src.utils.bootstrap_index import BootstrapIndex
+from src.utils.fixture_index import FixtureIndex
 from src.analysis.predictions import PredictionEngine
-from src.config import DATABASE_PATH, LOG_FILE
+from src.analysis.candidate_index import CandidateIndex
+from src.analysis.swaps import SwapMatrix
+from src.analysis.simulation import PointsSimulator
+from src.analysis.lineup import LineupOptimizer
+from src.analysis.optimizer import TransferOptimizer
+from src.analysis.planner import TransferPlanner
+from src.models.player import Player
+from src.models.team import Team
+from src.config import DATABASE_PATH, LOG_FILE, PLAN_TIME_BUDGET, SIMULATION_RUNS, SIMULATION_SEED
+
+if TYPE_CHECKING:
+    from src.refresh import Snapshot
 
 logging.basicConfig(
     level=logging.INFO,
@@ -23,25 +36,108 @@ def get_current_gameweek(events):
             return event['id']
     return 1
 
-def analyze_transfers(team_id: int):
-    """Analyze team and provide transfer recommendations"""
+def get_next_gameweek(events):
+    """Get the first gameweek whose deadline has not passed
+
+    That is the event flagged is_next, so a gameweek already under way,
+    with some fixtures finished, is never predicted. Without the flag,
+    e.g. in the last gameweek, fall back to the first unfinished one.
+    """
+    for event in events:
+        if event.get('is_next'):
+            return event['id']
+    for event in events:
+        if not event.get('finished', False):
+            return event['id']
+    return events[-1]['id'] if events else 1
+
+def update_predictions(db: Database, fpl_data: Dict, index: BootstrapIndex,
+                       fixture_index: FixtureIndex, horizon: List[int]) -> List[PlayerPrediction]:
+    """Bring stored predictions up to date over the horizon and return them
+
+    Only players whose inputs changed since the last run are predicted.
+    Predictions are ordered by player, then gameweek; players without a
+    stored prediction for every horizon gameweek are left out.
+    """
+    prediction_engine = PredictionEngine()
+    histories = db.get_player_histories()
+    players = []
+    player_histories = []
+    team_ids = []
+    for element in fpl_data['elements']:
+        players.append({
+            'id': element['id'],
+            'name': element['web_name'],
+            'team': index.team_name(element['team']),
+            'position': index.position_name(element['element_type']),
+            'price': element['now_cost'] / 10,
+            'form': float(element['form'] or 0),
+            'points_per_game': float(element['points_per_game'] or 0),
+            'selected_by': float(element['selected_by_percent'] or 0)
+        })
+        player_histories.append(histories.get(element['id'], []))
+        team_ids.append(element['team'])
+    
+    # Only players whose inputs changed since the last run need predicting
+    fingerprints = [
+        prediction_engine.fingerprint_inputs(player, history, club_id, fixture_index, horizon)
+        for player, history, club_id in zip(players, player_histories, team_ids)
+    ]
+    stored_fingerprints = db.get_prediction_fingerprints(horizon)
+    stale = [
+        i for i, player in enumerate(players)
+        if any(stored_fingerprints.get((player['id'], gw)) != fingerprint
+               for gw, fingerprint in fingerprints[i].items())
+    ]
+    logging.info(f"Recomputing predictions for {len(stale)} of {len(players)} players")
+    
+    # Predict stale players over the whole horizon in one vectorized pass
+    new_predictions = prediction_engine.generate_horizon_predictions(
+        [players[i] for i in stale],
+        prediction_engine.build_history_matrix([player_histories[i] for i in stale]),
+        [team_ids[i] for i in stale],
+        fixture_index,
+        horizon
+    )
+    fingerprints_by_id = {player['id']: fp for player, fp in zip(players, fingerprints)}
+    changed_predictions = []
+    for prediction in new_predictions:
+        prediction.input_hash = fingerprints_by_id[prediction.player_id][prediction.gameweek]
+        if stored_fingerprints.get((prediction.player_id, prediction.gameweek)) != prediction.input_hash:
+            changed_predictions.append(prediction)
+    
+    # Save changed predictions to database
+    db.save_predictions_batch(changed_predictions)
+    
+    stored_predictions = {
+        (p.player_id, p.gameweek): p
+        for gw in horizon for p in db.get_gameweek_predictions(gw)
+    }
+    # A player missing any gameweek is left out rather than half-counted
+    all_predictions = []
+    missing = []
+    for player in players:
+        player_predictions = [stored_predictions.get((player['id'], gw)) for gw in horizon]
+        if None in player_predictions:
+            missing.append(player['id'])
+        else:
+            all_predictions.extend(player_predictions)
+    if missing:
+        logging.warning(f"No stored predictions over the horizon for {len(missing)} players: {missing[:10]}")
+    return all_predictions
+
+def analyze_transfers(team_id: int, snapshot: 'Snapshot'):
+    """Analyze team and provide transfer recommendations
+
+    Reads players, fixtures and predictions from the snapshot only; the
+    team's entry and picks are the only data fetched.
+    """
     try:
-        # Initialize components
-        db = Database(DATABASE_PATH)
-        prediction_engine = PredictionEngine()
-        
-        # Fetch all FPL data
-        logging.info(f"Fetching FPL data for team {team_id}...")
-        fpl_data = FPLDataFetcher.fetch_all_data()
-        
-        # Fetch fixtures data
-        logging.info("Fetching fixtures data...")
-        fixtures_response = requests.get("https://fantasy.premierleague.com/api/fixtures/")
-        fixtures_response.raise_for_status()
-        fixtures_data = fixtures_response.json()
-        
-        # Get current gameweek
-        current_gw = get_current_gameweek(fpl_data['events'])
+        index = snapshot.index
+        current_gw = snapshot.current_gameweek
+        next_gw = snapshot.next_gameweek
+        horizon = snapshot.horizon
+        all_predictions = snapshot.predictions
         
         # Fetch team data using provided team_id
         logging.info(f"Fetching data for team ID: {team_id}")
@@ -54,54 +150,19 @@ def analyze_transfers(team_id: int):
         # Get bank balance
         bank_balance = team_picks.get('entry_history', {}).get('bank', 0) / 10
         
-        # Update predictions for all players
-        logging.info("Updating predictions for all players...")
-        all_predictions = []
-        for element in fpl_data['elements']:
-            player_history = FPLDataFetcher.fetch_player_history(element['id'])
-            player = {
-                'id': element['id'],
-                'name': element['web_name'],
-                'team': next(t['name'] for t in fpl_data['teams'] if t['id'] == element['team']),
-                'position': next(p['singular_name_short'] for p in fpl_data['element_types'] 
-                               if p['id'] == element['element_type']),
-                'price': element['now_cost'] / 10,
-                'form': float(element['form'] or 0),
-                'points_per_game': float(element['points_per_game'] or 0),
-                'selected_by': float(element['selected_by_percent'] or 0)
-            }
-            
-            # Find next fixture for player
-            team_id = element['team']
-            next_fixture = next((f for f in fixtures_data 
-                               if (f['team_h'] == team_id or f['team_a'] == team_id)
-                               and not f.get('finished', True)), None)
-            
-            if next_fixture:
-                prediction = prediction_engine.generate_prediction(
-                    player,
-                    player_history.get('history', []),
-                    next_fixture,
-                    current_gw
-                )
-                all_predictions.append(prediction)
-        
-        # Save predictions to database
-        db.save_predictions_batch(all_predictions)
-        
         # Get current squad with predictions
         current_squad = []
         squad_predictions = []
+        pick_predictions = {p.player_id: p for p in all_predictions if p.gameweek == next_gw}
         for pick in team_picks['picks']:
-            player_data = next(p for p in fpl_data['elements'] if p['id'] == pick['element'])
-            prediction = db.get_prediction(player_data['id'], current_gw)
+            player_data = index.elements[pick['element']]
+            prediction = pick_predictions.get(player_data['id'])
             
             player = {
                 'id': player_data['id'],
                 'name': player_data['web_name'],
-                'team': next(t['name'] for t in fpl_data['teams'] if t['id'] == player_data['team']),
-                'position': next(p['singular_name_short'] for p in fpl_data['element_types'] 
-                               if p['id'] == player_data['element_type']),
+                'team': index.team_name(player_data['team']),
+                'position': index.position_name(player_data['element_type']),
                 'price': player_data['now_cost'] / 10,
                 'form': float(player_data['form'] or 0),
                 'points_per_game': float(player_data['points_per_game'] or 0),
@@ -112,69 +173,92 @@ def analyze_transfers(team_id: int):
             if prediction:
                 squad_predictions.append(prediction)
         
-        # Sort squad predictions for captain picks
+        # Pick the XI and captaincy, then offer the best remaining starter
         squad_predictions.sort(key=lambda x: x.predicted_points, reverse=True)
-        captain_picks = squad_predictions[:3]
+        squad_positions = {p.player_id: index.player_position(p.player_id) for p in squad_predictions}
+        lineup = None
+        try:
+            lineup = LineupOptimizer().optimize(squad_predictions, squad_positions)
+            leaders = [lineup.captain_id, lineup.vice_captain_id]
+            predictions_by_player = {p.player_id: p for p in squad_predictions}
+            captain_picks = [predictions_by_player[pid] for pid in leaders] + [
+                p for p in squad_predictions
+                if p.player_id in lineup.starters and p.player_id not in leaders
+            ][:1]
+        except ValueError as e:
+            logging.warning(f"Could not pick a lineup for team {team_id}: {str(e)}")
+            captain_picks = squad_predictions[:3]
+        
+        # Simulate the squad's gameweek to put ranges on the captain picks
+        simulation = PointsSimulator(SIMULATION_RUNS, SIMULATION_SEED).simulate(
+            squad_predictions,
+            squad_positions,
+            {p.player_id: index.elements[p.player_id]['team'] for p in squad_predictions}
+        )
+        percentiles = simulation.percentiles((10, 50, 90))
+        beat_probabilities = simulation.beat_probabilities()
+        top_scorer_probabilities = simulation.top_scorer_probabilities()
+        squad_totals = simulation.squad_totals(
+            captain_id=captain_picks[0].player_id if captain_picks else None,
+            player_ids=lineup.starters if lineup else None
+        )
         
-        # Get potential transfers
         # Get potential transfers
         transfer_suggestions = []
         
-        # Get list of current player IDs in the squad
-        current_squad_ids = [player['id'] for player in current_squad]
-
-        for current_player in current_squad:
-            # Find potential replacements
-            position = current_player['position']
-            max_price = current_player['price'] + bank_balance
-            
-            possible_replacements = [
-                p for p in all_predictions
-                if next((pl for pl in fpl_data['elements'] if pl['id'] == p.player_id), None) and
-                next(pl for pl in fpl_data['elements'] if pl['id'] == p.player_id)['element_type'] == 
-                next(t['id'] for t in fpl_data['element_types'] if t['singular_name_short'] == position) and
-                next(pl for pl in fpl_data['elements'] if pl['id'] == p.player_id)['now_cost']/10 <= max_price and
-                p.player_id != current_player['id'] and
-                p.player_id not in current_squad_ids  # Exclude players already in squad
-            ]
-            
-            # Sort replacements by predicted points
-            possible_replacements.sort(key=lambda x: x.predicted_points, reverse=True)
-            
-            for replacement in possible_replacements[:3]:  # Top 3 replacements
-                replacement_data = next(p for p in fpl_data['elements'] if p['id'] == replacement.player_id)
-                
-                # Calculate improvement metrics
-                points_improvement = replacement.predicted_points - current_player['prediction'].predicted_points
-                price_diff = replacement_data['now_cost']/10 - current_player['price']
-                
-                if points_improvement > 0:
-                    transfer_suggestions.append({
-                        'out': {
-                            'player_id': current_player['id'],
-                            'name': current_player['name'],
-                            'team': current_player['team'],
-                            'form': current_player['form'],
-                            'price': current_player['price'],
-                            'predicted_points': current_player['prediction'].predicted_points
-                        },
-                        'in': {
-                            'player_id': replacement_data['id'],
-                            'name': replacement_data['web_name'],
-                            'team': next(t['name'] for t in fpl_data['teams'] if t['id'] == replacement_data['team']),
-                            'form': float(replacement_data['form'] or 0),
-                            'price': replacement_data['now_cost']/10,
-                            'predicted_points': replacement.predicted_points,
-                            'confidence': replacement.confidence_score,
-                            'selected_by': float(replacement_data['selected_by_percent'] or 0)
-                        },
-                        'improvement': points_improvement,
-                        'price_change': price_diff,
-                        'remaining_budget': bank_balance - price_diff
-                    })
+        # Transfers are judged on expected points over the whole horizon
+        horizon_points = {}
+        for p in all_predictions:
+            horizon_points[p.player_id] = horizon_points.get(p.player_id, 0) + p.predicted_points
+        predictions_by_id = {p.player_id: p for p in all_predictions if p.gameweek == next_gw}
+        
+        # Index the pool by position and price, then score every squad
+        # member against it in one pass. Only players with predictions can
+        # go out, but the club limit counts the whole squad.
+        outgoing = [player for player in current_squad if player['id'] in horizon_points]
+        candidate_index = CandidateIndex.from_predictions(all_predictions, index)
+        swaps = SwapMatrix.build(
+            candidate_index,
+            {player_id: element['team'] for player_id, element in index.elements.items()},
+            [player['id'] for player in outgoing],
+            [player['position'] for player in outgoing],
+            [index.elements[player['id']]['team'] for player in outgoing],
+            [player['price'] for player in outgoing],
+            [horizon_points[player['id']] for player in outgoing],
+            bank=bank_balance,
+            squad_clubs={player['id']: index.elements[player['id']]['team'] for player in current_squad}
+        )
         
-        # Sort transfer suggestions by improvement
-        transfer_suggestions.sort(key=lambda x: x['improvement'], reverse=True)
+        # Up to 3 replacements per player, top 5 overall
+        for row, col in swaps.top_k(5, score=swaps.point_gain, per_out=3, min_score=0):
+            current_player = outgoing[row]
+            replacement_data = index.elements[int(swaps.in_ids[col])]
+            replacement = predictions_by_id[replacement_data['id']]
+            price_diff = float(swaps.price_diff[row, col])
+            
+            transfer_suggestions.append({
+                'out': {
+                    'player_id': current_player['id'],
+                    'name': current_player['name'],
+                    'team': current_player['team'],
+                    'form': current_player['form'],
+                    'price': current_player['price'],
+                    'predicted_points': horizon_points[current_player['id']]
+                },
+                'in': {
+                    'player_id': replacement_data['id'],
+                    'name': replacement_data['web_name'],
+                    'team': index.team_name(replacement_data['team']),
+                    'form': float(replacement_data['form'] or 0),
+                    'price': replacement_data['now_cost']/10,
+                    'predicted_points': horizon_points[replacement.player_id],
+                    'confidence': replacement.confidence_score,
+                    'selected_by': float(replacement_data['selected_by_percent'] or 0)
+                },
+                'improvement': float(swaps.point_gain[row, col]),
+                'price_change': price_diff,
+                'remaining_budget': bank_balance - price_diff
+            })
         
         return {
             'success': True,
@@ -201,16 +285,40 @@ def analyze_transfers(team_id: int):
                     'player_id': pick.player_id,
                     'predicted_points': pick.predicted_points,
                     'confidence': pick.confidence_score,
-                    'name': next(p['web_name'] for p in fpl_data['elements'] if p['id'] == pick.player_id),
-                    'position': next(p['singular_name_short'] for p in fpl_data['element_types'] 
-                                  if p['id'] == next(pl['element_type'] for pl in fpl_data['elements'] if pl['id'] == pick.player_id)),
-                    'team': next(t['name'] for t in fpl_data['teams'] 
-                               if t['id'] == next(pl['team'] for pl in fpl_data['elements'] if pl['id'] == pick.player_id))
+                    'name': index.elements[pick.player_id]['web_name'],
+                    'position': index.player_position(pick.player_id),
+                    'team': index.player_team_name(pick.player_id),
+                    'points_range': {
+                        'p10': percentiles[pick.player_id][10],
+                        'p50': percentiles[pick.player_id][50],
+                        'p90': percentiles[pick.player_id][90]
+                    },
+                    'top_scorer_probability': top_scorer_probabilities[pick.player_id],
+                    'beats': {
+                        index.elements[other.player_id]['web_name']: beat_probabilities[
+                            simulation.player_ids.index(pick.player_id)
+                        ][simulation.player_ids.index(other.player_id)]
+                        for other in captain_picks if other is not pick
+                    }
                 }
                 for pick in captain_picks
             ],
-            'transfer_suggestions': transfer_suggestions[:5],  # Top 5 transfer suggestions
-            'predictions_updated': datetime.now().isoformat()
+            'lineup': {
+                'formation': lineup.formation,
+                'starters': lineup.starters,
+                'bench': lineup.bench,
+                'captain_id': lineup.captain_id,
+                'vice_captain_id': lineup.vice_captain_id,
+                'expected_points': lineup.expected_points
+            } if lineup else None,
+            'squad_points': {
+                'mean': float(squad_totals.mean()) if len(squad_totals) else 0,
+                'p10': float(np.percentile(squad_totals, 10)) if len(squad_totals) else 0,
+                'p90': float(np.percentile(squad_totals, 90)) if len(squad_totals) else 0
+            },
+            'transfer_suggestions': transfer_suggestions,  # Top 5 transfer suggestions
+            'horizon_gameweeks': horizon,
+            'predictions_updated': snapshot.built_at.isoformat()
         }
 
     except Exception as e:
@@ -220,8 +328,77 @@ def analyze_transfers(team_id: int):
             'error': str(e)
         }
 
+def plan_transfers(team_id: int, snapshot: 'Snapshot', free_transfers: int = 1,
+                   time_budget: float = PLAN_TIME_BUDGET):
+    """Plan transfers week by week over the snapshot's prediction horizon
+
+    Returns the best plan found within time_budget seconds; 'complete' is
+    False if the search ran out of time before exploring every option.
+    """
+    try:
+        index = snapshot.index
+        team_picks = FPLDataFetcher.fetch_team_picks(team_id, snapshot.current_gameweek)
+        if not team_picks:
+            raise ValueError(f"Could not find team with ID: {team_id}")
+
+        players = {
+            element['id']: Player.from_api_response(element, {})
+            for element in snapshot.fpl_data['elements']
+        }
+        team = Team(
+            budget=team_picks.get('entry_history', {}).get('bank', 0) / 10,
+            players=[players[pick['element']] for pick in team_picks['picks']],
+            formation='',
+            free_transfers=free_transfers
+        )
+        gameweek_points: Dict[int, Dict[int, float]] = {gw: {} for gw in snapshot.horizon}
+        for p in snapshot.predictions:
+            gameweek_points[p.gameweek][p.player_id] = p.predicted_points
+
+        # Expected points are supplied, so the optimizer needs no model
+        planner = TransferPlanner(TransferOptimizer(predictor=None))
+        plan = planner.plan(team, list(players.values()), gameweek_points, time_budget=time_budget)
+
+        def summary(player: Player) -> Dict:
+            return {
+                'player_id': player.id,
+                'name': player.name,
+                'team': index.team_name(player.team),
+                'position': index.player_position(player.id),
+                'price': player.price
+            }
+
+        return {
+            'success': True,
+            'steps': [
+                {
+                    'gameweek': step.gameweek,
+                    'transfers': [
+                        {'out': summary(player_out), 'in': summary(player_in)}
+                        for player_out, player_in in step.transfers
+                    ],
+                    'hit_cost': step.hit_cost,
+                    'free_transfers': step.free_transfers,
+                    'bank': step.bank,
+                    'expected_points': step.expected_points
+                }
+                for step in plan.steps
+            ],
+            'total_points': plan.total_points,
+            'complete': plan.complete,
+            'horizon_gameweeks': snapshot.horizon
+        }
+
+    except Exception as e:
+        logging.error(f"Error planning transfers for team {team_id}: {str(e)}")
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
 if __name__ == "__main__":
     # For testing
     import json
-    result = analyze_transfers(6044732)  # Replace with your team ID
+    from src.refresh import build_snapshot
+    result = analyze_transfers(6044732, build_snapshot(Database(DATABASE_PATH)))  # Replace with your team ID
     print(json.dumps(result, indent=2))
\ No newline at end of file
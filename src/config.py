@@ -5,9 +5,19 @@ from pathlib import Path
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / 'data'
 LOGS_DIR = PROJECT_ROOT / 'logs'
+MODEL_DIR = DATA_DIR / 'models'
+MODEL_KEEP = 3  # newest model artifacts kept on disk
 
 # Database
 DATABASE_PATH = DATA_DIR / 'fpl_data.db'
+DB_BUSY_TIMEOUT = 30  # seconds to wait on a locked database
+DB_MMAP_SIZE = 256 * 1024 * 1024  # bytes of the file to memory-map
+DB_CACHE_SIZE_KB = 64 * 1024  # page cache per connection
+PREDICTION_ARCHIVE_DIR = DATA_DIR / 'prediction_archive'  # aged-out predictions
+
+# HTTP response cache
+HTTP_CACHE_PATH = DATA_DIR / 'http_cache.db'
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024
 
 # Logging
 LOG_FILE = LOGS_DIR / 'fpl_analyzer.log'
@@ -17,4 +27,26 @@ DATA_DIR.mkdir(exist_ok=True)
 LOGS_DIR.mkdir(exist_ok=True)
 
 # FPL API settings
-FPL_TIMEOUT = 30  # seconds
\ No newline at end of file
+FPL_TIMEOUT = 30  # seconds
+FPL_MAX_WORKERS = 8  # concurrent requests for bulk fetches
+FPL_RATE_LIMIT = 10  # requests per second
+FPL_RATE_BURST = 20
+FPL_MAX_RETRIES = 3
+FPL_BACKOFF_BASE = 0.5  # seconds
+FPL_MAX_BACKOFF = 30  # longest wait between retries, whatever Retry-After asks
+
+# Background refresh (seconds)
+REFRESH_ON_STARTUP = os.environ.get('FPL_REFRESH_ON_STARTUP', '1') == '1'
+REFRESH_MIN_INTERVAL = 60
+REFRESH_MAX_INTERVAL = 60 * 60
+REFRESH_RETRY_DELAY = 5 * 60
+REFRESH_DEADLINE_LEAD = 60 * 60  # prefetch this long before a deadline
+REFRESH_STARTUP_TIMEOUT = 60  # how long a request waits for the first snapshot
+MATCH_SETTLE_TIME = 150 * 60  # kickoff to final score and bonus
+
+# Predictions
+PREDICTION_HORIZON = 5  # gameweeks ahead used for transfer decisions
+SIMULATION_RUNS = 20000  # Monte Carlo draws per player
+SIMULATION_SEED = 42
+PLAN_TIME_BUDGET = 2.0  # seconds a transfer plan request searches by default
+PLAN_MAX_TIME_BUDGET = 10.0
@@ -15,4 +15,5 @@ class PlayerPrediction:
     clean_sheet_probability: float
     minutes_probability: float
     prediction_date: datetime
-    actual_points: Optional[float] = None
\ No newline at end of file
+    actual_points: Optional[float] = None
+    input_hash: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,192 @@
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from src.analyze_transfers import get_current_gameweek, get_next_gameweek, update_predictions
+from src.models.prediction import PlayerPrediction
+from src.utils.bootstrap_index import BootstrapIndex
+from src.utils.data_fetcher import FPLDataFetcher
+from src.utils.database import Database
+from src.utils.fixture_index import FixtureIndex
+from src.utils.history_sync import settle_gameweek, sync_gameweek_history, sync_players
+from src.utils.player_table import PlayerTable
+from src.config import (
+    MATCH_SETTLE_TIME, PREDICTION_HORIZON, REFRESH_DEADLINE_LEAD, REFRESH_MAX_INTERVAL,
+    REFRESH_MIN_INTERVAL, REFRESH_RETRY_DELAY, REFRESH_STARTUP_TIMEOUT
+)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """Everything request handlers read, built together and never mutated"""
+    fpl_data: Dict
+    fixtures: List[Dict]
+    index: BootstrapIndex
+    fixture_index: FixtureIndex
+    current_gameweek: int  # the gameweek in play, whose picks count
+    next_gameweek: int  # the first gameweek predicted
+    horizon: List[int]
+    predictions: List[PlayerPrediction]  # over the horizon, by player then gameweek
+    player_table: PlayerTable
+    built_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+def player_rows(fpl_data: Dict, index: BootstrapIndex, fixture_index: FixtureIndex,
+                histories: Dict[int, List[Dict]], predictions: Dict[int, PlayerPrediction]) -> List[Dict]:
+    """Rows of the player table, most total points first"""
+    players_data = []
+    for element in fpl_data['elements']:
+        prediction = predictions.get(element['id'])
+
+        player_history = histories.get(element['id'])
+        if player_history is not None:
+            games_played = sum(g['fixtures'] for g in player_history if g['minutes'] > 0)
+        else:
+            games_played = max(1, element.get('appearances', 1))
+
+        games_played = max(1, games_played)
+        predicted_points = prediction.predicted_points if prediction else 0
+
+        # Get next fixture information
+        team_id = element['team']
+        next_fixture = fixture_index.next_fixture(team_id)
+        if next_fixture:
+            is_home = next_fixture['team_h'] == team_id
+            opponent = index.team_short_name(next_fixture['team_a'] if is_home else next_fixture['team_h'])
+            fixture_text = f"{opponent} {'(H)' if is_home else '(A)'}"
+        else:
+            fixture_text = "- (H)"
+
+        players_data.append({
+            'id': element['id'],
+            'name': element['web_name'],
+            'team': index.team_name(element['team']),
+            'position': index.position_name(element['element_type']),
+            'next_fixture': fixture_text,
+            'price': round(element['now_cost'] / 10, 1),
+            'form': round(float(element['form'] or 0), 1),
+            'total_points': element['total_points'],
+            'points_per_game': round(float(element['points_per_game'] or 0), 1),
+            'minutes': element['minutes'],
+            'minutes_per_game': round(element['minutes'] / games_played, 1),
+            'games_played': games_played,
+            'predicted_points': round(predicted_points),
+            'selected_by': round(float(element['selected_by_percent'] or 0), 1)
+        })
+
+    players_data.sort(key=lambda x: x['total_points'], reverse=True)
+    return players_data
+
+
+def build_snapshot(db: Database) -> Snapshot:
+    """Fetch the latest data, bring the database up to date and build a snapshot
+
+    This is the only place data is ingested or predictions written:
+    newly checked gameweeks are stored, any gameweek with history but no
+    accuracy rows is settled, and predictions are recomputed for players
+    whose inputs changed. Request handlers only read the result.
+    """
+    fpl_data = FPLDataFetcher.fetch_all_data()
+    fixtures = FPLDataFetcher.fetch_fixtures()
+    index = BootstrapIndex.from_bootstrap(fpl_data)
+    fixture_index = FixtureIndex.from_fixtures(fixtures)
+    current_gameweek = get_current_gameweek(fpl_data['events'])
+    next_gameweek = get_next_gameweek(fpl_data['events'])
+    horizon = fixture_index.horizon(next_gameweek, PREDICTION_HORIZON)
+
+    sync_gameweek_history(db, fpl_data['events'])
+    # Also catches gameweeks whose settling failed or was never attempted
+    for gameweek in db.get_unsettled_gameweeks():
+        settle_gameweek(db, gameweek, index)
+    sync_players(db, fpl_data['elements'])
+    predictions = update_predictions(db, fpl_data, index, fixture_index, horizon)
+
+    histories = db.get_player_histories()
+    next_predictions = db.get_predictions(
+        [element['id'] for element in fpl_data['elements']], next_gameweek
+    )
+    table = PlayerTable.from_rows(
+        player_rows(fpl_data, index, fixture_index, histories, next_predictions)
+    )
+    return Snapshot(fpl_data, fixtures, index, fixture_index, current_gameweek, next_gameweek,
+                    horizon, predictions, table)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')) if value else None
+
+
+def next_refresh_delay(events: List[Dict], fixtures: List[Dict], now: datetime) -> float:
+    """Seconds until the next refresh worth doing
+
+    That is shortly before each deadline, just after it (when the current
+    gameweek moves on) and once every unfinished match should have its
+    final score and bonus, but never more than REFRESH_MAX_INTERVAL away.
+    """
+    candidates = [now + timedelta(seconds=REFRESH_MAX_INTERVAL)]
+    for event in events:
+        deadline = _parse_time(event.get('deadline_time'))
+        if deadline:
+            candidates.append(deadline - timedelta(seconds=REFRESH_DEADLINE_LEAD))
+            candidates.append(deadline + timedelta(seconds=REFRESH_MIN_INTERVAL))
+    for fixture in fixtures:
+        kickoff = _parse_time(fixture.get('kickoff_time'))
+        if kickoff and not fixture.get('finished', False):
+            candidates.append(kickoff + timedelta(seconds=MATCH_SETTLE_TIME))
+
+    upcoming = min(t for t in candidates if t > now)
+    return max((upcoming - now).total_seconds(), REFRESH_MIN_INTERVAL)
+
+
+class RefreshScheduler:
+    """Rebuilds the snapshot on a background thread and swaps it in whole
+
+    Handlers take a reference to the current snapshot and read only from
+    it, so a refresh never changes data under a request in flight.
+    """
+
+    def __init__(self, build: Callable[[], Snapshot]):
+        self._build = build
+        self._snapshot: Optional[Snapshot] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start refreshing in the background, if not already started"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot-refresh', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def current(self, timeout: float = REFRESH_STARTUP_TIMEOUT) -> Snapshot:
+        """The latest snapshot, waiting for the first build if needed"""
+        self.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("FPL data is not loaded yet")
+        return self._snapshot
+
+    def refresh(self) -> Snapshot:
+        """Build a new snapshot now and make it current"""
+        snapshot = self._build()
+        self._snapshot = snapshot
+        self._ready.set()
+        logging.info(f"Refreshed snapshot predicting from gameweek {snapshot.next_gameweek}")
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                snapshot = self.refresh()
+                delay = next_refresh_delay(
+                    snapshot.fpl_data['events'], snapshot.fixtures, datetime.now(timezone.utc)
+                )
+            except Exception as e:
+                logging.error(f"Error refreshing snapshot: {str(e)}")
+                delay = REFRESH_RETRY_DELAY
+            self._stop.wait(delay)
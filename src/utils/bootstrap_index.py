@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+@dataclass(frozen=True)
+class BootstrapIndex:
+    """Read-only lookup tables over one bootstrap-static snapshot"""
+    elements: Mapping[int, Dict]
+    teams: Mapping[int, Dict]
+    position_names: Mapping[int, str]
+    position_ids: Mapping[str, int]
+    team_players: Mapping[int, Tuple[int, ...]]
+
+    @classmethod
+    def from_bootstrap(cls, fpl_data: Dict) -> 'BootstrapIndex':
+        team_players: Dict[int, list] = {t['id']: [] for t in fpl_data['teams']}
+        for element in fpl_data['elements']:
+            team_players.setdefault(element['team'], []).append(element['id'])
+
+        return cls(
+            elements=MappingProxyType({e['id']: e for e in fpl_data['elements']}),
+            teams=MappingProxyType({t['id']: t for t in fpl_data['teams']}),
+            position_names=MappingProxyType({
+                p['id']: p['singular_name_short'] for p in fpl_data['element_types']
+            }),
+            position_ids=MappingProxyType({
+                p['singular_name_short']: p['id'] for p in fpl_data['element_types']
+            }),
+            team_players=MappingProxyType({
+                team_id: tuple(ids) for team_id, ids in team_players.items()
+            })
+        )
+
+    def element(self, player_id: int) -> Optional[Dict]:
+        return self.elements.get(player_id)
+
+    def team_name(self, team_id: int) -> str:
+        return self.teams[team_id]['name']
+
+    def team_short_name(self, team_id: int) -> str:
+        return self.teams[team_id]['short_name']
+
+    def position_name(self, element_type: int) -> str:
+        return self.position_names[element_type]
+
+    def player_team_name(self, player_id: int) -> str:
+        return self.team_name(self.elements[player_id]['team'])
+
+    def player_position(self, player_id: int) -> str:
+        return self.position_name(self.elements[player_id]['element_type'])
@@ -1,29 +1,176 @@
+import re
+import json
+import time
+import threading
+from datetime import datetime
 import requests
 import logging
-from typing import Dict, List
-from src.models.player import Player
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from src.utils.http_cache import CacheEntry, HTTPCache
+from src.utils.http_client import get_client
+from src.config import FPL_MAX_WORKERS, HTTP_CACHE_PATH, HTTP_CACHE_MAX_BYTES
 
 class FPLDataFetcher:
     BASE_URL = "https://fantasy.premierleague.com/api"
 
+    # (endpoint pattern, ttl, stale-while-revalidate window) in seconds.
+    # Endpoints with no match are never cached.
+    CACHE_POLICIES = [
+        (re.compile(r'^bootstrap-static/$'), 5 * 60, 30 * 60),
+        (re.compile(r'^fixtures/$'), 5 * 60, 30 * 60),
+        (re.compile(r'^element-summary/\d+/$'), 6 * 60 * 60, 24 * 60 * 60),
+        (re.compile(r'^entry/\d+/$'), 5 * 60, 30 * 60),
+        (re.compile(r'^entry/\d+/event/\d+/picks/$'), 24 * 60 * 60, 7 * 24 * 60 * 60),
+        (re.compile(r'^event/\d+/live/$'), 60, 10 * 60),
+    ]
+
+    # Settled gameweek results never change
+    IMMUTABLE_TTL = 365 * 24 * 60 * 60
+
+    _cache: Optional[HTTPCache] = None
+    _cache_lock = threading.Lock()
+    _revalidating = set()
+    # Next deadline and whether a gameweek's results are still being
+    # updated, noted from the latest bootstrap-static
+    _next_deadline: Optional[float] = None
+    _results_pending = True
+
+    @classmethod
+    def get_cache(cls) -> HTTPCache:
+        with cls._cache_lock:
+            if cls._cache is None:
+                cls._cache = HTTPCache(str(HTTP_CACHE_PATH), HTTP_CACHE_MAX_BYTES)
+            return cls._cache
+
+    @classmethod
+    def _cache_policy(cls, path: str) -> Tuple[float, float]:
+        for pattern, ttl, stale in cls.CACHE_POLICIES:
+            if pattern.match(path):
+                return ttl, stale
+        return 0, 0
+
+    @classmethod
+    def _get_json(cls, path: str, ttl: Optional[float] = None):
+        """GET an API path, serving from the cache whenever it allows
+
+        ttl overrides the endpoint's policy for this request.
+        """
+        url = f"{cls.BASE_URL}/{path}"
+        policy_ttl, stale = cls._cache_policy(path)
+        ttl = policy_ttl if ttl is None or not policy_ttl else ttl
+        if not ttl:
+            response = get_client().get(url)
+            response.raise_for_status()
+            return response.json()
+
+        entry = cls.get_cache().get(url)
+        now = time.time()
+        if entry and entry.is_fresh(now):
+            return json.loads(entry.body)
+        if entry and entry.is_usable_stale(now, stale):
+            cls._revalidate_in_background(url, entry, ttl)
+            return json.loads(entry.body)
+
+        try:
+            return json.loads(cls._fetch(url, entry, ttl))
+        except requests.RequestException as e:
+            if entry:
+                logging.warning(f"Serving expired cache for {url}: {str(e)}")
+                return json.loads(entry.body)
+            raise
+
+    @classmethod
+    def _fetch(cls, url: str, entry: Optional[CacheEntry], ttl: float) -> bytes:
+        """Fetch a URL, revalidating the cached copy if there is one"""
+        headers = {}
+        if entry and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+
+        response = get_client().get(url, headers=headers)
+        if response.status_code == 304 and entry:
+            cls.get_cache().touch(url, ttl)
+            return entry.body
+
+        response.raise_for_status()
+        cls.get_cache().put(
+            url,
+            response.content,
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'),
+            ttl
+        )
+        return response.content
+
+    @classmethod
+    def _revalidate_in_background(cls, url: str, entry: CacheEntry, ttl: float):
+        with cls._cache_lock:
+            if url in cls._revalidating:
+                return
+            cls._revalidating.add(url)
+
+        def revalidate():
+            try:
+                cls._fetch(url, entry, ttl)
+            except requests.RequestException as e:
+                logging.warning(f"Background revalidation failed for {url}: {str(e)}")
+            finally:
+                with cls._cache_lock:
+                    cls._revalidating.discard(url)
+
+        threading.Thread(target=revalidate, daemon=True).start()
+
     @classmethod
     def fetch_all_data(cls) -> Dict:
         """Fetch all FPL data in one call"""
         try:
-            response = requests.get(f"{cls.BASE_URL}/bootstrap-static/")
-            response.raise_for_status()
-            return response.json()
+            data = cls._get_json("bootstrap-static/")
         except requests.RequestException as e:
             logging.error(f"Error fetching FPL data: {str(e)}")
             raise
+        cls._note_schedule(data.get('events', []))
+        return data
+
+    @classmethod
+    def _note_schedule(cls, events: List[Dict]):
+        now = time.time()
+        deadlines = [
+            datetime.fromisoformat(event['deadline_time'].replace('Z', '+00:00')).timestamp()
+            for event in events if event.get('deadline_time')
+        ]
+        cls._next_deadline = min((d for d in deadlines if d > now), default=None)
+        cls._results_pending = any(
+            event.get('is_current') and not event.get('data_checked') for event in events
+        )
+
+    @classmethod
+    def _history_ttl(cls) -> Optional[float]:
+        """How long a player's element-summary can be trusted
+
+        Its history only gains rows once a gameweek's results are in. While
+        no gameweek is in play, finished-gameweek history is unchanged until
+        the next deadline, so it is kept until then.
+        """
+        if cls._results_pending or cls._next_deadline is None:
+            return None
+        return max(cls._next_deadline - time.time(), 0) or None
+
+    @classmethod
+    def fetch_fixtures(cls) -> List[Dict]:
+        """Fetch all fixtures for the season"""
+        try:
+            return cls._get_json("fixtures/")
+        except requests.RequestException as e:
+            logging.error(f"Error fetching fixtures: {str(e)}")
+            raise
 
     @classmethod
     def fetch_team_data(cls, team_id: int) -> Dict:
         """Fetch data for a specific team"""
         try:
-            response = requests.get(f"{cls.BASE_URL}/entry/{team_id}/")
-            response.raise_for_status()
-            return response.json()
+            return cls._get_json(f"entry/{team_id}/")
         except requests.RequestException as e:
             logging.error(f"Error fetching team data: {str(e)}")
             raise
@@ -32,9 +179,7 @@ class FPLDataFetcher:
     def fetch_team_picks(cls, team_id: int, gameweek: int) -> Dict:
         """Fetch team picks for a specific gameweek"""
         try:
-            response = requests.get(f"{cls.BASE_URL}/entry/{team_id}/event/{gameweek}/picks/")
-            response.raise_for_status()
-            return response.json()
+            return cls._get_json(f"entry/{team_id}/event/{gameweek}/picks/")
         except requests.RequestException as e:
             logging.error(f"Error fetching team picks: {str(e)}")
             raise
@@ -43,9 +188,49 @@ class FPLDataFetcher:
     def fetch_player_history(cls, player_id: int) -> Dict:
         """Fetch detailed history for a player"""
         try:
-            response = requests.get(f"{cls.BASE_URL}/element-summary/{player_id}/")
-            response.raise_for_status()
-            return response.json()
+            return cls._get_json(f"element-summary/{player_id}/", cls._history_ttl())
         except requests.RequestException as e:
             logging.error(f"Error fetching player history: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    @classmethod
+    def fetch_live_gameweek(cls, gameweek: int, settled: bool = False) -> Dict:
+        """Fetch every player's stats for one gameweek
+
+        Pass settled=True once the gameweek's data is checked; the response
+        is then cached as immutable.
+        """
+        try:
+            return cls._get_json(f"event/{gameweek}/live/", cls.IMMUTABLE_TTL if settled else None)
+        except requests.RequestException as e:
+            logging.error(f"Error fetching live data for gameweek {gameweek}: {str(e)}")
+            raise
+
+    @classmethod
+    def fetch_player_histories(cls, player_ids: List[int],
+                               max_workers: int = FPL_MAX_WORKERS) -> Tuple[Dict[int, Dict], Dict[int, str]]:
+        """Fetch histories for many players concurrently
+
+        Returns (histories, failures) keyed by player ID so callers can carry
+        on with the players that succeeded.
+        """
+        histories = {}
+        failures = {}
+        if not player_ids:
+            return histories, failures
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(cls.fetch_player_history, player_id): player_id
+                for player_id in player_ids
+            }
+            for future in as_completed(futures):
+                player_id = futures[future]
+                try:
+                    histories[player_id] = future.result()
+                except requests.RequestException as e:
+                    failures[player_id] = str(e)
+
+        if failures:
+            logging.warning(f"Failed to fetch history for {len(failures)} of {len(player_ids)} players")
+        return histories, failures
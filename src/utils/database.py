@@ -1,27 +1,96 @@
 import sqlite3
 import logging
+import hashlib
+import json
+import threading
+import numpy as np
 from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Sequence, Set, Tuple
 from src.models.player import Player
 from src.models.prediction import PlayerPrediction
+from src.utils.prediction_archive import PredictionArchive, merge_prediction_arrays
+from src.config import DB_BUSY_TIMEOUT, DB_CACHE_SIZE_KB, DB_MMAP_SIZE, PREDICTION_ARCHIVE_DIR
+
+PREDICTION_ARRAY_COLUMNS = (
+    'player_id', 'predicted_points', 'confidence_score', 'form_score',
+    'fixture_difficulty', 'expected_goals', 'expected_assists',
+    'clean_sheet_probability', 'minutes_probability', 'actual_points'
+)
+# player_predictions columns read into a PlayerPrediction, in field order
+PREDICTION_COLUMNS = (
+    'player_id', 'gameweek', 'predicted_points', 'confidence_score', 'form_score',
+    'fixture_difficulty', 'expected_goals', 'expected_assists', 'clean_sheet_probability',
+    'minutes_probability', 'prediction_date', 'actual_points', 'input_hash'
+)
+PREDICTION_SELECT = ', '.join(PREDICTION_COLUMNS)
+
+# Kept alongside the numeric columns when predictions are archived
+PREDICTION_TEXT_COLUMNS = ('prediction_date', 'input_hash')
+
+# Per-gameweek stats kept for each player, summed over double gameweeks
+HISTORY_COLUMNS = (
+    'minutes', 'goals_scored', 'assists', 'clean_sheets', 'goals_conceded',
+    'saves', 'bonus', 'bps', 'total_points'
+)
 
 class Database:
+    SCHEMA_VERSION = 5
+    CONFIDENCE_BUCKET_WIDTH = 0.1
+    MAX_QUERY_PARAMS = 900
+
+    # One connection per (thread, database file), reused across Database
+    # instances so sqlite's per-connection statement cache is kept warm
+    _local = threading.local()
+    _migrated = set()
+    _migration_lock = threading.Lock()
+
     def __init__(self, db_path: str):
-        self.db_path = db_path
-        self.setup_database()
+        self.db_path = str(db_path)
+        if self.db_path not in Database._migrated:
+            with Database._migration_lock:
+                if self.db_path not in Database._migrated:
+                    self.setup_database()
+                    Database._migrated.add(self.db_path)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=DB_BUSY_TIMEOUT, cached_statements=256)
+        # WAL lets readers carry on while the prediction writer commits
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA mmap_size={int(DB_MMAP_SIZE)}')
+        conn.execute(f'PRAGMA cache_size={-int(DB_CACHE_SIZE_KB)}')
+        return conn
 
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        connections = getattr(Database._local, 'connections', None)
+        if connections is None:
+            connections = Database._local.connections = {}
+        conn = connections.get(self.db_path)
+        if conn is None:
+            conn = connections[self.db_path] = self._connect()
         try:
             yield conn
-        finally:
+        except Exception:
+            # Don't leave a half-written transaction on the shared connection
+            conn.rollback()
+            raise
+
+    def close(self):
+        """Close this thread's connection to the database, if open"""
+        connections = getattr(Database._local, 'connections', {})
+        conn = connections.pop(self.db_path, None)
+        if conn is not None:
             conn.close()
 
     def setup_database(self):
+        """Create or migrate the schema, once per database file"""
         with self.get_connection() as conn:
             c = conn.cursor()
+            c.execute('PRAGMA user_version')
+            if c.fetchone()[0] >= self.SCHEMA_VERSION:
+                return
             
             # Create players table
             c.execute('''
@@ -33,7 +102,8 @@ class Database:
                     price REAL,
                     total_points INTEGER,
                     form REAL,
-                    timestamp DATETIME
+                    timestamp DATETIME,
+                    row_hash TEXT
                 )
             ''')
 
@@ -53,11 +123,33 @@ class Database:
                     minutes_probability REAL,
                     prediction_date TIMESTAMP,
                     actual_points REAL,
+                    input_hash TEXT,
                     FOREIGN KEY(player_id) REFERENCES players(id),
                     UNIQUE(player_id, gameweek)
                 )
             ''')
 
+            # Add columns introduced after the table was first created
+            c.execute('PRAGMA table_info(player_predictions)')
+            prediction_columns = {row[1] for row in c.fetchall()}
+            if 'input_hash' not in prediction_columns:
+                c.execute('ALTER TABLE player_predictions ADD COLUMN input_hash TEXT')
+            c.execute('PRAGMA table_info(players)')
+            if 'row_hash' not in {row[1] for row in c.fetchall()}:
+                c.execute('ALTER TABLE players ADD COLUMN row_hash TEXT')
+
+            # Price and form movements seen when syncing players
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS player_changes (
+                    player_id INTEGER NOT NULL,
+                    changed_at TIMESTAMP NOT NULL,
+                    old_price REAL,
+                    new_price REAL,
+                    old_form REAL,
+                    new_form REAL
+                )
+            ''')
+
             # Create fixtures table
             c.execute('''
                 CREATE TABLE IF NOT EXISTS fixtures (
@@ -70,24 +162,91 @@ class Database:
                 )
             ''')
             
+            # Player match history, one row per player per gameweek; fixtures
+            # is 0 for a blank and 2 for a double
+            c.execute(f'''
+                CREATE TABLE IF NOT EXISTS player_gameweek_history (
+                    player_id INTEGER NOT NULL,
+                    gameweek INTEGER NOT NULL,
+                    fixtures INTEGER NOT NULL,
+                    {', '.join(f'{column} INTEGER' for column in HISTORY_COLUMNS)},
+                    PRIMARY KEY (player_id, gameweek)
+                ) WITHOUT ROWID
+            ''')
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS history_ingest (
+                    gameweek INTEGER PRIMARY KEY,
+                    player_count INTEGER,
+                    ingested_at TIMESTAMP
+                )
+            ''')
+            
+            # Settled accuracy per gameweek, position ('ALL' for every
+            # position) and confidence bucket (its lower bound)
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS prediction_accuracy (
+                    gameweek INTEGER NOT NULL,
+                    position TEXT NOT NULL,
+                    confidence_bucket REAL NOT NULL,
+                    predictions INTEGER,
+                    mean_absolute_error REAL,
+                    bias REAL,
+                    mean_predicted REAL,
+                    mean_actual REAL,
+                    mean_confidence REAL,
+                    settled_at TIMESTAMP,
+                    PRIMARY KEY (gameweek, position, confidence_bucket)
+                )
+            ''')
+            
             # Create indices for faster lookups
+            # Covers gameweek-major scans of the stats predictions use
+            c.execute('''
+                CREATE INDEX IF NOT EXISTS idx_history_gameweek ON player_gameweek_history(
+                    gameweek, player_id, fixtures, minutes, total_points,
+                    goals_scored, assists, clean_sheets
+                )
+            ''')
             c.execute('CREATE INDEX IF NOT EXISTS idx_player_gameweek ON player_predictions(player_id, gameweek)')
             c.execute('CREATE INDEX IF NOT EXISTS idx_fixture_gameweek ON fixtures(gameweek)')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_player_changes ON player_changes(changed_at, player_id)')
             
+            c.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
             conn.commit()
 
-    def save_players(self, players: List[Player]):
-        """Save or update player data"""
+    @staticmethod
+    def _player_row_hash(player: Player) -> str:
+        return hashlib.sha1(json.dumps([
+            player.name, player.team, player.position, player.price,
+            player.total_points, player.form
+        ], separators=(',', ':')).encode()).hexdigest()
+
+    def save_players(self, players: List[Player]) -> Dict[str, int]:
+        """Save or update player data, writing only rows that changed
+
+        Incoming rows are compared with stored ones by hash. New and changed
+        players are written in one transaction, with price or form movements
+        logged to player_changes. Returns counts of inserted and updated rows.
+        """
         with self.get_connection() as conn:
             c = conn.cursor()
+            c.execute('SELECT id, row_hash, price, form FROM players')
+            stored = {row[0]: row[1:] for row in c.fetchall()}
             timestamp = datetime.now().isoformat()
-            
+
+            writes = []
+            changes = []
+            inserted = 0
             for player in players:
-                c.execute('''
-                    INSERT OR REPLACE INTO players 
-                    (id, name, team, position, price, total_points, form, timestamp)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+                row_hash = self._player_row_hash(player)
+                previous = stored.get(player.id)
+                if previous is None:
+                    inserted += 1
+                elif previous[0] == row_hash:
+                    continue
+                elif previous[1] != player.price or previous[2] != player.form:
+                    changes.append((player.id, timestamp, previous[1], player.price, previous[2], player.form))
+                writes.append((
                     player.id,
                     player.name,
                     player.team,
@@ -95,10 +254,43 @@ class Database:
                     player.price,
                     player.total_points,
                     player.form,
-                    timestamp
+                    timestamp,
+                    row_hash
                 ))
-            
-            conn.commit()
+
+            if writes:
+                c.executemany('''
+                    INSERT OR REPLACE INTO players
+                    (id, name, team, position, price, total_points, form, timestamp, row_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', writes)
+                c.executemany('''
+                    INSERT INTO player_changes
+                    (player_id, changed_at, old_price, new_price, old_form, new_form)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', changes)
+                conn.commit()
+
+        return {'inserted': inserted, 'updated': len(writes) - inserted}
+
+    def get_player_changes(self, since: Optional[str] = None) -> List[Dict]:
+        """Price and form movements, oldest first, optionally after an ISO timestamp"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT player_id, changed_at, old_price, new_price, old_form, new_form
+                FROM player_changes
+                WHERE changed_at > ?
+                ORDER BY changed_at, player_id
+            ''', (since or '',))
+            return [{
+                'player_id': row[0],
+                'changed_at': row[1],
+                'old_price': row[2],
+                'new_price': row[3],
+                'old_form': row[4],
+                'new_form': row[5]
+            } for row in c.fetchall()]
 
     def save_prediction(self, prediction: PlayerPrediction):
         """Save or update a player prediction"""
@@ -108,8 +300,9 @@ class Database:
                 INSERT OR REPLACE INTO player_predictions (
                     player_id, gameweek, predicted_points, confidence_score,
                     form_score, fixture_difficulty, expected_goals, expected_assists,
-                    clean_sheet_probability, minutes_probability, prediction_date, actual_points
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    clean_sheet_probability, minutes_probability, prediction_date, actual_points,
+                    input_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 prediction.player_id,
                 prediction.gameweek,
@@ -122,7 +315,8 @@ class Database:
                 prediction.clean_sheet_probability,
                 prediction.minutes_probability,
                 prediction.prediction_date.isoformat(),
-                prediction.actual_points
+                prediction.actual_points,
+                prediction.input_hash
             ))
             conn.commit()
 
@@ -134,13 +328,14 @@ class Database:
                 INSERT OR REPLACE INTO player_predictions (
                     player_id, gameweek, predicted_points, confidence_score,
                     form_score, fixture_difficulty, expected_goals, expected_assists,
-                    clean_sheet_probability, minutes_probability, prediction_date, actual_points
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    clean_sheet_probability, minutes_probability, prediction_date, actual_points,
+                    input_hash
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', [(
                 p.player_id, p.gameweek, p.predicted_points, p.confidence_score,
                 p.form_score, p.fixture_difficulty, p.expected_goals, p.expected_assists,
                 p.clean_sheet_probability, p.minutes_probability,
-                p.prediction_date.isoformat(), p.actual_points
+                p.prediction_date.isoformat(), p.actual_points, p.input_hash
             ) for p in predictions])
             conn.commit()
 
@@ -179,53 +374,234 @@ class Database:
                 form=row[6]
             ) for row in c.fetchall()]
 
+    @staticmethod
+    def _prediction_from_row(row) -> PlayerPrediction:
+        """Build a PlayerPrediction from a row of PREDICTION_SELECT columns"""
+        fields = dict(zip(PREDICTION_COLUMNS, row))
+        fields['prediction_date'] = datetime.fromisoformat(fields['prediction_date'])
+        return PlayerPrediction(**fields)
+
     def get_prediction(self, player_id: int, gameweek: int) -> Optional[PlayerPrediction]:
         """Get prediction for a specific player and gameweek"""
         with self.get_connection() as conn:
             c = conn.cursor()
-            c.execute('''
-                SELECT * FROM player_predictions 
+            c.execute(f'''
+                SELECT {PREDICTION_SELECT} FROM player_predictions
                 WHERE player_id = ? AND gameweek = ?
             ''', (player_id, gameweek))
             
             row = c.fetchone()
             if row:
-                return PlayerPrediction(
-                    player_id=row[1],
-                    gameweek=row[2],
-                    predicted_points=row[3],
-                    confidence_score=row[4],
-                    form_score=row[5],
-                    fixture_difficulty=row[6],
-                    expected_goals=row[7],
-                    expected_assists=row[8],
-                    clean_sheet_probability=row[9],
-                    minutes_probability=row[10],
-                    prediction_date=datetime.fromisoformat(row[11]),
-                    actual_points=row[12]
-                )
+                return self._prediction_from_row(row)
             return None
 
     def get_gameweek_predictions(self, gameweek: int) -> List[PlayerPrediction]:
         """Get all predictions for a specific gameweek"""
         with self.get_connection() as conn:
             c = conn.cursor()
-            c.execute('SELECT * FROM player_predictions WHERE gameweek = ?', (gameweek,))
+            c.execute(f'SELECT {PREDICTION_SELECT} FROM player_predictions WHERE gameweek = ?', (gameweek,))
             
-            return [PlayerPrediction(
-                player_id=row[1],
-                gameweek=row[2],
-                predicted_points=row[3],
-                confidence_score=row[4],
-                form_score=row[5],
-                fixture_difficulty=row[6],
-                expected_goals=row[7],
-                expected_assists=row[8],
-                clean_sheet_probability=row[9],
-                minutes_probability=row[10],
-                prediction_date=datetime.fromisoformat(row[11]),
-                actual_points=row[12]
-            ) for row in c.fetchall()]
+            return [self._prediction_from_row(row) for row in c.fetchall()]
+
+    def get_predictions(self, player_ids: List[int], gameweek: int) -> Dict[int, PlayerPrediction]:
+        """Get predictions for many players in one gameweek, keyed by player id"""
+        player_ids = list(player_ids)
+        predictions = {}
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            # Stay under SQLite's bound-parameter limit on older builds
+            for start in range(0, len(player_ids), self.MAX_QUERY_PARAMS):
+                chunk = player_ids[start:start + self.MAX_QUERY_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                c.execute(f'''
+                    SELECT {PREDICTION_SELECT} FROM player_predictions
+                    WHERE gameweek = ? AND player_id IN ({placeholders})
+                ''', [gameweek] + chunk)
+                for row in c.fetchall():
+                    predictions[row[0]] = self._prediction_from_row(row)
+        return predictions
+
+    def get_gameweek_prediction_arrays(self, gameweek: int,
+                                       columns: Sequence[str] = PREDICTION_ARRAY_COLUMNS
+                                       ) -> Dict[str, np.ndarray]:
+        """Numeric prediction columns for a gameweek as arrays ordered by player id
+
+        The result always includes 'player_id'; missing values become NaN.
+        """
+        columns = self._check_array_columns(columns)
+        with self.get_connection() as conn:
+            return self._read_prediction_arrays(conn.cursor(), gameweek, columns)
+
+    @staticmethod
+    def _check_array_columns(columns: Sequence[str]) -> List[str]:
+        unknown = set(columns) - set(PREDICTION_ARRAY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown prediction columns: {sorted(unknown)}")
+        return [c for c in columns if c != 'player_id']
+
+    @staticmethod
+    def _read_prediction_arrays(c, gameweek: int, columns: List[str],
+                                text_columns: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+        c.execute(f'''
+            SELECT player_id{''.join(', ' + column for column in list(columns) + list(text_columns))}
+            FROM player_predictions WHERE gameweek = ? ORDER BY player_id
+        ''', (gameweek,))
+        rows = c.fetchall()
+        width = len(columns) + 1
+        table = np.array([row[:width] for row in rows], dtype=float).reshape(len(rows), width)
+        arrays = {'player_id': table[:, 0].astype(np.int64)}
+        for i, column in enumerate(columns, 1):
+            arrays[column] = table[:, i]
+        for i, column in enumerate(text_columns, width):
+            arrays[column] = np.array([row[i] or '' for row in rows], dtype=str)
+        return arrays
+
+    def iter_prediction_arrays(self, gameweeks: Optional[Sequence[int]] = None,
+                               columns: Sequence[str] = PREDICTION_ARRAY_COLUMNS,
+                               archive_dir=PREDICTION_ARCHIVE_DIR
+                               ) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+        """Yield (gameweek, arrays) for archived and stored predictions alike
+
+        One gameweek is held in memory at a time, in ascending order. Where
+        a gameweek has rows in both places the stored ones win per player.
+        """
+        columns = self._check_array_columns(columns)
+        archive = PredictionArchive(archive_dir)
+        archived = set(archive.gameweeks())
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT DISTINCT gameweek FROM player_predictions')
+            stored = {row[0] for row in c.fetchall()}
+
+        wanted = archived | stored
+        if gameweeks is not None:
+            wanted &= set(gameweeks)
+        for gameweek in sorted(wanted):
+            arrays = archive.read(gameweek, ['player_id'] + columns) if gameweek in archived else None
+            if gameweek in stored:
+                live = self.get_gameweek_prediction_arrays(gameweek, columns)
+                arrays = live if arrays is None else merge_prediction_arrays(arrays, live)
+            yield gameweek, arrays
+
+    def get_prediction_fingerprints(self, gameweeks: List[int]) -> Dict[Tuple[int, int], str]:
+        """Get the stored input hash for every prediction in the given gameweeks"""
+        if not gameweeks:
+            return {}
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            placeholders = ','.join('?' * len(gameweeks))
+            c.execute(f'''
+                SELECT player_id, gameweek, input_hash FROM player_predictions
+                WHERE gameweek IN ({placeholders}) AND input_hash IS NOT NULL
+            ''', list(gameweeks))
+            return {(row[0], row[1]): row[2] for row in c.fetchall()}
+
+    def get_ingested_gameweeks(self) -> Set[int]:
+        """Gameweeks whose match history has been stored"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT gameweek FROM history_ingest')
+            return {row[0] for row in c.fetchall()}
+
+    def get_unsettled_gameweeks(self) -> List[int]:
+        """Gameweeks with stored history and predictions but no accuracy rows yet"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT DISTINCT gameweek FROM player_predictions
+                WHERE gameweek IN (SELECT gameweek FROM history_ingest)
+                  AND gameweek NOT IN (SELECT gameweek FROM prediction_accuracy)
+                ORDER BY gameweek
+            ''')
+            return [row[0] for row in c.fetchall()]
+
+    def save_gameweek_history(self, gameweek: int, rows: List[Dict]):
+        """Store one gameweek's history for every player in a single transaction
+
+        Each row needs player_id, fixtures and the HISTORY_COLUMNS stats.
+        """
+        columns = ('player_id', 'gameweek', 'fixtures') + HISTORY_COLUMNS
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.executemany(f'''
+                INSERT OR REPLACE INTO player_gameweek_history ({', '.join(columns)})
+                VALUES ({', '.join('?' * len(columns))})
+            ''', [
+                (row['player_id'], gameweek, row['fixtures'])
+                + tuple(row.get(column, 0) for column in HISTORY_COLUMNS)
+                for row in rows
+            ])
+            c.execute('''
+                INSERT OR REPLACE INTO history_ingest (gameweek, player_count, ingested_at)
+                VALUES (?, ?, ?)
+            ''', (gameweek, len(rows), datetime.now().isoformat()))
+            conn.commit()
+
+    def get_player_histories(self, player_ids: Optional[List[int]] = None) -> Dict[int, List[Dict]]:
+        """Stored match history per player, oldest gameweek first
+
+        Blank gameweeks are left out, like the element-summary history.
+        """
+        columns = ('player_id', 'gameweek', 'fixtures') + HISTORY_COLUMNS
+        query = f'''
+            SELECT {', '.join(columns)} FROM player_gameweek_history
+            WHERE fixtures > 0 {{}} ORDER BY player_id, gameweek
+        '''
+        if player_ids is None:
+            chunks = [None]
+        else:
+            player_ids = list(player_ids)
+            chunks = [
+                player_ids[i:i + self.MAX_QUERY_PARAMS]
+                for i in range(0, len(player_ids), self.MAX_QUERY_PARAMS)
+            ]
+
+        histories: Dict[int, List[Dict]] = {}
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            for chunk in chunks:
+                if chunk is None:
+                    c.execute(query.format(''))
+                else:
+                    c.execute(query.format(f"AND player_id IN ({','.join('?' * len(chunk))})"), chunk)
+                for row in c.fetchall():
+                    game = dict(zip(columns, row))
+                    game['round'] = game['gameweek']
+                    histories.setdefault(row[0], []).append(game)
+        return histories
+
+    def get_history_matrix(self, player_ids: List[int], gameweeks: List[int],
+                           stats: Tuple[str, ...] = HISTORY_COLUMNS) -> Dict[str, np.ndarray]:
+        """Dense players x gameweeks matrix per stat, NaN where a player had no game"""
+        unknown = set(stats) - set(HISTORY_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown history stats: {sorted(unknown)}")
+        player_ids = np.asarray(list(player_ids), dtype=np.int64)
+        gameweeks = np.asarray(list(gameweeks), dtype=np.int64)
+        matrix = {stat: np.full((len(player_ids), len(gameweeks)), np.nan) for stat in stats}
+        if not len(player_ids) or not len(gameweeks):
+            return matrix
+
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute(f'''
+                SELECT player_id, gameweek{''.join(', ' + stat for stat in stats)}
+                FROM player_gameweek_history
+                WHERE gameweek BETWEEN ? AND ? AND fixtures > 0
+            ''', (int(gameweeks.min()), int(gameweeks.max())))
+            rows = np.array(c.fetchall(), dtype=float).reshape(-1, len(stats) + 2)
+
+        # Map ids and gameweeks to matrix positions, dropping ones not asked for
+        player_order = np.argsort(player_ids)
+        gw_order = np.argsort(gameweeks)
+        ids, gws = rows[:, 0].astype(np.int64), rows[:, 1].astype(np.int64)
+        p = np.clip(np.searchsorted(player_ids, ids, sorter=player_order), 0, len(player_ids) - 1)
+        g = np.clip(np.searchsorted(gameweeks, gws, sorter=gw_order), 0, len(gameweeks) - 1)
+        p, g = player_order[p], gw_order[g]
+        keep = (player_ids[p] == ids) & (gameweeks[g] == gws)
+        for i, stat in enumerate(stats, 2):
+            matrix[stat][p[keep], g[keep]] = rows[keep, i]
+        return matrix
 
     def update_actual_points(self, player_id: int, gameweek: int, actual_points: float):
         """Update actual points after gameweek completion"""
@@ -238,34 +614,154 @@ class Database:
             ''', (actual_points, player_id, gameweek))
             conn.commit()
 
-    def get_prediction_accuracy(self, gameweek: int) -> Dict:
-        """Calculate prediction accuracy for a completed gameweek"""
+    def settle_gameweek(self, gameweek: int, actual_points: Dict[int, float],
+                        positions: Dict[int, str]) -> int:
+        """Record actual points for a gameweek and refresh its accuracy rows
+
+        Every actual_points update and the accuracy rebuild happen in one
+        transaction. positions maps player id to position for the
+        breakdown. Returns the number of predictions settled.
+        """
         with self.get_connection() as conn:
             c = conn.cursor()
+            c.executemany('''
+                UPDATE player_predictions
+                SET actual_points = ?
+                WHERE player_id = ? AND gameweek = ?
+            ''', [(points, player_id, gameweek) for player_id, points in actual_points.items()])
+
             c.execute('''
-                SELECT 
-                    AVG(ABS(predicted_points - actual_points)) as avg_error,
-                    AVG(confidence_score) as avg_confidence,
-                    COUNT(*) as total_predictions
-                FROM player_predictions 
+                SELECT player_id, predicted_points, actual_points, confidence_score
+                FROM player_predictions
                 WHERE gameweek = ? AND actual_points IS NOT NULL
             ''', (gameweek,))
-            
+            rows = c.fetchall()
+
+            c.execute('DELETE FROM prediction_accuracy WHERE gameweek = ?', (gameweek,))
+            c.executemany('''
+                INSERT INTO prediction_accuracy (
+                    gameweek, position, confidence_bucket, predictions, mean_absolute_error,
+                    bias, mean_predicted, mean_actual, mean_confidence, settled_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', self._accuracy_rows(gameweek, rows, positions))
+            conn.commit()
+        return len(rows)
+
+    def _accuracy_rows(self, gameweek: int, rows: List[Tuple], positions: Dict[int, str]) -> List[Tuple]:
+        if not rows:
+            return []
+        settled_at = datetime.now().isoformat()
+        player_ids = [row[0] for row in rows]
+        predicted = np.array([row[1] for row in rows], dtype=float)
+        actual = np.array([row[2] for row in rows], dtype=float)
+        confidence = np.array([row[3] for row in rows], dtype=float)
+        position = np.array([positions.get(pid, 'UNK') for pid in player_ids])
+        width = self.CONFIDENCE_BUCKET_WIDTH
+        bucket = np.round(np.floor(np.clip(confidence, 0, 1 - 1e-9) / width) * width, 2)
+
+        out = []
+        for group in ['ALL'] + sorted(set(position)):
+            in_group = np.ones(len(rows), dtype=bool) if group == 'ALL' else position == group
+            for lower in sorted(set(bucket[in_group])):
+                mask = in_group & (bucket == lower)
+                error = predicted[mask] - actual[mask]
+                out.append((
+                    gameweek, group, float(lower), int(mask.sum()),
+                    float(np.abs(error).mean()), float(error.mean()),
+                    float(predicted[mask].mean()), float(actual[mask].mean()),
+                    float(confidence[mask].mean()), settled_at
+                ))
+        return out
+
+    def get_accuracy_breakdown(self, gameweek: int) -> List[Dict]:
+        """Settled accuracy rows for a gameweek by position and confidence bucket"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT position, confidence_bucket, predictions, mean_absolute_error,
+                       bias, mean_predicted, mean_actual, mean_confidence
+                FROM prediction_accuracy WHERE gameweek = ?
+                ORDER BY position, confidence_bucket
+            ''', (gameweek,))
+            return [{
+                'position': row[0],
+                'confidence_bucket': row[1],
+                'predictions': row[2],
+                'mean_absolute_error': row[3],
+                'bias': row[4],
+                'mean_predicted': row[5],
+                'mean_actual': row[6],
+                'mean_confidence': row[7]
+            } for row in c.fetchall()]
+
+    def get_prediction_accuracy(self, gameweek: int) -> Dict:
+        """Calculate prediction accuracy for a completed gameweek
+
+        Settled gameweeks are read from the precomputed accuracy rows;
+        others fall back to aggregating player_predictions.
+        """
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT
+                    SUM(mean_absolute_error * predictions) / SUM(predictions),
+                    SUM(mean_confidence * predictions) / SUM(predictions),
+                    SUM(predictions)
+                FROM prediction_accuracy
+                WHERE gameweek = ? AND position = 'ALL'
+            ''', (gameweek,))
             row = c.fetchone()
+            if not row[2]:
+                c.execute('''
+                    SELECT 
+                        AVG(ABS(predicted_points - actual_points)) as avg_error,
+                        AVG(confidence_score) as avg_confidence,
+                        COUNT(*) as total_predictions
+                    FROM player_predictions 
+                    WHERE gameweek = ? AND actual_points IS NOT NULL
+                ''', (gameweek,))
+                row = c.fetchone()
+            
             return {
                 'average_error': row[0],
                 'average_confidence': row[1],
                 'total_predictions': row[2]
             }
 
-    def cleanup_old_predictions(self, keep_weeks: int = 10):
-        """Remove predictions older than specified number of gameweeks"""
+    def cleanup_old_predictions(self, keep_weeks: int = 10,
+                                archive_dir=PREDICTION_ARCHIVE_DIR) -> List[int]:
+        """Move predictions older than keep_weeks gameweeks out of the database
+
+        Each aged-out gameweek is written to archive_dir before the rows are
+        deleted; pass archive_dir=None to discard them instead. Archiving and
+        the delete share one write transaction, so no rows slip in between.
+        Returns the gameweeks removed.
+        """
         with self.get_connection() as conn:
             c = conn.cursor()
+            c.execute('BEGIN IMMEDIATE')
             c.execute('''
-                DELETE FROM player_predictions 
+                SELECT DISTINCT gameweek FROM player_predictions
                 WHERE gameweek < (
                     SELECT MAX(gameweek) - ? FROM player_predictions
                 )
+                ORDER BY gameweek
             ''', (keep_weeks,))
-            conn.commit()
\ No newline at end of file
+            gameweeks = [row[0] for row in c.fetchall()]
+
+            if archive_dir is not None:
+                archive = PredictionArchive(archive_dir)
+                for gameweek in gameweeks:
+                    archive.write(gameweek, self._read_prediction_arrays(
+                        c, gameweek, list(PREDICTION_ARRAY_COLUMNS[1:]), PREDICTION_TEXT_COLUMNS
+                    ))
+
+            if gameweeks:
+                placeholders = ','.join('?' * len(gameweeks))
+                c.execute(f'DELETE FROM player_predictions WHERE gameweek IN ({placeholders})', gameweeks)
+            conn.commit()
+
+        if gameweeks:
+            logging.info(f"Removed predictions for gameweeks {gameweeks}"
+                         f"{' to ' + str(archive_dir) if archive_dir is not None else ''}")
+        return gameweeks
@@ -0,0 +1,46 @@
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+@dataclass(frozen=True)
+class FixtureIndex:
+    """Read-only team -> gameweek -> fixtures lookup over the fixtures payload"""
+    by_team: Mapping[int, Mapping[int, Tuple[Dict, ...]]]
+    upcoming: Mapping[int, Tuple[Dict, ...]]
+    gameweeks: Tuple[int, ...]
+
+    @classmethod
+    def from_fixtures(cls, fixtures: List[Dict]) -> 'FixtureIndex':
+        by_team: Dict[int, Dict[int, list]] = {}
+        upcoming: Dict[int, list] = {}
+        for fixture in fixtures:
+            for team_id in (fixture['team_h'], fixture['team_a']):
+                # Unscheduled fixtures have no gameweek yet
+                if fixture.get('event') is not None:
+                    by_team.setdefault(team_id, {}).setdefault(fixture['event'], []).append(fixture)
+                if not fixture.get('finished', True):
+                    upcoming.setdefault(team_id, []).append(fixture)
+
+        return cls(
+            by_team=MappingProxyType({
+                team_id: MappingProxyType({gw: tuple(f) for gw, f in gameweeks.items()})
+                for team_id, gameweeks in by_team.items()
+            }),
+            upcoming=MappingProxyType({
+                team_id: tuple(f) for team_id, f in upcoming.items()
+            }),
+            gameweeks=tuple(sorted({f['event'] for f in fixtures if f.get('event') is not None}))
+        )
+
+    def fixtures_for(self, team_id: int, gameweek: int) -> Tuple[Dict, ...]:
+        """A team's fixtures in a gameweek: empty for a blank, two for a double"""
+        return self.by_team.get(team_id, {}).get(gameweek, ())
+
+    def next_fixture(self, team_id: int) -> Optional[Dict]:
+        """The team's first unfinished fixture in payload (kickoff) order"""
+        fixtures = self.upcoming.get(team_id)
+        return fixtures[0] if fixtures else None
+
+    def horizon(self, start_gameweek: int, length: int) -> List[int]:
+        """Up to `length` gameweeks from start_gameweek that exist in the season"""
+        return [gw for gw in self.gameweeks if gw >= start_gameweek][:length]
@@ -0,0 +1,88 @@
+import logging
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+import requests
+from src.models.player import Player
+from src.utils.bootstrap_index import BootstrapIndex
+from src.utils.data_fetcher import FPLDataFetcher
+from src.utils.database import Database, HISTORY_COLUMNS
+from src.config import FPL_MAX_WORKERS
+
+def live_history_rows(live_data: Dict) -> List[Dict]:
+    """Turn an event/<gw>/live/ payload into player_gameweek_history rows"""
+    rows = []
+    for element in live_data.get('elements', []):
+        stats = element.get('stats', {})
+        rows.append({
+            'player_id': element['id'],
+            'fixtures': len(element.get('explain', [])),
+            **{column: stats.get(column, 0) for column in HISTORY_COLUMNS}
+        })
+    return rows
+
+def sync_gameweek_history(db: Database, events: List[Dict],
+                          max_workers: int = FPL_MAX_WORKERS) -> List[int]:
+    """Store match history for settled gameweeks not yet in the database
+
+    A gameweek counts once it is finished and its data checked, after
+    which the FPL API no longer corrects scores or bonus. Each missing
+    gameweek costs one live request for all players, so a run with
+    nothing new makes no requests. Returns the gameweeks added.
+    """
+    finished = {
+        event['id'] for event in events
+        if event.get('finished') and event.get('data_checked')
+    }
+    missing = sorted(finished - db.get_ingested_gameweeks())
+    if not missing:
+        return []
+
+    added = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(FPLDataFetcher.fetch_live_gameweek, gameweek, True): gameweek
+            for gameweek in missing
+        }
+        for future in as_completed(futures):
+            gameweek = futures[future]
+            try:
+                rows = live_history_rows(future.result())
+            except requests.RequestException as e:
+                logging.error(f"Skipping history for gameweek {gameweek}: {str(e)}")
+                continue
+            db.save_gameweek_history(gameweek, rows)
+            added.append(gameweek)
+
+    logging.info(f"Stored match history for gameweeks {sorted(added)}")
+    return sorted(added)
+
+def sync_players(db: Database, elements: List[Dict]) -> Dict[str, int]:
+    """Bring the players table in line with bootstrap-static elements"""
+    counts = db.save_players([Player.from_api_response(element, {}) for element in elements])
+    if counts['inserted'] or counts['updated']:
+        logging.info(f"Synced players: {counts['inserted']} new, {counts['updated']} changed")
+    return counts
+
+def settle_gameweek(db: Database, gameweek: int, index: Optional[BootstrapIndex] = None) -> int:
+    """Settle a finished gameweek's predictions against its live results
+
+    Fetches the gameweek's results if they are not stored yet, writes
+    every actual_points value and refreshes the accuracy table. Returns
+    the number of predictions settled.
+    """
+    if gameweek not in db.get_ingested_gameweeks():
+        db.save_gameweek_history(
+            gameweek, live_history_rows(FPLDataFetcher.fetch_live_gameweek(gameweek))
+        )
+    index = index or BootstrapIndex.from_bootstrap(FPLDataFetcher.fetch_all_data())
+
+    player_ids = list(index.elements)
+    points = db.get_history_matrix(player_ids, [gameweek], ('total_points',))['total_points'][:, 0]
+    # Players without a game this gameweek scored nothing
+    actual_points = dict(zip(player_ids, np.nan_to_num(points, nan=0.0).tolist()))
+    positions = {player_id: index.player_position(player_id) for player_id in player_ids}
+
+    settled = db.settle_gameweek(gameweek, actual_points, positions)
+    logging.info(f"Settled {settled} predictions for gameweek {gameweek}")
+    return settled
@@ -0,0 +1,148 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    expires_at: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+    def is_usable_stale(self, now: float, stale_window: float) -> bool:
+        return now < self.expires_at + stale_window
+
+
+class HTTPCache:
+    """SQLite-backed store of raw API responses keyed by URL
+
+    Cache hits record their access time in memory. The times are written
+    in one batch at most every ACCESS_FLUSH_INTERVAL seconds, and always
+    before an eviction needs them.
+    """
+    ACCESS_FLUSH_INTERVAL = 60
+
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._accessed = {}
+        self._flushed_at = time.time()
+        self.setup_database()
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def setup_database(self):
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    body BLOB,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL,
+                    expires_at REAL,
+                    accessed_at REAL,
+                    size INTEGER
+                )
+            ''')
+            c.execute('CREATE INDEX IF NOT EXISTS idx_http_cache_accessed ON http_cache(accessed_at)')
+            conn.commit()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """Return the cached entry for a URL, fresh or not"""
+        with self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                SELECT url, body, etag, last_modified, fetched_at, expires_at
+                FROM http_cache WHERE url = ?
+            ''', (url,))
+            row = c.fetchone()
+        if not row:
+            return None
+
+        now = time.time()
+        with self._lock:
+            self._accessed[url] = now
+            if now - self._flushed_at >= self.ACCESS_FLUSH_INTERVAL:
+                with self.get_connection() as conn:
+                    self._flush_access(conn.cursor())
+                    conn.commit()
+        return CacheEntry(*row)
+
+    def _flush_access(self, c: sqlite3.Cursor):
+        """Write batched access times; the caller holds self._lock"""
+        if self._accessed:
+            c.executemany(
+                'UPDATE http_cache SET accessed_at = ? WHERE url = ?',
+                [(accessed_at, url) for url, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+        self._flushed_at = time.time()
+
+    def put(self, url: str, body: bytes, etag: Optional[str],
+            last_modified: Optional[str], ttl: float):
+        """Store a response body and evict old entries if over the size limit"""
+        now = time.time()
+        with self._lock, self.get_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+                INSERT OR REPLACE INTO http_cache
+                (url, body, etag, last_modified, fetched_at, expires_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (url, body, etag, last_modified, now, now + ttl, now, len(body)))
+            self._accessed.pop(url, None)
+            self._flush_access(c)
+            self._evict(c)
+            conn.commit()
+
+    def touch(self, url: str, ttl: float):
+        """Extend the lifetime of an entry after a 304 Not Modified"""
+        now = time.time()
+        with self._lock:
+            self._accessed.pop(url, None)
+        with self.get_connection() as conn:
+            conn.execute('''
+                UPDATE http_cache SET fetched_at = ?, expires_at = ?, accessed_at = ?
+                WHERE url = ?
+            ''', (now, now + ttl, now, url))
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM http_cache')
+            conn.commit()
+
+    def _evict(self, c: sqlite3.Cursor):
+        """Drop least recently used entries until the store fits in max_bytes"""
+        c.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache')
+        total = c.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        c.execute('SELECT url, size FROM http_cache ORDER BY accessed_at ASC')
+        doomed = []
+        for url, size in c.fetchall():
+            if total <= self.max_bytes:
+                break
+            doomed.append((url,))
+            total -= size
+        c.executemany('DELETE FROM http_cache WHERE url = ?', doomed)
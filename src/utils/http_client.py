@@ -0,0 +1,151 @@
+import re
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from src.config import (
+    FPL_TIMEOUT, FPL_MAX_WORKERS, FPL_RATE_LIMIT, FPL_RATE_BURST,
+    FPL_MAX_RETRIES, FPL_BACKOFF_BASE, FPL_MAX_BACKOFF
+)
+
+class TokenBucket:
+    """Thread-safe token bucket limiting requests per second"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FPLClient:
+    """Pooled HTTP client shared by everything that talks to the FPL API"""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self,
+                 rate: float = FPL_RATE_LIMIT,
+                 burst: int = FPL_RATE_BURST,
+                 max_retries: int = FPL_MAX_RETRIES,
+                 backoff_base: float = FPL_BACKOFF_BASE,
+                 max_backoff: float = FPL_MAX_BACKOFF,
+                 pool_size: int = FPL_MAX_WORKERS):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.bucket = TokenBucket(rate, burst)
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = self._new_session()
+        self._stats: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+        return session
+
+    def mount(self, session: requests.Session):
+        """Route another session (e.g. a logged-in one) through the shared pool"""
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    @staticmethod
+    def endpoint_key(url: str) -> str:
+        """Collapse IDs in a URL path so stats group by endpoint"""
+        return re.sub(r'/\d+(?=/|$)', '/{id}', urlparse(url).path)
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Seconds to wait before a retry, never more than max_backoff
+
+        Retries run on the caller's thread, so a long Retry-After is
+        clamped rather than honoured in full.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        # Full jitter: uniform over [0, base * 2^attempt]
+        return random.uniform(0, min(self.backoff_base * (2 ** attempt), self.max_backoff))
+
+    def _record(self, endpoint: str, elapsed: float, failed: bool):
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0, 'errors': 0, 'retries': 0, 'total_time': 0.0, 'max_time': 0.0
+            })
+            stats['requests'] += 1
+            stats['errors'] += int(failed)
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def _record_retry(self, endpoint: str):
+        with self._stats_lock:
+            self._stats.setdefault(endpoint, {
+                'requests': 0, 'errors': 0, 'retries': 0, 'total_time': 0.0, 'max_time': 0.0
+            })['retries'] += 1
+
+    def get(self, url: str, session: Optional[requests.Session] = None, **kwargs) -> requests.Response:
+        """GET with rate limiting and retries on 429/5xx and connection errors"""
+        session = session or self.session
+        kwargs.setdefault('timeout', FPL_TIMEOUT)
+        endpoint = self.endpoint_key(url)
+
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            start = time.monotonic()
+            response = None
+            try:
+                response = session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(endpoint, time.monotonic() - start, True)
+                if attempt == self.max_retries:
+                    raise
+            else:
+                self._record(endpoint, time.monotonic() - start, response.status_code >= 400)
+                if response.status_code not in self.RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+
+            delay = self._backoff(attempt, response)
+            self._record_retry(endpoint)
+            logging.warning(f"Retrying {url} in {delay:.2f}s (attempt {attempt + 1} of {self.max_retries})")
+            time.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-endpoint request counts and latencies"""
+        with self._stats_lock:
+            return {
+                endpoint: {
+                    **stats,
+                    'avg_time': stats['total_time'] / stats['requests'] if stats['requests'] else 0.0
+                }
+                for endpoint, stats in self._stats.items()
+            }
+
+
+_client: Optional[FPLClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> FPLClient:
+    """Return the process-wide FPL client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FPLClient()
+        return _client
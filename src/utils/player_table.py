@@ -0,0 +1,108 @@
+import gzip
+import hashlib
+import json
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Columns the table can be sorted by; text columns sort case-insensitively
+SORT_COLUMNS = (
+    'name', 'team', 'position', 'next_fixture', 'price', 'form', 'total_points',
+    'points_per_game', 'minutes_per_game', 'games_played', 'predicted_points', 'selected_by'
+)
+TEXT_COLUMNS = {'name', 'team', 'position', 'next_fixture'}
+MAX_PAGE_SIZE = 100
+
+
+@dataclass
+class PlayerPage:
+    rows: List[Dict]
+    total: int  # players in the table
+    filtered: int  # players matching the filters
+    page: int
+    page_size: int
+
+
+@dataclass
+class PlayerTable:
+    """The /api/players payload, serialized and compressed once per build
+
+    The ETag is a hash of the JSON body, so a rebuild that produces the
+    same rows keeps validating clients' cached copies. Each build also
+    keeps a precomputed ordering per sort column so a filtered page
+    costs one pass over a boolean mask.
+    """
+    rows: List[Dict]
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    _positions: np.ndarray = field(init=False, repr=False)
+    _teams: np.ndarray = field(init=False, repr=False)
+    _prices: np.ndarray = field(init=False, repr=False)
+    _names: np.ndarray = field(init=False, repr=False)
+    _orderings: Dict[str, np.ndarray] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._positions = np.array([row['position'] for row in self.rows], dtype=str)
+        self._teams = np.array([row['team'].lower() for row in self.rows], dtype=str)
+        self._prices = np.array([row['price'] for row in self.rows], dtype=float)
+        self._names = np.array([row['name'].lower() for row in self.rows], dtype=str)
+        self._orderings = {}
+        for column in SORT_COLUMNS:
+            if column in TEXT_COLUMNS:
+                keys = np.array([row[column].lower() for row in self.rows], dtype=str)
+            else:
+                keys = np.array([row[column] for row in self.rows], dtype=float)
+            self._orderings[column] = np.argsort(keys, kind='stable')
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> 'PlayerTable':
+        body = json.dumps({'data': rows}, separators=(',', ':')).encode()
+        return cls(
+            rows=rows,
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=6),
+            etag=hashlib.sha1(body).hexdigest()
+        )
+
+    def query(self, position: Optional[str] = None, team: Optional[str] = None,
+              min_price: Optional[float] = None, max_price: Optional[float] = None,
+              search: Optional[str] = None, sort: str = 'total_points', descending: bool = True,
+              page: int = 1, page_size: int = 25) -> PlayerPage:
+        """One page of players matching the filters, in the requested order
+
+        team matches case-insensitively; search matches within player names.
+        """
+        if sort not in self._orderings:
+            raise ValueError(f"Cannot sort by {sort}")
+        if page < 1 or not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page must be at least 1 and page_size between 1 and {MAX_PAGE_SIZE}")
+
+        mask = np.ones(len(self.rows), dtype=bool)
+        if position:
+            mask &= self._positions == ('GKP' if position == 'GK' else position)
+        if team:
+            mask &= self._teams == team.lower()
+        if min_price is not None:
+            mask &= self._prices >= min_price
+        if max_price is not None:
+            mask &= self._prices <= max_price
+        if search:
+            mask &= np.char.find(self._names, search.lower()) >= 0
+
+        order = self._orderings[sort]
+        if descending:
+            order = order[::-1]
+        matching = order[mask[order]]
+        start = (page - 1) * page_size
+        return PlayerPage(
+            rows=[self.rows[i] for i in matching[start:start + page_size]],
+            total=len(self.rows),
+            filtered=len(matching),
+            page=page,
+            page_size=page_size
+        )
+
+    def query_etag(self, params: List[Tuple[str, str]]) -> str:
+        """ETag for a page, valid for as long as this build's rows are"""
+        return hashlib.sha1(f"{self.etag}|{sorted(params)!r}".encode()).hexdigest()
@@ -0,0 +1,91 @@
+import os
+import re
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+GAMEWEEK_FILE = re.compile(r'^gw(\d+)\.npz$')
+
+
+def _placeholders(values: np.ndarray, count: int) -> np.ndarray:
+    """count missing values for a column shaped like values"""
+    if values.dtype.kind in 'US':
+        return np.full(count, '', dtype=values.dtype)
+    return np.full(count, np.nan)
+
+
+def merge_prediction_arrays(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Combine two column sets for one gameweek, new rows winning per player
+
+    The result has every column of either side; rows from the side
+    lacking a column get NaN there (or '' for text).
+    """
+    keep = ~np.isin(old['player_id'], new['player_id'])
+    kept, added = int(keep.sum()), len(new['player_id'])
+    merged = {}
+    for column in list(new) + [c for c in old if c not in new]:
+        merged[column] = np.concatenate([
+            old[column][keep] if column in old else _placeholders(new[column], kept),
+            new[column] if column in new else _placeholders(old[column], added)
+        ])
+    order = np.argsort(merged['player_id'], kind='stable')
+    return {column: values[order] for column, values in merged.items()}
+
+
+class PredictionArchive:
+    """Aged-out predictions stored as one compressed columnar file per gameweek
+
+    Each file is an .npz holding one array per column, rows ordered by
+    player id. Files are written to a temporary name and renamed into
+    place, so readers never see a partial gameweek.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def path(self, gameweek: int) -> Path:
+        return self.directory / f'gw{gameweek:02d}.npz'
+
+    def gameweeks(self) -> List[int]:
+        """Archived gameweeks in ascending order"""
+        if not self.directory.is_dir():
+            return []
+        found = (GAMEWEEK_FILE.match(name) for name in os.listdir(self.directory))
+        return sorted(int(match.group(1)) for match in found if match)
+
+    def read(self, gameweek: int, columns: Optional[Sequence[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Columns of one archived gameweek, or None if it isn't archived
+
+        Only the requested columns are decompressed.
+        """
+        path = self.path(gameweek)
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            wanted = data.files if columns is None else ['player_id'] + [c for c in columns if c != 'player_id']
+            missing = set(wanted) - set(data.files)
+            if missing:
+                raise ValueError(f"Archive for gameweek {gameweek} lacks columns: {sorted(missing)}")
+            return {column: data[column] for column in wanted}
+
+    def write(self, gameweek: int, arrays: Dict[str, np.ndarray]):
+        """Store a gameweek's columns, merging with anything already archived
+
+        Archived rows and columns the new arrays lack are kept.
+        """
+        existing = self.read(gameweek)
+        if existing is not None:
+            arrays = merge_prediction_arrays(existing, arrays)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path(gameweek))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
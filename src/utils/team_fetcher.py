@@ -3,11 +3,16 @@ import logging
 from typing import Dict, List, Tuple
 from src.models.player import Player
 from src.models.team import Team
+from src.utils.data_fetcher import FPLDataFetcher
+from src.utils.bootstrap_index import BootstrapIndex
+from src.utils.http_client import get_client
 
 class TeamFetcher:
     def __init__(self, team_id: int):
         self.team_id = team_id
+        # Keeps its own cookies for login but shares the pooled connections
         self.session = requests.Session()
+        get_client().mount(self.session)
 
     def login(self, email: str, password: str) -> bool:
         """Login to FPL to access private team data"""
@@ -62,7 +67,7 @@ class TeamFetcher:
         try:
             # First get the entry data
             entry_url = f"https://fantasy.premierleague.com/api/my-team/{self.team_id}/"
-            response = self.session.get(entry_url)
+            response = get_client().get(entry_url, session=self.session)
             
             if response.status_code == 404:
                 raise Exception("Team not found. Check your team ID.")
@@ -90,28 +95,15 @@ class TeamFetcher:
         player_ids = [p['element'] for p in picks]
         
         # Fetch general data once
-        general_response = requests.get(
-            "https://fantasy.premierleague.com/api/bootstrap-static/"
-        )
-        general_response.raise_for_status()
-        general_data = general_response.json()
+        index = BootstrapIndex.from_bootstrap(FPLDataFetcher.fetch_all_data())
+        histories, _ = FPLDataFetcher.fetch_player_histories(player_ids)
         
         # Get player details
         players = []
         for player_id in player_ids:
             try:
-                # Get player history
-                player_response = requests.get(
-                    f"https://fantasy.premierleague.com/api/element-summary/{player_id}/"
-                )
-                player_response.raise_for_status()
-                player_history = player_response.json()
-                
-                # Find player in general data
-                player_data = next(
-                    p for p in general_data['elements'] 
-                    if p['id'] == player_id
-                )
+                player_history = histories[player_id]
+                player_data = index.elements[player_id]
                 
                 players.append(Player.from_api_response(player_data, player_history))
                 
@@ -119,10 +111,17 @@ class TeamFetcher:
                 logging.error(f"Error fetching player {player_id}: {str(e)}")
                 continue
 
+        # Picks 1-11 are the starters; count them per outfield position
+        starters = [
+            index.position_name(index.elements[p['element']]['element_type'])
+            for p in picks if p.get('position', 99) <= 11 and p['element'] in index.elements
+        ]
+        formation = '-'.join(str(starters.count(pos)) for pos in ('DEF', 'MID', 'FWD'))
+
         team = Team(
             budget=budget,
             players=players,
-            formation="",  # We don't need formation for transfer analysis
+            formation=formation,
             free_transfers=free_transfers
         )
         
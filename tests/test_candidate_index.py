@@ -0,0 +1,57 @@
+import random
+import pytest
+from src.analysis.candidate_index import CandidateIndex
+
+POSITIONS = ['GKP', 'DEF', 'MID', 'FWD']
+
+
+def random_pool(seed, size=150):
+    rng = random.Random(seed)
+    # Scores on a coarse grid so ties are common
+    return [
+        (player_id, rng.choice(POSITIONS), rng.randint(40, 130) / 10, rng.randint(0, 20) / 2)
+        for player_id in range(size)
+    ]
+
+
+def brute_force(pool, position, max_price, k, exclude=(), above_price=None):
+    """Stable sort by score over the matching players, as top_k promises"""
+    matching = [
+        (player_id, score) for player_id, pos, price, score in pool
+        if pos == position and price <= max_price and player_id not in exclude
+        and (above_price is None or price > above_price)
+    ]
+    return sorted(matching, key=lambda m: -m[1])[:k]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_top_k_matches_brute_force(seed):
+    pool = random_pool(seed)
+    index = CandidateIndex(pool)
+    rng = random.Random(seed)
+    for _ in range(50):
+        position = rng.choice(POSITIONS)
+        max_price = rng.randint(40, 130) / 10
+        above_price = rng.choice([None, rng.randint(40, 130) / 10])
+        k = rng.randint(1, 12)
+        exclude = set(rng.sample(range(len(pool)), 30))
+
+        assert index.top_k(position, max_price, k, exclude, above_price) == \
+            brute_force(pool, position, max_price, k, exclude, above_price)
+
+
+def test_tree_is_built_on_the_first_query():
+    index = CandidateIndex(random_pool(0))
+    block = index.positions['MID']
+    assert block.tree is None
+    assert len(block.score_array) == len(block.ids)
+
+    index.top_k('MID', 13.0, 3)
+    assert block.tree is not None
+
+
+def test_unknown_position_and_empty_ranges():
+    index = CandidateIndex(random_pool(1))
+    assert index.top_k('GK', 13.0, 5) == []
+    assert index.top_k('MID', 1.0, 5) == []
+    assert index.top_k('MID', 13.0, 0) == []
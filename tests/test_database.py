@@ -0,0 +1,119 @@
+from dataclasses import replace
+from datetime import datetime
+import pytest
+from src.models.player import Player
+from src.models.prediction import PlayerPrediction
+from src.utils.database import HISTORY_COLUMNS, Database
+
+
+def prediction(player_id, gameweek, points, confidence):
+    return PlayerPrediction(
+        player_id=player_id, gameweek=gameweek, predicted_points=points, confidence_score=confidence,
+        form_score=0.5, fixture_difficulty=3.0, expected_goals=0.1, expected_assists=0.1,
+        clean_sheet_probability=0.3, minutes_probability=0.9,
+        prediction_date=datetime(2026, 10, 17)
+    )
+
+
+def history_row(player_id):
+    return {'player_id': player_id, 'fixtures': 1, **{column: 0 for column in HISTORY_COLUMNS}}
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'fpl.db'))
+    db.save_predictions_batch([
+        prediction(1, 4, 6.0, 0.82), prediction(2, 4, 2.0, 0.85),
+        prediction(3, 4, 4.0, 0.31), prediction(1, 5, 5.0, 0.8)
+    ])
+    return db
+
+
+POSITIONS = {1: 'MID', 2: 'MID', 3: 'DEF'}
+
+
+def test_gameweeks_are_unsettled_until_history_and_accuracy(db):
+    assert db.get_unsettled_gameweeks() == []
+    db.save_gameweek_history(4, [history_row(player_id) for player_id in POSITIONS])
+    assert db.get_unsettled_gameweeks() == [4]
+
+    db.settle_gameweek(4, {1: 8, 2: 2, 3: 1}, POSITIONS)
+    assert db.get_unsettled_gameweeks() == []
+
+
+def test_settlement_breaks_accuracy_down(db):
+    settled = db.settle_gameweek(4, {1: 8, 2: 2, 3: 1}, POSITIONS)
+
+    assert settled == 3
+    rows = {(row['position'], row['confidence_bucket']): row for row in db.get_accuracy_breakdown(4)}
+    assert sorted(rows) == [('ALL', 0.3), ('ALL', 0.8), ('DEF', 0.3), ('MID', 0.8)]
+    mid = rows[('MID', 0.8)]
+    assert mid['predictions'] == 2
+    assert mid['mean_absolute_error'] == pytest.approx(1.0)
+    assert mid['bias'] == pytest.approx(-1.0)
+    assert mid['mean_actual'] == pytest.approx(5.0)
+    assert mid['mean_confidence'] == pytest.approx(0.835)
+    assert rows[('DEF', 0.3)]['bias'] == pytest.approx(3.0)
+
+    accuracy = db.get_prediction_accuracy(4)
+    assert accuracy['total_predictions'] == 3
+    assert accuracy['average_error'] == pytest.approx(5 / 3)
+    assert accuracy['average_confidence'] == pytest.approx((0.82 + 0.85 + 0.31) / 3)
+    assert db.get_accuracy_breakdown(5) == []
+
+
+def test_resettling_replaces_the_accuracy_rows(db):
+    db.settle_gameweek(4, {1: 8, 2: 2, 3: 1}, POSITIONS)
+    db.settle_gameweek(4, {3: 4}, POSITIONS)
+
+    rows = db.get_accuracy_breakdown(4)
+    assert sum(row['predictions'] for row in rows if row['position'] == 'ALL') == 3
+    assert db.get_prediction_accuracy(4)['average_error'] == pytest.approx(2 / 3)
+
+
+def test_unsettled_accuracy_falls_back_to_predictions(db):
+    db.update_actual_points(1, 5, 3.0)
+
+    accuracy = db.get_prediction_accuracy(5)
+    assert accuracy['total_predictions'] == 1
+    assert accuracy['average_error'] == pytest.approx(2.0)
+
+
+def player(player_id, price=5.0, form=2.0, total_points=20):
+    return Player(player_id, f"P{player_id}", 'ARS', 'MID', price, total_points, form,
+                  [], [], [], [], [])
+
+
+def stored(db, column):
+    with db.get_connection() as conn:
+        return dict(conn.execute(f'SELECT id, {column} FROM players').fetchall())
+
+
+def test_save_players_writes_only_changed_rows(tmp_path):
+    db = Database(str(tmp_path / 'fpl.db'))
+    players = [player(player_id) for player_id in (1, 2, 3)]
+
+    assert db.save_players(players) == {'inserted': 3, 'updated': 0}
+    before = stored(db, 'timestamp')
+    assert db.save_players(players) == {'inserted': 0, 'updated': 0}
+    assert stored(db, 'timestamp') == before
+
+    changed = [replace(players[0], total_points=26), players[1], players[2], player(4)]
+    assert db.save_players(changed) == {'inserted': 1, 'updated': 1}
+    after = stored(db, 'timestamp')
+    assert after[2] == before[2] and after[3] == before[3]
+    assert stored(db, 'total_points')[1] == 26
+    # Points alone are not a price or form movement
+    assert db.get_player_changes() == []
+
+
+def test_price_and_form_movements_are_logged(tmp_path):
+    db = Database(str(tmp_path / 'fpl.db'))
+    db.save_players([player(1), player(2)])
+    db.save_players([player(1, price=5.1), player(2, form=3.5)])
+
+    changes = db.get_player_changes()
+    assert [(c['player_id'], c['old_price'], c['new_price'], c['old_form'], c['new_form'])
+            for c in changes] == [(1, 5.0, 5.1, 2.0, 2.0), (2, 5.0, 5.0, 2.0, 3.5)]
+    assert db.get_player_changes(since=changes[0]['changed_at']) == []
+    assert stored(db, 'price') == {1: 5.1, 2: 5.0}
@@ -0,0 +1,122 @@
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+import pytest
+import requests
+from src.utils import data_fetcher
+from src.utils.data_fetcher import FPLDataFetcher
+from src.utils.http_cache import HTTPCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HTTPCache(str(tmp_path / 'cache.db'), max_bytes=1000)
+
+
+def accessed_at(cache, url):
+    with sqlite3.connect(cache.db_path) as conn:
+        return conn.execute('SELECT accessed_at FROM http_cache WHERE url = ?', (url,)).fetchone()[0]
+
+
+def test_entries_are_fresh_then_stale(cache):
+    cache.put('a', b'body', '"v1"', None, ttl=60)
+    entry = cache.get('a')
+    assert entry.body == b'body' and entry.etag == '"v1"'
+    assert entry.is_fresh(entry.fetched_at + 59)
+    assert not entry.is_fresh(entry.fetched_at + 61)
+    assert entry.is_usable_stale(entry.fetched_at + 61, stale_window=30)
+    assert not entry.is_usable_stale(entry.fetched_at + 91, stale_window=30)
+    assert cache.get('missing') is None
+
+
+def test_hits_do_not_write_until_the_flush_interval(cache, monkeypatch):
+    cache.put('a', b'body', None, None, ttl=60)
+    stored = accessed_at(cache, 'a')
+    cache.get('a')
+    assert accessed_at(cache, 'a') == stored
+
+    monkeypatch.setattr(HTTPCache, 'ACCESS_FLUSH_INTERVAL', 0)
+    cache.get('a')
+    assert accessed_at(cache, 'a') > stored
+
+
+def test_eviction_uses_unflushed_access_times(cache):
+    cache.put('old', b'x' * 400, None, None, ttl=60)
+    cache.put('newer', b'x' * 400, None, None, ttl=60)
+    cache.get('old')  # now the most recently used, though not yet written
+    cache.put('newest', b'x' * 400, None, None, ttl=60)
+
+    assert cache.get('newer') is None
+    assert cache.get('old') is not None and cache.get('newest') is not None
+
+
+def test_touch_extends_an_entry(cache):
+    cache.put('a', b'body', None, None, ttl=1)
+    before = cache.get('a').expires_at
+    cache.touch('a', ttl=600)
+    assert cache.get('a').expires_at > before + 500
+
+
+class FakeClient:
+    def __init__(self, status=200, body=None, etag='"v1"'):
+        self.status = status
+        self.body = body if body is not None else {'ok': True}
+        self.etag = etag
+        self.calls = []
+
+    def get(self, url, headers=None):
+        self.calls.append((url, headers or {}))
+        response = requests.Response()
+        response.status_code = self.status
+        response._content = json.dumps(self.body).encode()
+        response.headers['ETag'] = self.etag
+        return response
+
+
+@pytest.fixture
+def fetcher(cache, monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(FPLDataFetcher, '_cache', cache)
+    monkeypatch.setattr(data_fetcher, 'get_client', lambda: client)
+    return client
+
+
+def test_fresh_responses_are_served_from_the_cache(fetcher):
+    assert FPLDataFetcher.fetch_fixtures() == {'ok': True}
+    assert FPLDataFetcher.fetch_fixtures() == {'ok': True}
+    assert len(fetcher.calls) == 1
+
+
+def test_expired_responses_are_revalidated(fetcher, cache, monkeypatch):
+    FPLDataFetcher.fetch_fixtures()
+    url = fetcher.calls[0][0]
+    with sqlite3.connect(cache.db_path) as conn:
+        conn.execute('UPDATE http_cache SET expires_at = 0 WHERE url = ?', (url,))
+
+    fetcher.status = 304
+    assert FPLDataFetcher.fetch_fixtures() == {'ok': True}
+    assert fetcher.calls[1][1]['If-None-Match'] == '"v1"'
+    assert cache.get(url).is_fresh(cache.get(url).fetched_at)
+
+
+def test_settled_gameweeks_are_cached_as_immutable(fetcher, cache):
+    FPLDataFetcher.fetch_live_gameweek(3, settled=True)
+    entry = cache.get(fetcher.calls[0][0])
+    assert entry.expires_at - entry.fetched_at == FPLDataFetcher.IMMUTABLE_TTL
+
+
+def test_history_is_kept_until_the_next_deadline_between_gameweeks(monkeypatch):
+    # _note_schedule sets class state; let monkeypatch restore it
+    monkeypatch.setattr(FPLDataFetcher, '_next_deadline', None)
+    monkeypatch.setattr(FPLDataFetcher, '_results_pending', True)
+    now = datetime.now(timezone.utc)
+
+    def event(days, **flags):
+        deadline = (now + timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        return {'deadline_time': deadline, **flags}
+
+    FPLDataFetcher._note_schedule([event(-3, is_current=True, data_checked=True), event(4)])
+    assert FPLDataFetcher._history_ttl() == pytest.approx(4 * 24 * 60 * 60, abs=60)
+
+    FPLDataFetcher._note_schedule([event(-3, is_current=True, data_checked=False), event(4)])
+    assert FPLDataFetcher._history_ttl() is None
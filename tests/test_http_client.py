@@ -0,0 +1,81 @@
+import pytest
+import requests
+from src.utils import http_client
+from src.utils.http_client import FPLClient
+
+
+class FakeSession:
+    """Answers GETs from a list of status codes or exceptions"""
+
+    def __init__(self, outcomes, headers=None):
+        self.outcomes = list(outcomes)
+        self.headers = headers or {}
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.headers.update(self.headers)
+        return response
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(http_client.time, 'sleep', slept.append)
+    return slept
+
+
+def client(**kwargs):
+    return FPLClient(rate=1000, burst=100, **kwargs)
+
+
+def test_retries_server_errors_then_succeeds(sleeps):
+    session = FakeSession([503, requests.ConnectionError(), 200])
+    response = client(max_retries=3).get('https://example.com/api/entry/123/', session=session)
+
+    assert response.status_code == 200
+    assert session.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_gives_up_after_max_retries(sleeps):
+    session = FakeSession([500, 500, 500])
+    response = client(max_retries=2).get('https://example.com/api/', session=session)
+    assert response.status_code == 500
+    assert session.calls == 3
+
+
+def test_does_not_retry_client_errors(sleeps):
+    session = FakeSession([404])
+    assert client().get('https://example.com/api/', session=session).status_code == 404
+    assert sleeps == []
+
+
+def test_retry_after_is_honoured_up_to_the_cap(sleeps):
+    session = FakeSession([429, 200], headers={'Retry-After': '3600'})
+    client(max_backoff=30).get('https://example.com/api/', session=session)
+    assert sleeps == [30]
+
+    session = FakeSession([429, 200], headers={'Retry-After': '2'})
+    client(max_backoff=30).get('https://example.com/api/', session=session)
+    assert sleeps[-1] == 2
+
+
+def test_jittered_backoff_is_capped(sleeps):
+    session = FakeSession([502] * 6 + [200])
+    client(max_retries=6, backoff_base=10, max_backoff=5).get('https://example.com/api/', session=session)
+    assert len(sleeps) == 6
+    assert all(0 <= delay <= 5 for delay in sleeps)
+
+
+def test_stats_group_by_endpoint(sleeps):
+    fpl = client()
+    fpl.get('https://example.com/api/entry/1/history/', session=FakeSession([200]))
+    fpl.get('https://example.com/api/entry/2/history/', session=FakeSession([503, 200]))
+    stats = fpl.get_stats()['/api/entry/{id}/history/']
+    assert (stats['requests'], stats['errors'], stats['retries']) == (3, 1, 1)
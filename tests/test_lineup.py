@@ -0,0 +1,84 @@
+import itertools
+from datetime import datetime
+import pytest
+from src.analysis.lineup import STARTER_RANGES, LineupOptimizer
+from src.models.prediction import PlayerPrediction
+
+SQUAD = (
+    [('GKP', 4.0, 1.0), ('GKP', 3.0, 1.0)]
+    + [('DEF', points, 0.9) for points in (6.0, 5.0, 4.5, 2.0, 1.0)]
+    + [('MID', points, 0.8) for points in (9.0, 7.0, 5.5, 3.0, 2.5)]
+    + [('FWD', points, 0.6) for points in (8.0, 3.5, 1.5)]
+)
+
+
+def prediction(player_id, points, play_probability):
+    return PlayerPrediction(
+        player_id=player_id, gameweek=1, predicted_points=points, confidence_score=0.5,
+        form_score=0.5, fixture_difficulty=3.0, expected_goals=0.0, expected_assists=0.0,
+        clean_sheet_probability=0.0, minutes_probability=play_probability,
+        prediction_date=datetime(2026, 10, 17)
+    )
+
+
+@pytest.fixture
+def squad():
+    predictions = [prediction(i, points, prob) for i, (_, points, prob) in enumerate(SQUAD)]
+    positions = {i: position for i, (position, _, _) in enumerate(SQUAD)}
+    return predictions, positions
+
+
+def best_xi_by_brute_force(predictions, positions):
+    """Most XI points plus the top starter again as captain"""
+    points = {p.player_id: p.predicted_points for p in predictions}
+    keeper = max((i for i in points if positions[i] == 'GKP'), key=points.get)
+    outfield = [i for i in points if positions[i] != 'GKP']
+    best = 0.0
+    for starters in itertools.combinations(outfield, 10):
+        counts = {pos: sum(positions[i] == pos for i in starters) for pos in STARTER_RANGES}
+        if all(lo <= counts[pos] <= hi for pos, (lo, hi) in STARTER_RANGES.items()):
+            xi = [points[i] for i in starters] + [points[keeper]]
+            best = max(best, sum(xi) + max(xi))
+    return best
+
+
+def test_picks_the_best_legal_xi_without_autosubs(squad):
+    lineup = LineupOptimizer(include_autosubs=False).optimize(*squad)
+    predictions, positions = squad
+
+    assert lineup.expected_points == pytest.approx(best_xi_by_brute_force(predictions, positions))
+    assert len(lineup.starters) == 11 and len(lineup.bench) == 4
+    assert set(lineup.starters) | set(lineup.bench) == set(positions)
+    assert lineup.bench[0] == 1  # reserve keeper first
+    assert (lineup.captain_id, lineup.vice_captain_id) == (7, 12)
+    defenders, midfielders, forwards = map(int, lineup.formation.split('-'))
+    assert defenders + midfielders + forwards == 10
+
+
+def test_autosubs_only_add_expected_points(squad):
+    plain = LineupOptimizer(include_autosubs=False).optimize(*squad)
+    with_subs = LineupOptimizer().optimize(*squad)
+    assert with_subs.expected_points >= plain.expected_points
+    assert with_subs.bench[0] == 1
+
+
+def test_certain_starters_gain_nothing_from_the_bench(squad):
+    predictions, positions = squad
+    for p in predictions:
+        p.minutes_probability = 1.0
+    plain = LineupOptimizer(include_autosubs=False).optimize(predictions, positions)
+    with_subs = LineupOptimizer().optimize(predictions, positions)
+    assert with_subs.expected_points == pytest.approx(plain.expected_points)
+
+
+def test_squad_without_a_goalkeeper_is_rejected(squad):
+    predictions, positions = squad
+    with pytest.raises(ValueError):
+        LineupOptimizer().optimize(predictions[2:], positions)
+
+
+def test_squad_that_cannot_field_a_formation_is_rejected(squad):
+    predictions, positions = squad
+    no_forwards = [p for p in predictions if positions[p.player_id] != 'FWD']
+    with pytest.raises(ValueError):
+        LineupOptimizer().optimize(no_forwards, positions)
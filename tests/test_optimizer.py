@@ -0,0 +1,140 @@
+import itertools
+import random
+import time
+import pytest
+from src.analysis.optimizer import TransferOptimizer
+from src.models.player import Player
+from src.models.team import Team
+
+QUOTAS = {'GK': 2, 'DEF': 5, 'MID': 5, 'FWD': 3}
+
+
+def player(player_id, position, club, price):
+    return Player(player_id, f"P{player_id}", club, position, price, 10, 1.0,
+                  [90] * 5, [0] * 5, [0] * 5, [0] * 5, [])
+
+
+@pytest.fixture
+def market():
+    rng = random.Random(11)
+    players = [
+        player(player_id, position, rng.randint(1, 20), rng.randint(40, 120) / 10)
+        for player_id, position in enumerate(
+            [p for p, count in QUOTAS.items() for _ in range(count * 6)]
+        )
+    ]
+    squad = []
+    for position, count in QUOTAS.items():
+        squad += [p for p in players if p.position == position][:count]
+    points = {p.id: rng.uniform(0, 10) for p in players}
+    return Team(budget=1.0, players=squad, formation='', free_transfers=1), players, points
+
+
+def best_single_or_double(team, players, points, optimizer):
+    """Best net gain from up to two transfers, by exhaustive search"""
+    squad_ids = {p.id for p in team.players}
+    pool = [p for p in players if p.id not in squad_ids]
+    best = 0.0
+    for n in (1, 2):
+        for outs in itertools.combinations(team.players, n):
+            for ins in itertools.permutations(pool, n):
+                if any(o.position != i.position for o, i in zip(outs, ins)):
+                    continue
+                spent = sum(round(i.price * 10) - round(o.price * 10) for o, i in zip(outs, ins))
+                if spent > round(team.budget * 10):
+                    continue
+                squad = [p for p in team.players if p not in outs] + list(ins)
+                if max(sum(p.team == c for p in squad) for c in {p.team for p in squad}) > 3:
+                    continue
+                gain = sum(points[i.id] - points[o.id] for o, i in zip(outs, ins))
+                best = max(best, gain - max(0, n - team.free_transfers) * optimizer.HIT_COST)
+    return best
+
+
+def test_plan_transfers_finds_the_best_plan(market):
+    team, players, points = market
+    optimizer = TransferOptimizer(predictor=None)
+    plans = optimizer.plan_transfers(team, players, max_transfers=2, top_n=3, points=points)
+
+    assert plans[0].net_gain == pytest.approx(best_single_or_double(team, players, points, optimizer))
+    assert [p.net_gain for p in plans] == sorted((p.net_gain for p in plans), reverse=True)
+    for plan in plans:
+        assert all(o.position == i.position for o, i in plan.transfers)
+        assert plan.remaining_budget >= 0
+
+
+def test_players_missing_from_points_count_as_zero(market):
+    team, players, points = market
+    optimizer = TransferOptimizer(predictor=None)
+    partial = {player_id: value for player_id, value in points.items() if player_id % 2}
+
+    plans = optimizer.plan_transfers(team, players, max_transfers=1, points=partial)
+    for plan in plans:
+        for player_out, player_in in plan.transfers:
+            assert plan.point_gain == pytest.approx(
+                partial.get(player_in.id, 0.0) - partial.get(player_out.id, 0.0)
+            )
+
+
+def test_a_later_sale_can_fund_an_earlier_purchase():
+    defenders = [player(i, 'DEF', i, 4.5) for i in range(5)]
+    squad = [player(10, 'GK', 10, 4.0), player(11, 'GK', 11, 4.0)] + defenders + [
+        player(20 + i, 'MID', 20 + i, 5.0) for i in range(5)
+    ] + [player(30 + i, 'FWD', 30 + i, 6.0) for i in range(2)] + [player(40, 'FWD', 40, 12.0)]
+    # The only upgrade is a defender the bank can't cover until the
+    # expensive forward (listed after him) is sold for a cheap one
+    expensive_def = player(50, 'DEF', 50, 8.0)
+    cheap_fwd = player(51, 'FWD', 51, 4.5)
+    points = {p.id: 2.0 for p in squad}
+    points.update({expensive_def.id: 9.0, cheap_fwd.id: 2.0})
+    team = Team(budget=0.0, players=squad, formation='', free_transfers=2)
+
+    plans = TransferOptimizer(predictor=None).plan_transfers(
+        team, squad + [expensive_def, cheap_fwd], max_transfers=2, top_n=1, points=points
+    )
+    assert {(o.id, i.id) for o, i in plans[0].transfers} == {(0, 50), (40, 51)}
+    assert plans[0].remaining_budget == pytest.approx(4.0)
+
+
+@pytest.fixture
+def full_market():
+    """A season-sized pool and the squad that maximises points on it"""
+    from src.analysis.squad_builder import SquadBuilder
+    rng = random.Random(3)
+    shares = {'GK': 0.12, 'DEF': 0.34, 'MID': 0.38, 'FWD': 0.16}
+    players = [
+        player(player_id, position, rng.randint(1, 20), rng.randint(40, 140) / 10)
+        for player_id, position in enumerate(
+            [p for p, share in shares.items() for _ in range(int(700 * share))]
+        )
+    ]
+    # Points track price, so nearly every upgrade is just out of reach
+    points = {p.id: 5 * max(0.0, p.price / 2.5 + rng.gauss(0, 0.3)) for p in players}
+    selection = SquadBuilder(
+        (p.id, 'GKP' if p.position == 'GK' else p.position, p.team, p.price, points[p.id])
+        for p in players
+    ).build(budget=99.5)
+    by_id = {p.id: p for p in players}
+    squad = [by_id[player_id] for player_id in selection.starters + selection.bench]
+    return Team(budget=0.5, players=squad, formation='', free_transfers=3), players, points
+
+
+def test_three_transfers_over_a_full_pool_are_fast(full_market):
+    team, players, points = full_market
+    started = time.monotonic()
+    plans = TransferOptimizer(predictor=None).plan_transfers(
+        team, players, max_transfers=3, top_n=5, points=points
+    )
+    assert time.monotonic() - started < 1.0
+    assert len(plans) == 5
+
+
+def test_search_stops_at_the_deadline(full_market):
+    team, players, points = full_market
+    started = time.monotonic()
+    plans = TransferOptimizer(predictor=None).plan_transfers(
+        team, players, max_transfers=3, top_n=5, points=points, deadline=started
+    )
+    # The greedy seed still gives an answer
+    assert time.monotonic() - started < 0.5
+    assert plans
@@ -0,0 +1,70 @@
+import random
+import time
+import pytest
+from src.analysis.optimizer import TransferOptimizer
+from src.analysis.planner import TransferPlanner
+from src.models.player import Player
+from src.models.team import Team
+
+QUOTAS = {'GK': 2, 'DEF': 5, 'MID': 5, 'FWD': 3}
+
+
+def player(player_id, position, club, price):
+    return Player(player_id, f"P{player_id}", club, position, price, 10, 1.0,
+                  [90] * 5, [0] * 5, [0] * 5, [0] * 5, [])
+
+
+@pytest.fixture
+def market():
+    rng = random.Random(7)
+    players = [
+        player(player_id, position, rng.randint(1, 20), rng.randint(40, 120) / 10)
+        for player_id, position in enumerate(
+            [p for p, count in QUOTAS.items() for _ in range(count * 10)]
+        )
+    ]
+    squad = []
+    for position, count in QUOTAS.items():
+        squad += [p for p in players if p.position == position][:count]
+    gameweek_points = {
+        gameweek: {p.id: rng.uniform(0, 8) for p in players} for gameweek in range(10, 14)
+    }
+    return Team(budget=1.0, players=squad, formation='', free_transfers=1), players, gameweek_points
+
+
+class SlowOptimizer(TransferOptimizer):
+    """Runs each expansion until its deadline, as a huge search would"""
+
+    def __init__(self):
+        super().__init__(predictor=None)
+        self.deadlines = []
+
+    def plan_transfers(self, *args, deadline=None, **kwargs):
+        self.deadlines.append(deadline)
+        time.sleep(max(0.0, deadline - time.monotonic()) if deadline is not None else 5.0)
+        return []
+
+
+def test_plans_every_gameweek_within_the_bank(market):
+    team, players, gameweek_points = market
+    plan = TransferPlanner(TransferOptimizer(predictor=None)).plan(team, players, gameweek_points)
+
+    assert plan.complete
+    assert [step.gameweek for step in plan.steps] == [10, 11, 12, 13]
+    assert all(step.bank >= 0 for step in plan.steps)
+    assert plan.total_points == pytest.approx(
+        sum(step.expected_points - step.hit_cost for step in plan.steps)
+    )
+
+
+def test_time_budget_bounds_an_expansion_in_progress(market):
+    team, players, gameweek_points = market
+    optimizer = SlowOptimizer()
+
+    started = time.monotonic()
+    plan = TransferPlanner(optimizer).plan(team, players, gameweek_points, time_budget=0.2)
+
+    assert time.monotonic() - started < 1.0
+    assert not plan.complete
+    assert len(plan.steps) == 4
+    assert optimizer.deadlines and None not in optimizer.deadlines
@@ -0,0 +1,80 @@
+import gzip
+import json
+import pytest
+from src.utils.player_table import MAX_PAGE_SIZE, PlayerTable
+
+
+def row(player_id, name, team, position, price, total_points):
+    return {
+        'id': player_id, 'name': name, 'team': team, 'position': position,
+        'next_fixture': 'ARS (H)', 'price': price, 'form': 1.0,
+        'total_points': total_points, 'points_per_game': 1.0, 'minutes_per_game': 90.0,
+        'games_played': 1, 'predicted_points': 2, 'selected_by': 5.0
+    }
+
+
+@pytest.fixture
+def table():
+    return PlayerTable.from_rows([
+        row(1, 'Raya', 'Arsenal', 'GKP', 5.5, 80),
+        row(2, 'Saliba', 'Arsenal', 'DEF', 6.0, 90),
+        row(3, 'Salah', 'Liverpool', 'MID', 13.0, 150),
+        row(4, 'Saka', 'Arsenal', 'MID', 10.0, 120),
+        row(5, 'Haaland', 'Man City', 'FWD', 15.0, 140),
+        row(6, 'Alisson', 'Liverpool', 'GKP', 5.5, 70),
+    ])
+
+
+def ids(page):
+    return [r['id'] for r in page.rows]
+
+
+def test_payload_and_etag_follow_the_rows(table):
+    assert json.loads(gzip.decompress(table.gzip_body)) == json.loads(table.body)
+    assert PlayerTable.from_rows(table.rows).etag == table.etag
+
+
+def test_default_order_is_most_total_points_first(table):
+    page = table.query()
+    assert ids(page) == [3, 5, 4, 2, 1, 6]
+    assert (page.total, page.filtered) == (6, 6)
+
+
+def test_filters_combine(table):
+    page = table.query(team='arsenal', min_price=5.6, max_price=10.0)
+    assert ids(page) == [4, 2]
+    assert page.filtered == 2
+
+
+def test_position_accepts_the_gk_alias(table):
+    assert ids(table.query(position='GK')) == ids(table.query(position='GKP')) == [1, 6]
+
+
+def test_search_matches_within_names_case_insensitively(table):
+    assert ids(table.query(search='SAL')) == [3, 2]
+
+
+def test_text_sort_ignores_case_and_ties_keep_table_order(table):
+    assert ids(table.query(sort='name', descending=False)) == [6, 5, 1, 4, 3, 2]
+    assert ids(table.query(sort='price', descending=False))[:2] == [1, 6]
+
+
+def test_pages_split_the_filtered_rows(table):
+    first = table.query(page_size=4)
+    second = table.query(page=2, page_size=4)
+    assert ids(first) + ids(second) == ids(table.query())
+    assert ids(table.query(page=3, page_size=4)) == []
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'sort': 'id'}, {'page': 0}, {'page_size': 0}, {'page_size': MAX_PAGE_SIZE + 1}
+])
+def test_rejects_bad_queries(table, kwargs):
+    with pytest.raises(ValueError):
+        table.query(**kwargs)
+
+
+def test_query_etag_depends_on_params_not_their_order(table):
+    a = table.query_etag([('team', 'Arsenal'), ('page', '2')])
+    assert a == table.query_etag([('page', '2'), ('team', 'Arsenal')])
+    assert a != table.query_etag([('team', 'Arsenal'), ('page', '1')])
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from src.utils.database import Database
+from src.utils.prediction_archive import PredictionArchive, merge_prediction_arrays
+
+
+def columns(player_ids, **values):
+    arrays = {'player_id': np.array(player_ids, dtype=np.int64)}
+    arrays.update({name: np.array(column) for name, column in values.items()})
+    return arrays
+
+
+def test_write_then_read_columns(tmp_path):
+    archive = PredictionArchive(tmp_path)
+    archive.write(3, columns([2, 1], predicted_points=[4.0, 2.5], input_hash=['b', 'a']))
+    archive.write(12, columns([1], predicted_points=[1.0], input_hash=['c']))
+
+    assert archive.gameweeks() == [3, 12]
+    assert archive.read(4) is None
+    subset = archive.read(3, ['predicted_points'])
+    assert list(subset) == ['player_id', 'predicted_points']
+    assert subset['predicted_points'].tolist() == [4.0, 2.5]
+    with pytest.raises(ValueError):
+        archive.read(3, ['actual_points'])
+
+
+def test_rewriting_a_gameweek_merges_rows(tmp_path):
+    archive = PredictionArchive(tmp_path)
+    archive.write(5, columns([1, 2], predicted_points=[1.0, 2.0]))
+    archive.write(5, columns([2, 3], predicted_points=[20.0, 3.0]))
+
+    arrays = archive.read(5)
+    assert arrays['player_id'].tolist() == [1, 2, 3]
+    assert arrays['predicted_points'].tolist() == [1.0, 20.0, 3.0]
+
+
+def test_rewriting_with_other_columns_keeps_both(tmp_path):
+    archive = PredictionArchive(tmp_path)
+    archive.write(5, columns([1, 2], predicted_points=[1.0, 2.0], input_hash=['a', 'b']))
+    archive.write(5, columns([3], actual_points=[7.0]))
+
+    arrays = archive.read(5)
+    assert arrays['player_id'].tolist() == [1, 2, 3]
+    np.testing.assert_array_equal(arrays['predicted_points'], [1.0, 2.0, np.nan])
+    np.testing.assert_array_equal(arrays['actual_points'], [np.nan, np.nan, 7.0])
+    assert arrays['input_hash'].tolist() == ['a', 'b', '']
+
+
+def test_merge_prefers_new_rows():
+    merged = merge_prediction_arrays(
+        columns([1, 2], predicted_points=[1.0, 2.0]),
+        columns([2], predicted_points=[9.0])
+    )
+    assert merged['player_id'].tolist() == [1, 2]
+    assert merged['predicted_points'].tolist() == [1.0, 9.0]
+
+
+def test_cleanup_archives_old_gameweeks(tmp_path):
+    db = Database(str(tmp_path / 'fpl.db'))
+    with db.get_connection() as conn:
+        conn.executemany('''
+            INSERT INTO player_predictions (player_id, gameweek, predicted_points, confidence_score,
+                                            prediction_date, input_hash)
+            VALUES (?, ?, ?, 0.5, '2026-10-17', 'h')
+        ''', [(player_id, gameweek, player_id + gameweek / 10)
+              for gameweek in range(1, 6) for player_id in (1, 2)])
+        conn.commit()
+
+    removed = db.cleanup_old_predictions(keep_weeks=2, archive_dir=tmp_path / 'archive')
+
+    assert removed == [1, 2]
+    archive = PredictionArchive(tmp_path / 'archive')
+    assert archive.gameweeks() == [1, 2]
+    assert archive.read(2)['predicted_points'].tolist() == [1.2, 2.2]
+    # Archived and stored gameweeks read back the same way
+    read_back = dict(db.iter_prediction_arrays(columns=['predicted_points'],
+                                               archive_dir=tmp_path / 'archive'))
+    assert sorted(read_back) == [1, 2, 3, 4, 5]
+    assert read_back[1]['predicted_points'].tolist() == [1.1, 2.1]
+    assert read_back[5]['predicted_points'].tolist() == [1.5, 2.5]
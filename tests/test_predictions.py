@@ -0,0 +1,103 @@
+import random
+import pytest
+from src.analysis.predictions import PredictionEngine
+
+FIELDS = [
+    'predicted_points', 'confidence_score', 'form_score', 'fixture_difficulty',
+    'expected_goals', 'expected_assists', 'clean_sheet_probability', 'minutes_probability'
+]
+
+
+def random_players(seed, count=60):
+    rng = random.Random(seed)
+    players, histories, team_ids, fixtures = [], [], [], []
+    for player_id in range(1, count + 1):
+        club = rng.randint(1, 20)
+        players.append({
+            'id': player_id,
+            'name': f"Player {player_id}",
+            'team': f"Club {club}",  # the name, as update_predictions passes it
+            'position': rng.choice(['GKP', 'DEF', 'MID', 'FWD']),
+        })
+        # Some players have no history and some fewer than five games
+        histories.append([
+            {
+                'total_points': rng.randint(0, 15),
+                'minutes': rng.choice([0, 30, 60, 90]),
+                'goals_scored': rng.randint(0, 2),
+                'assists': rng.randint(0, 2),
+                'clean_sheets': rng.randint(0, 1),
+            }
+            for _ in range(rng.choice([0, 1, 3, 5, 9]))
+        ])
+        team_ids.append(club)
+        opponent = club % 20 + 1
+        home = rng.random() < 0.5
+        fixtures.append({
+            'team_h': club if home else opponent,
+            'team_a': opponent if home else club,
+            'team_h_difficulty': rng.randint(2, 5),
+            'team_a_difficulty': rng.randint(2, 5),
+        })
+    return players, histories, team_ids, fixtures
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_batch_matches_scalar_predictions(seed):
+    engine = PredictionEngine()
+    players, histories, team_ids, fixtures = random_players(seed)
+
+    difficulty, is_home = engine.build_fixture_arrays(team_ids, fixtures)
+    batch = engine.generate_predictions_batch(
+        players, engine.build_history_matrix(histories), difficulty, is_home, gameweek=7
+    )
+    scalar = [
+        engine.generate_prediction(player, history, fixture, 7, team_id)
+        for player, history, fixture, team_id in zip(players, histories, fixtures, team_ids)
+    ]
+
+    assert [p.player_id for p in batch] == [p.player_id for p in scalar]
+    assert all(p.gameweek == 7 for p in batch)
+    for field in FIELDS:
+        assert [getattr(p, field) for p in batch] == pytest.approx(
+            [getattr(p, field) for p in scalar], abs=1e-9
+        ), field
+
+
+def test_home_fixtures_are_decided_by_club_id():
+    engine = PredictionEngine()
+    fixture = {'team_h': 3, 'team_a': 4, 'team_h_difficulty': 2, 'team_a_difficulty': 5}
+    difficulty, is_home = engine.build_fixture_arrays([3, 4], [fixture, fixture])
+    assert is_home.tolist() == [True, False]
+    assert difficulty.tolist() == [2.0, 5.0]
+
+
+def test_empty_batch():
+    engine = PredictionEngine()
+    assert engine.generate_predictions_batch(
+        [], engine.build_history_matrix([]), *engine.build_fixture_arrays([], []), gameweek=1
+    ) == []
+
+
+def test_double_gameweek_counts_as_two_games():
+    engine = PredictionEngine()
+    player = {'id': 1, 'name': 'Player 1', 'team': 'Club 3', 'position': 'MID'}
+    single = {'total_points': 6, 'minutes': 90, 'goals_scored': 1, 'assists': 0,
+              'clean_sheets': 0, 'fixtures': 1}
+    double = {'total_points': 12, 'minutes': 180, 'goals_scored': 2, 'assists': 0,
+              'clean_sheets': 0, 'fixtures': 2}
+    fixture = {'team_h': 3, 'team_a': 4, 'team_h_difficulty': 3, 'team_a_difficulty': 3}
+
+    as_double = [single, single, double]
+    as_singles = [single] * 4
+    assert engine.calculate_form_metrics(as_double, player) == \
+        pytest.approx(engine.calculate_form_metrics(as_singles, player))
+
+    scalar = engine.generate_prediction(player, as_double, fixture, 7, 3)
+    difficulty, is_home = engine.build_fixture_arrays([3], [fixture])
+    batch = engine.generate_predictions_batch(
+        [player], engine.build_history_matrix([as_double]), difficulty, is_home, gameweek=7
+    )[0]
+    assert scalar.minutes_probability == pytest.approx(1.0)
+    assert batch.minutes_probability == pytest.approx(1.0)
+    assert batch.predicted_points == pytest.approx(scalar.predicted_points)
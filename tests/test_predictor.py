@@ -0,0 +1,68 @@
+import os
+import random
+import joblib
+import pytest
+from src.analysis.predictor import FPLPredictor
+from src.models.player import Player
+
+
+def make_players(seed, count=40):
+    rng = random.Random(seed)
+    return [
+        Player(player_id, f"P{player_id}", rng.randint(1, 20), rng.choice(['GK', 'DEF', 'MID', 'FWD']),
+               rng.randint(40, 130) / 10, rng.randint(0, 120), round(rng.uniform(0, 8), 1),
+               [rng.choice([0, 60, 90]) for _ in range(5)], [rng.randint(0, 1) for _ in range(5)],
+               [rng.randint(0, 1) for _ in range(5)], [rng.randint(0, 1) for _ in range(5)],
+               [{'is_home': rng.random() < 0.5, 'difficulty': rng.randint(2, 5)}])
+        for player_id in range(count)
+    ]
+
+
+def test_saved_artifact_round_trips(tmp_path):
+    players = make_players(0)
+    predictor = FPLPredictor()
+    predictor.train(players)
+    path = predictor.save(tmp_path)
+
+    loaded = FPLPredictor.load(path)
+    assert path == FPLPredictor.artifact_path(predictor.training_hash, tmp_path)
+    assert loaded.training_hash == predictor.training_hash
+    assert [p['predicted_points'] for p in loaded.predict_points_batch(players)] == \
+        pytest.approx([p['predicted_points'] for p in predictor.predict_points_batch(players)])
+
+
+def test_mismatched_artifacts_are_rejected(tmp_path):
+    predictor = FPLPredictor()
+    predictor.train(make_players(0))
+    path = predictor.save(tmp_path)
+
+    artifact = joblib.load(path)
+    joblib.dump({**artifact, 'version': FPLPredictor.ARTIFACT_VERSION + 1}, path)
+    with pytest.raises(ValueError):
+        FPLPredictor.load(path)
+    joblib.dump({**artifact, 'feature_schema': ['form']}, path)
+    with pytest.raises(ValueError):
+        FPLPredictor.load(path)
+
+
+def test_load_or_train_reuses_the_artifact_for_the_same_data(tmp_path, monkeypatch):
+    players = make_players(0)
+    first = FPLPredictor.load_or_train(players, tmp_path)
+
+    def fail(self, players):
+        raise AssertionError("retrained unchanged data")
+    monkeypatch.setattr(FPLPredictor, 'train', fail)
+    assert FPLPredictor.load_or_train(players, tmp_path).training_hash == first.training_hash
+
+
+def test_save_keeps_only_the_newest_artifacts(tmp_path):
+    paths = []
+    for seed in range(4):
+        predictor = FPLPredictor()
+        predictor.train(make_players(seed))
+        paths.append(predictor.save(tmp_path, keep=2))
+        # Distinct, increasing mtimes however coarse the filesystem clock
+        os.utime(paths[-1], (1000 + seed, 1000 + seed))
+
+    assert sorted(tmp_path.glob('*.joblib')) == sorted(paths[-2:])
+    assert FPLPredictor.load_latest(tmp_path).training_hash == predictor.training_hash
@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta, timezone
+from src.refresh import next_refresh_delay
+from src.config import (
+    MATCH_SETTLE_TIME, REFRESH_DEADLINE_LEAD, REFRESH_MAX_INTERVAL, REFRESH_MIN_INTERVAL
+)
+
+NOW = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc)
+
+
+def iso(when: datetime) -> str:
+    return when.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def event(deadline: datetime) -> dict:
+    return {'id': 1, 'deadline_time': iso(deadline)}
+
+
+def fixture(kickoff: datetime, finished: bool = False) -> dict:
+    return {'id': 1, 'kickoff_time': iso(kickoff), 'finished': finished}
+
+
+def test_nothing_scheduled_waits_the_maximum():
+    assert next_refresh_delay([], [], NOW) == REFRESH_MAX_INTERVAL
+
+
+def test_refreshes_shortly_before_a_deadline():
+    deadline = NOW + timedelta(seconds=REFRESH_DEADLINE_LEAD + 600)
+    assert next_refresh_delay([event(deadline)], [], NOW) == 600
+
+
+def test_refreshes_just_after_a_passed_lead_time():
+    # Inside the lead window the next stop is just after the deadline
+    deadline = NOW + timedelta(seconds=300)
+    assert next_refresh_delay([event(deadline)], [], NOW) == 300 + REFRESH_MIN_INTERVAL
+
+
+def test_refreshes_once_an_unfinished_match_should_be_settled():
+    kickoff = NOW - timedelta(seconds=MATCH_SETTLE_TIME - 900)
+    assert next_refresh_delay([], [fixture(kickoff)], NOW) == 900
+
+
+def test_ignores_finished_matches_and_past_times():
+    kickoff = NOW - timedelta(seconds=MATCH_SETTLE_TIME - 900)
+    deadline = NOW - timedelta(days=7)
+    delay = next_refresh_delay([event(deadline)], [fixture(kickoff, finished=True)], NOW)
+    assert delay == REFRESH_MAX_INTERVAL
+
+
+def test_never_refreshes_more_often_than_the_minimum():
+    deadline = NOW + timedelta(seconds=REFRESH_DEADLINE_LEAD + 1)
+    assert next_refresh_delay([event(deadline)], [], NOW) == REFRESH_MIN_INTERVAL
+
+
+def test_missing_times_are_skipped():
+    events = [{'id': 1, 'deadline_time': None}]
+    fixtures = [{'id': 1, 'kickoff_time': None, 'finished': False}]
+    assert next_refresh_delay(events, fixtures, NOW) == REFRESH_MAX_INTERVAL
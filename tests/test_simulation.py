@@ -0,0 +1,85 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from src.analysis.simulation import PointsSimulator, _simulate_job
+from src.models.prediction import PlayerPrediction
+
+
+def prediction(player_id, points, goals=0.0, assists=0.0, clean_sheet=0.0, play=1.0):
+    return PlayerPrediction(
+        player_id=player_id, gameweek=1, predicted_points=points, confidence_score=0.5,
+        form_score=0.5, fixture_difficulty=3.0, expected_goals=goals, expected_assists=assists,
+        clean_sheet_probability=clean_sheet, minutes_probability=play,
+        prediction_date=datetime(2026, 10, 17)
+    )
+
+
+@pytest.fixture
+def squad():
+    predictions = [
+        prediction(1, 6.0, goals=0.5, assists=0.3, clean_sheet=0.2, play=0.9),
+        prediction(2, 4.0, goals=0.1, assists=0.1, clean_sheet=0.4, play=0.8),
+        prediction(3, 2.5, clean_sheet=0.4, play=1.0),
+        prediction(4, 1.0, play=0.3),
+    ]
+    positions = {1: 'FWD', 2: 'DEF', 3: 'DEF', 4: 'MID'}
+    clubs = {1: 1, 2: 2, 3: 2, 4: 3}
+    return predictions, positions, clubs
+
+
+def test_same_seed_same_draws(squad):
+    first = PointsSimulator(5000, seed=9).simulate(*squad)
+    second = PointsSimulator(5000, seed=9).simulate(*squad)
+    other = PointsSimulator(5000, seed=10).simulate(*squad)
+    assert np.array_equal(first.samples, second.samples)
+    assert not np.array_equal(first.samples, other.samples)
+
+
+def test_means_match_the_point_estimates(squad):
+    result = PointsSimulator(40000, seed=1).simulate(*squad)
+    means = result.means()
+    for p in squad[0]:
+        assert means[p.player_id] == pytest.approx(p.predicted_points, abs=0.1)
+
+
+def test_teammates_share_clean_sheets():
+    predictions = [prediction(i, 3.6, clean_sheet=0.4) for i in (1, 2, 3)]
+    positions = {1: 'DEF', 2: 'DEF', 3: 'DEF'}
+    result = PointsSimulator(20000, seed=2).simulate(predictions, positions, {1: 1, 2: 1, 3: 2})
+
+    assert np.array_equal(result.row(1), result.row(2))
+    correlation = np.corrcoef(result.row(1), result.row(3))[0, 1]
+    assert abs(correlation) < 0.05
+
+
+def test_distribution_summaries(squad):
+    result = PointsSimulator(5000, seed=3).simulate(*squad)
+
+    for values in result.percentiles().values():
+        assert list(values.values()) == sorted(values.values())
+    beat = result.beat_probabilities()
+    assert np.all(np.diag(beat) == 0)
+    assert np.all(beat + beat.T <= 1 + 1e-12)
+    assert sum(result.top_scorer_probabilities().values()) == pytest.approx(1.0)
+
+    totals = result.squad_totals(captain_id=1)
+    assert np.allclose(totals, result.samples.sum(axis=0) + result.row(1))
+    assert np.allclose(result.squad_totals(player_ids=[2, 3]), result.row(2) + result.row(3))
+
+
+def test_empty_squad():
+    result = PointsSimulator(100, seed=0).simulate([], {}, {})
+    assert result.samples.shape == (0, 100)
+
+
+def test_squads_in_a_process_pool_are_reproducible(squad):
+    simulator = PointsSimulator(2000, seed=4)
+    pooled = simulator.simulate_squads([squad, squad], max_workers=2)
+    again = simulator.simulate_squads([squad, squad], max_workers=2)
+
+    seeds = np.random.SeedSequence(4).spawn(2)
+    for result, repeat, seed in zip(pooled, again, seeds):
+        assert np.array_equal(result.samples, repeat.samples)
+        assert np.array_equal(result.samples, _simulate_job((2000, seed, *squad)).samples)
+    # Each squad gets its own stream
+    assert not np.array_equal(pooled[0].samples, pooled[1].samples)
@@ -0,0 +1,45 @@
+import random
+import pytest
+from src.analysis.squad_builder import SQUAD_QUOTAS, SquadBuilder
+
+
+@pytest.fixture
+def builder():
+    rng = random.Random(5)
+    positions = [position for position, quota in SQUAD_QUOTAS.items() for _ in range(quota * 8)]
+    return SquadBuilder(
+        (player_id, position, rng.randint(1, 20), rng.randint(40, 130) / 10, rng.uniform(0, 10))
+        for player_id, position in enumerate(positions)
+    )
+
+
+def test_builds_a_legal_squad_within_budget(builder):
+    selection = builder.build(budget=100.0)
+    squad = selection.starters + selection.bench
+    positions = [builder.positions[builder._rows[player_id]] for player_id in squad]
+
+    assert selection.optimal
+    assert len(selection.starters) == 11 and len(selection.bench) == 4
+    assert {p: positions.count(p) for p in SQUAD_QUOTAS} == SQUAD_QUOTAS
+    assert selection.cost <= 100.0
+
+
+def test_locked_excluded_and_formation_are_respected(builder):
+    selection = builder.build(formation='3-5-2', locked=[0], excluded=[1, 2])
+    squad = selection.starters + selection.bench
+    assert selection.formation == '3-5-2'
+    assert 0 in squad and 1 not in squad and 2 not in squad
+
+
+def test_infeasible_budget_is_a_value_error(builder):
+    with pytest.raises(ValueError):
+        builder.build(budget=20.0)
+
+
+def test_time_limit_stop_is_not_reported_as_optimal(builder, monkeypatch):
+    monkeypatch.setattr(SquadBuilder, 'TIME_LIMIT', 1e-6)
+    try:
+        selection = builder.build()
+    except TimeoutError:
+        return
+    assert not selection.optimal
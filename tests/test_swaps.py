@@ -0,0 +1,117 @@
+import itertools
+import random
+import pytest
+from src.analysis.candidate_index import CandidateIndex
+from src.analysis.swaps import SwapMatrix
+
+POSITIONS = ['GKP', 'DEF', 'MID', 'FWD']
+
+
+def random_pool(seed, size=120):
+    rng = random.Random(seed)
+    return [
+        (player_id, rng.choice(POSITIONS), rng.randint(1, 6),
+         rng.randint(40, 130) / 10, round(rng.uniform(0, 10), 2))
+        for player_id in range(size)
+    ]
+
+
+def build(pool, squad_ids, bank, max_per_club=3):
+    by_id = {p[0]: p for p in pool}
+    squad = [by_id[player_id] for player_id in squad_ids]
+    candidates = CandidateIndex((p[0], p[1], p[3], p[4]) for p in pool)
+    swaps = SwapMatrix.build(
+        candidates, {p[0]: p[2] for p in pool},
+        [p[0] for p in squad], [p[1] for p in squad], [p[2] for p in squad],
+        [p[3] for p in squad], [p[4] for p in squad],
+        bank=bank, max_per_club=max_per_club
+    )
+    return swaps, squad, by_id
+
+
+def brute_force(pool, squad, bank, max_per_club=3):
+    """Every feasible (out id, in id, gain), best first"""
+    squad_ids = {p[0] for p in squad}
+    clubs = [p[2] for p in squad]
+    found = []
+    for out, cand in itertools.product(squad, pool):
+        if (cand[0] in squad_ids or cand[1] != out[1]
+                or round(cand[3] * 10) > round(out[3] * 10) + round(bank * 10)
+                or clubs.count(cand[2]) - (out[2] == cand[2]) >= max_per_club):
+            continue
+        found.append((out[0], cand[0], cand[4] - out[4]))
+    return sorted(found, key=lambda f: -f[2])
+
+
+def as_ids(swaps, cells):
+    return [(int(swaps.out_ids[r]), int(swaps.in_ids[c]), float(swaps.point_gain[r, c]))
+            for r, c in cells]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_top_k_matches_brute_force(seed):
+    pool = random_pool(seed)
+    squad_ids = random.Random(seed).sample(range(len(pool)), 15)
+    swaps, squad, _ = build(pool, squad_ids, bank=1.5)
+    expected = brute_force(pool, squad, 1.5)
+
+    best = as_ids(swaps, swaps.top_k(10))
+    assert [gain for _, _, gain in best] == pytest.approx([gain for _, _, gain in expected[:10]])
+    assert int(swaps.feasible.sum()) == len(expected)
+    assert {(o, i) for o, i, _ in best} <= {(o, i) for o, i, _ in expected}
+
+
+def test_min_score_and_per_out_cap():
+    pool = random_pool(7)
+    swaps, _, _ = build(pool, list(range(15)), bank=2.0)
+
+    best = as_ids(swaps, swaps.top_k(50, per_out=2, min_score=1.0))
+    assert all(gain > 1.0 for _, _, gain in best)
+    outs = [out for out, _, _ in best]
+    assert max(outs.count(out) for out in set(outs)) <= 2
+    assert [gain for _, _, gain in best] == sorted((gain for _, _, gain in best), reverse=True)
+
+
+def test_budget_position_and_club_limits():
+    pool = [
+        (1, 'MID', 1, 6.0, 1.0),   # in the squad
+        (2, 'MID', 1, 6.0, 1.0),   # in the squad
+        (3, 'MID', 2, 6.0, 1.0),   # in the squad
+        (10, 'MID', 2, 7.0, 9.0),  # affordable with the bank
+        (11, 'MID', 3, 7.1, 9.5),  # 0.1 over budget
+        (12, 'FWD', 3, 5.0, 9.9),  # wrong position
+        (13, 'MID', 1, 5.0, 8.0),  # third club 1 player unless a club 1 player leaves
+    ]
+    swaps, _, _ = build(pool, [1, 2, 3], bank=1.0, max_per_club=2)
+    best = {(o, i) for o, i, _ in as_ids(swaps, swaps.top_k(10))}
+    assert best == {(1, 10), (2, 10), (3, 10), (1, 13), (2, 13)}
+
+
+def test_club_limit_counts_squad_members_that_cannot_go_out():
+    pool = [
+        (1, 'MID', 1, 6.0, 1.0),   # in the squad, can go out
+        (2, 'DEF', 1, 5.0, 1.0),   # in the squad, not offered as an out row
+        (3, 'FWD', 1, 7.0, 1.0),   # in the squad, not offered as an out row
+        (10, 'MID', 1, 6.0, 9.0),  # club 1: fine only because player 1 leaves
+        (11, 'MID', 2, 6.0, 8.0),
+    ]
+    candidates = CandidateIndex((p[0], p[1], p[3], p[4]) for p in pool if p[0] >= 10)
+    clubs = {p[0]: p[2] for p in pool}
+    swaps = SwapMatrix.build(
+        candidates, clubs, [1], ['MID'], [1], [6.0], [1.0], bank=0.0,
+        squad_clubs={1: 1, 2: 1, 3: 1}
+    )
+    assert {(o, i) for o, i, _ in as_ids(swaps, swaps.top_k(10))} == {(1, 10), (1, 11)}
+
+    # A club 1 candidate for a squad member from elsewhere would be a fourth
+    swaps = SwapMatrix.build(
+        candidates, clubs, [1], ['MID'], [2], [6.0], [1.0], bank=0.0,
+        squad_clubs={1: 2, 2: 1, 3: 1, 4: 1}
+    )
+    assert {(o, i) for o, i, _ in as_ids(swaps, swaps.top_k(10))} == {(1, 11)}
+
+
+def test_empty_inputs():
+    swaps, _, _ = build([(1, 'MID', 1, 5.0, 1.0)], [1], bank=0.0)
+    assert swaps.top_k(5) == []
+    assert swaps.top_k(0) == []
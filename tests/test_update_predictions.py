@@ -0,0 +1,83 @@
+import pytest
+from src.analyze_transfers import update_predictions
+from src.utils.bootstrap_index import BootstrapIndex
+from src.utils.database import HISTORY_COLUMNS, Database
+from src.utils.fixture_index import FixtureIndex
+
+HORIZON = [5, 6, 7]
+
+
+def bootstrap():
+    return {
+        'teams': [{'id': 1, 'name': 'Arsenal', 'short_name': 'ARS'},
+                  {'id': 2, 'name': 'Chelsea', 'short_name': 'CHE'}],
+        'element_types': [{'id': i, 'singular_name_short': name}
+                          for i, name in enumerate(['GKP', 'DEF', 'MID', 'FWD'], 1)],
+        'elements': [
+            {'id': player_id, 'web_name': f"P{player_id}", 'team': player_id % 2 + 1,
+             'element_type': player_id % 4 + 1, 'now_cost': 50 + player_id, 'form': '3.0',
+             'points_per_game': '4.0', 'selected_by_percent': '10.0'}
+            for player_id in range(1, 9)
+        ]
+    }
+
+
+def fixtures(difficulty=3):
+    return [
+        {'id': gameweek, 'event': gameweek, 'team_h': 1, 'team_a': 2,
+         'team_h_difficulty': difficulty if gameweek == 6 else 3, 'team_a_difficulty': 3}
+        for gameweek in HORIZON
+    ]
+
+
+def history_row(player_id, points):
+    return {'player_id': player_id, 'fixtures': 1,
+            **{column: 0 for column in HISTORY_COLUMNS}, 'minutes': 90, 'total_points': points}
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'fpl.db'))
+    for gameweek in (1, 2, 3):
+        db.save_gameweek_history(gameweek, [history_row(player_id, player_id + gameweek)
+                                            for player_id in range(1, 9)])
+
+    db.saved = []
+    save = db.save_predictions_batch
+    def record(predictions):
+        db.saved.append(sorted((p.player_id, p.gameweek) for p in predictions))
+        return save(predictions)
+    monkeypatch.setattr(db, 'save_predictions_batch', record)
+    return db
+
+
+def run(db, fixture_list):
+    data = bootstrap()
+    return update_predictions(db, data, BootstrapIndex.from_bootstrap(data),
+                              FixtureIndex.from_fixtures(fixture_list), HORIZON)
+
+
+def test_unchanged_inputs_write_nothing(db):
+    first = run(db, fixtures())
+    second = run(db, fixtures())
+
+    assert len(db.saved[0]) == 8 * len(HORIZON)
+    assert db.saved[1] == []
+    assert [(p.player_id, p.gameweek, p.predicted_points) for p in second] == \
+        [(p.player_id, p.gameweek, p.predicted_points) for p in first]
+
+
+def test_new_history_recomputes_only_that_player(db):
+    run(db, fixtures())
+    db.save_gameweek_history(4, [history_row(3, 15)])
+    run(db, fixtures())
+
+    assert db.saved[1] == [(3, gameweek) for gameweek in HORIZON]
+
+
+def test_fixture_change_recomputes_only_that_gameweek(db):
+    run(db, fixtures())
+    predictions = run(db, fixtures(difficulty=5))
+
+    assert db.saved[1] == [(player_id, 6) for player_id in range(1, 9)]
+    assert len(predictions) == 8 * len(HORIZON)
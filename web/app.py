@@ -1,35 +1,31 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, render_template, jsonify, request
 import sys
 import os
 from pathlib import Path
 from datetime import datetime
-import requests
 
 # Add the project root to Python path
 project_root = Path(__file__).parent.parent
 sys.path.append(str(project_root))
 
-from src.analyze_transfers import analyze_transfers
-from src.utils.data_fetcher import FPLDataFetcher
+from src.analyze_transfers import analyze_transfers, plan_transfers
+from src.refresh import RefreshScheduler, build_snapshot
 from src.utils.database import Database
+from src.analysis.squad_builder import SquadBuilder
+from src.config import PLAN_MAX_TIME_BUDGET, PLAN_TIME_BUDGET, REFRESH_ON_STARTUP
 
 app = Flask(__name__, 
            static_url_path='', 
            static_folder='static',
            template_folder='templates')
 
-# Get current gameweek at app startup
-def get_current_gameweek():
-    try:
-        fpl_data = FPLDataFetcher.fetch_all_data()
-        for event in fpl_data['events']:
-            if event['is_current']:
-                return event['id']
-        return 1
-    except:
-        return 1
-
-current_gameweek = get_current_gameweek()
+# Data is refreshed in the background and handlers only read the current
+# snapshot. Workers start refreshing, and warm-load the model, as soon as
+# they import the app; under the debug reloader only the serving child
+# does. Otherwise the first request starts the scheduler.
+scheduler = RefreshScheduler(lambda: build_snapshot(Database(str(project_root / 'data' / 'fpl_data.db'))))
+if REFRESH_ON_STARTUP and (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    scheduler.start()
 
 @app.route('/')
 def index():
@@ -52,119 +48,184 @@ def analyze():
         if not team_id:
             return jsonify({"success": False, "error": "Team ID is required"}), 400
             
-        result = analyze_transfers(int(team_id))
+        snapshot = scheduler.current()
+        result = analyze_transfers(int(team_id), snapshot)
         return jsonify(result)
         
     except Exception as e:
         app.logger.error(f"Analysis error: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
+@app.route('/api/plan-transfers', methods=['POST'])
+def plan_team_transfers():
+    try:
+        data = request.get_json() or {}
+        team_id = data.get('team_id')
+
+        if not team_id:
+            return jsonify({"success": False, "error": "Team ID is required"}), 400
+
+        time_budget = min(float(data.get('time_budget', PLAN_TIME_BUDGET)), PLAN_MAX_TIME_BUDGET)
+        if time_budget <= 0:
+            return jsonify({"success": False, "error": "time_budget must be positive"}), 400
+
+        snapshot = scheduler.current()
+        result = plan_transfers(
+            int(team_id), snapshot,
+            free_transfers=int(data.get('free_transfers', 1)),
+            time_budget=time_budget
+        )
+        return jsonify(result)
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Transfer planning error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+# Query parameters that switch /api/players from the full list to one page
+PLAYER_QUERY_PARAMS = {
+    'position', 'team', 'min_price', 'max_price', 'search', 'sort', 'order', 'page', 'page_size'
+}
+
+def optional_float(value):
+    return float(value) if value not in (None, '') else None
+
 @app.route('/api/players')
 def get_all_players():
     try:
-        fpl_data = FPLDataFetcher.fetch_all_data()
-        db = Database(str(project_root / 'data' / 'fpl_data.db'))
+        table = scheduler.current().player_table
         
-        # Fetch fixtures data
-        fixtures_response = requests.get("https://fantasy.premierleague.com/api/fixtures/")
-        fixtures_response.raise_for_status()
-        fixtures_data = fixtures_response.json()
+        if PLAYER_QUERY_PARAMS & set(request.args):
+            return player_page(table)
         
-        # Create a map of team ID to their next fixture
-        team_next_fixtures = {}
-        for fixture in fixtures_data:
-            if not fixture.get('finished', True):  # Only consider upcoming fixtures
-                home_team = fixture['team_h']
-                away_team = fixture['team_a']
-                
-                # Add fixture for home team if they don't have one yet
-                if home_team not in team_next_fixtures:
-                    team_next_fixtures[home_team] = {
-                        'opponent': next(t['short_name'] for t in fpl_data['teams'] if t['id'] == away_team),
-                        'is_home': True
-                    }
-                
-                # Add fixture for away team if they don't have one yet
-                if away_team not in team_next_fixtures:
-                    team_next_fixtures[away_team] = {
-                        'opponent': next(t['short_name'] for t in fpl_data['teams'] if t['id'] == home_team),
-                        'is_home': False
-                    }
+        if request.if_none_match.contains_weak(table.etag):
+            response = Response(status=304)
+        elif request.accept_encodings['gzip']:
+            response = Response(table.gzip_body, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(table.body, mimetype='application/json')
+        response.set_etag(table.etag, weak=True)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
         
-        players_data = []
-        for element in fpl_data['elements']:
-            prediction = db.get_prediction(element['id'], current_gameweek)
-            
-            try:
-                player_history = FPLDataFetcher.fetch_player_history(element['id'])
-                games_played = len([g for g in player_history.get('history', []) 
-                                  if g['minutes'] > 0]) if player_history else 0
-            except:
-                games_played = max(1, element.get('appearances', 1))
-            
-            games_played = max(1, games_played)
-            predicted_points = prediction.predicted_points if prediction else 0
-            
-            # Get next fixture information
-            team_id = element['team']
-            next_fixture = team_next_fixtures.get(team_id, {'opponent': '-', 'is_home': True})
-            fixture_text = f"{next_fixture['opponent']} {'(H)' if next_fixture['is_home'] else '(A)'}"
-            
-            player_data = {
-                'id': element['id'],
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Error fetching players: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def player_page(table):
+    """One filtered, sorted page of the player table"""
+    args = request.args
+    etag = table.query_etag(list(args.items(multi=True)))
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        page = table.query(
+            position=args.get('position'),
+            team=args.get('team'),
+            min_price=optional_float(args.get('min_price')),
+            max_price=optional_float(args.get('max_price')),
+            search=args.get('search'),
+            sort=args.get('sort', 'total_points'),
+            descending=args.get('order', 'desc') != 'asc',
+            page=int(args.get('page', 1)),
+            page_size=int(args.get('page_size', 25))
+        )
+        response = jsonify({
+            'data': page.rows,
+            'total': page.total,
+            'filtered': page.filtered,
+            'page': page.page,
+            'page_size': page.page_size
+        })
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/build-squad', methods=['POST'])
+def build_squad():
+    try:
+        data = request.get_json() or {}
+        snapshot = scheduler.current()
+        index = snapshot.index
+        db = Database(str(project_root / 'data' / 'fpl_data.db'))
+
+        gameweek = int(data.get('gameweek', snapshot.next_gameweek))
+        predictions = db.get_gameweek_predictions(gameweek)
+        if not predictions:
+            return jsonify({"success": False, "error": f"No predictions for gameweek {gameweek}"}), 404
+
+        builder = SquadBuilder.from_predictions(predictions, index)
+        selection = builder.build(
+            budget=float(data.get('budget', 100.0)),
+            formation=data.get('formation'),
+            locked=[int(pid) for pid in data.get('locked', [])],
+            excluded=[int(pid) for pid in data.get('excluded', [])]
+        )
+
+        predicted = {p.player_id: p.predicted_points for p in predictions}
+
+        def player_summary(player_id):
+            element = index.elements[player_id]
+            return {
+                'player_id': player_id,
                 'name': element['web_name'],
-                'team': next(t['name'] for t in fpl_data['teams'] if t['id'] == element['team']),
-                'position': next(t['singular_name_short'] for t in fpl_data['element_types'] 
-                               if t['id'] == element['element_type']),
-                'next_fixture': fixture_text,
-                'price': round(element['now_cost'] / 10, 1),
-                'form': round(float(element['form'] or 0), 1),
-                'total_points': element['total_points'],
-                'points_per_game': round(float(element['points_per_game'] or 0), 1),
-                'minutes': element['minutes'],
-                'minutes_per_game': round(element['minutes'] / games_played, 1),
-                'games_played': games_played,
-                'predicted_points': round(predicted_points),
-                'selected_by': round(float(element['selected_by_percent'] or 0), 1)
+                'team': index.team_name(element['team']),
+                'position': index.position_name(element['element_type']),
+                'price': element['now_cost'] / 10,
+                'predicted_points': predicted[player_id]
             }
-            
-            players_data.append(player_data)
-        
-        players_data.sort(key=lambda x: x['total_points'], reverse=True)
-        
+
         return jsonify({
-            'data': players_data
+            'success': True,
+            'gameweek': gameweek,
+            'formation': selection.formation,
+            'starters': [player_summary(pid) for pid in selection.starters],
+            'bench': [player_summary(pid) for pid in selection.bench],
+            'expected_points': selection.expected_points,
+            'bench_points': selection.bench_points,
+            'cost': selection.cost,
+            'optimal': selection.optimal
         })
-        
+
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except TimeoutError as e:
+        return jsonify({"success": False, "error": str(e)}), 503
     except Exception as e:
-        app.logger.error(f"Error fetching players: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        app.logger.error(f"Squad builder error: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
 
 @app.route('/player/<int:player_id>')
 def player_details(player_id):
     try:
-        fpl_data = FPLDataFetcher.fetch_all_data()
-        player_history = FPLDataFetcher.fetch_player_history(player_id)
+        snapshot = scheduler.current()
+        index = snapshot.index
         db = Database(str(project_root / 'data' / 'fpl_data.db'))
         
-        player_data = next(p for p in fpl_data['elements'] if p['id'] == player_id)
-        prediction = db.get_prediction(player_id, current_gameweek)
+        player_data = index.elements[player_id]
+        prediction = db.get_prediction(player_id, snapshot.next_gameweek)
+        
+        # Match history comes from the locally stored gameweeks
+        player_history = db.get_player_histories([player_id]).get(player_id, [])
         
         # Calculate actual games played
-        games_played = len([g for g in player_history.get('history', []) 
-                          if g['minutes'] > 0]) if player_history else 1
+        games_played = sum(g['fixtures'] for g in player_history if g['minutes'] > 0)
         games_played = max(1, games_played)  # Ensure no division by zero
         
-        recent_games = player_history['history'][-5:] if player_history.get('history') else []
+        recent_games = player_history[-5:]
         points_history = [g['total_points'] for g in recent_games]
         minutes_history = [g['minutes'] for g in recent_games]
         
         details = {
             'id': player_id,
             'name': player_data['web_name'],
-            'team': next(t['name'] for t in fpl_data['teams'] if t['id'] == player_data['team']),
-            'position': next(t['singular_name_short'] for t in fpl_data['element_types'] 
-                           if t['id'] == player_data['element_type']),
+            'team': index.team_name(player_data['team']),
+            'position': index.position_name(player_data['element_type']),
             'price': round(player_data['now_cost'] / 10, 1),
             'form': round(float(player_data['form'] or 0), 1),
             'total_points': player_data['total_points'],
@@ -141,7 +141,7 @@ document.addEventListener('DOMContentLoaded', function() {
                                             <span class="text-2xl text-gray-400 mb-2">→</span>
                                             <div class="text-center bg-white rounded-lg p-2 shadow-sm">
                                                 <p class="text-sm font-medium text-blue-600">+${Math.round(transfer.improvement)} pts</p>
-                                                <p class="text-xs text-gray-500">predicted gain</p>
+                                                <p class="text-xs text-gray-500">predicted gain over ${data.horizon_gameweeks.length} GWs</p>
                                             </div>
                                         </div>
 